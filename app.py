@@ -1,13 +1,34 @@
 import streamlit as st
 import os
-import tempfile
+import uuid
 import logging
-from config.config import APP_TITLE, RESPONSE_MODES, PET_SPECIES, validate_together_api_key, TOGETHER_API_KEY
+from config.config import (APP_TITLE, RESPONSE_MODES, PET_SPECIES, CHAT_HISTORY_WINDOW, INGESTION_WORKERS,
+                           INGESTION_EMBED_BATCH_SIZE, OVERLAY_MAX_BYTES, OVERLAY_MAX_RESIDENT,
+                           OVERLAY_IDLE_SECONDS, OVERLAY_SPILL_DIR, OVERLAY_RETENTION_DAYS,
+                           VECTOR_SHARDS, VECTOR_SHARD_KEY,
+                           VECTOR_SEARCH_WORKERS, VECTOR_STORE_MMAP_PATH, validate_together_api_key,
+                           EMBEDDING_SERVICE_ENABLED, EMBEDDING_BATCH_WINDOW_MS, EMBEDDING_MAX_BATCH,
+                           INDEX_ARTIFACT_DIR, INDEX_RELOAD_SECONDS, CHUNK_SIZE, CHUNK_OVERLAP,
+                           TOGETHER_API_KEY, CHAT_DB_PATH, SESSION_IDLE_SECONDS, SESSION_SWEEP_SECONDS,
+                           CHAT_RETENTION_DAYS, GENERATION_TIMEOUT, GENERATION_ABANDON_SECONDS,
+                           SAFETY_FAST_PATH_ENABLED)
 from models.embeddings import EmbeddingModel
-from models.llm import TogetherModel
-from utils.rag_utils import VectorStore, load_document, chunk_text
+from models.embedding_service import EmbeddingService, RemoteEmbeddingModel
+from models.llm import TogetherModel, ModelRouter
+from utils.rag_utils import VectorStore, load_document, compute_content_hash, chunk_text
+from utils.ingestion import IngestionQueue, COMPLETED, FAILED, CANCELLED
+from utils.overlay_store import OverlayManager, LayeredVectorStore
+from utils.sharded_store import ShardedVectorStore
+from utils.mmap_store import MmapVectorStore, export_vector_store
+from utils.pipeline import answer_query
+from utils.profiling import profile_request, new_request_id
+from utils.admission import UpstreamBusy
+from utils.index_artifacts import HotReloadingVectorStore, read_current
+from utils.session_store import ChatSessionStore, ChatSession, SessionRegistry
+from utils.cancellation import CancellableTask, RequestCancelled
+from utils.safety_index import SafetyIndex
+from utils.score_calibration import calibrate
 from typing import List
-import requests
 from datetime import datetime
 
 # Configure logging
@@ -16,8 +37,6 @@ logger = logging.getLogger(__name__)
 # Initialize session state
 if "embedding_model" not in st.session_state:
     st.session_state.embedding_model = None
-if "vector_store" not in st.session_state:
-    st.session_state.vector_store = None
 
 # Custom CSS with soft brown theme and ULTRA-AGGRESSIVE black bar targeting
 def custom_css():
@@ -419,7 +438,7 @@ def initialize_session_state():
     # If API key is valid, initialize models
     if "embedding_model" not in st.session_state:
         try:
-            st.session_state.embedding_model = EmbeddingModel()
+            st.session_state.embedding_model = get_embedding_model()
             logger.info("Embedding model initialized successfully")
         except Exception as e:
             logger.error(f"Error initializing embedding model: {str(e)}")
@@ -428,7 +447,7 @@ def initialize_session_state():
     
     if "llm" not in st.session_state:
         try:
-            st.session_state.llm = TogetherModel()
+            st.session_state.llm = ModelRouter(TogetherModel())
             # Test the API key with a simple request
             test_response = st.session_state.llm.simple_response("Hello")
             if "Error" in test_response:
@@ -447,21 +466,11 @@ def initialize_session_state():
     if "vector_store" not in st.session_state:
         try:
             if st.session_state.embedding_model:
-                # Create a vector store with persistence
-                persist_dir = os.path.join(os.getcwd(), "vector_store")
-                st.session_state.vector_store = VectorStore(
-                    st.session_state.embedding_model,
-                    persist_dir=persist_dir
-                )
+                # The knowledge base index is built once per process and shared;
+                # this session only owns a small overlay for its uploads.
+                with st.spinner("Loading knowledge base..."):
+                    st.session_state.vector_store = get_chat_session().vector_store
                 logger.info("Vector store initialized successfully")
-                
-                # Load and process knowledge base documents
-                if "knowledge_base_loaded" not in st.session_state:
-                    with st.spinner("Loading knowledge base..."):
-                        num_processed = load_knowledge_base_documents()
-                        if num_processed > 0:
-                            st.success(f"Loaded {num_processed} documents from knowledge base")
-                        st.session_state.knowledge_base_loaded = True
             else:
                 st.session_state.vector_store = None
         except Exception as e:
@@ -493,156 +502,280 @@ def api_key_form():
             except Exception as e:
                 st.error(f"Error validating API key: {str(e)}")
 
-def save_uploaded_file(uploaded_file):
-    """Save uploaded file to a temporary location and return the path."""
-    try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(uploaded_file.name)[1]) as tmp_file:
-            tmp_file.write(uploaded_file.getvalue())
-            return tmp_file.name
-    except Exception as e:
-        logger.error(f"Error saving uploaded file: {str(e)}")
-        st.error(f"Error saving uploaded file: {e}")
-        return None
+@st.cache_resource
+def get_embedding_model():
+    """Embedding model shared by every session in this server process."""
+    if EMBEDDING_SERVICE_ENABLED:
+        service = EmbeddingService(batch_window_ms=EMBEDDING_BATCH_WINDOW_MS, max_batch=EMBEDDING_MAX_BATCH)
+        return RemoteEmbeddingModel(service)
+    return EmbeddingModel()
 
-def process_document(file_path, file_name):
-    """Process document and add to vector store."""
-    try:
-        with st.spinner("Processing document..."):
-            # Load document
-            document_text = load_document(file_path)
-            
-            # Chunk document
-            chunks = chunk_text(document_text)
-            
-            # Add to vector store
-            st.session_state.vector_store.add_documents(chunks, file_name)
-            
-            return len(chunks)
-    except Exception as e:
-        logger.error(f"Error processing document: {str(e)}")
-        st.error(f"Error processing document: {e}")
-        return 0
+@st.cache_resource
+def get_base_vector_store():
+    """Read-only knowledge base index, built once and shared by all sessions."""
+    if read_current(INDEX_ARTIFACT_DIR):
+        return HotReloadingVectorStore(INDEX_ARTIFACT_DIR, get_embedding_model(), poll_seconds=INDEX_RELOAD_SECONDS)
 
-def search_documents(query, top_k=5):
-    """Search for relevant document chunks."""
-    try:
-        if st.session_state.vector_store:
-            return st.session_state.vector_store.search(query, top_k=top_k)
-        return []
-    except Exception as e:
-        logger.error(f"Error searching documents: {str(e)}")
-        st.error(f"Error searching documents: {e}")
-        return []
+    if VECTOR_STORE_MMAP_PATH and os.path.isdir(VECTOR_STORE_MMAP_PATH):
+        logger.info(f"Mapping shared knowledge base index from {VECTOR_STORE_MMAP_PATH}")
+        return MmapVectorStore(VECTOR_STORE_MMAP_PATH, get_embedding_model())
 
-def web_search(query: str, num_results: int = 5):
-    """Perform a web search using Tavily API."""
-    try:
-        from utils.web_search import tavily_search
-        
-        # Use Tavily for search
-        search_results = tavily_search(
-            query=query, 
-            search_depth="basic", 
-            max_results=num_results
+    if VECTOR_SHARDS > 1:
+        base = ShardedVectorStore(
+            get_embedding_model(),
+            num_shards=VECTOR_SHARDS,
+            shard_key=VECTOR_SHARD_KEY,
+            max_workers=VECTOR_SEARCH_WORKERS
         )
-        
-        return search_results
-    except Exception as e:
-        logger.error(f"Error performing web search: {str(e)}")
-        return []
+    else:
+        base = VectorStore(embedding_model=get_embedding_model())
+    num_processed = load_knowledge_base_documents(base)
+    logger.info(f"Built shared knowledge base index from {num_processed} documents")
+
+    if VECTOR_STORE_MMAP_PATH:
+        try:
+            export_vector_store(base, VECTOR_STORE_MMAP_PATH)
+        except OSError:
+            # Another worker process published the store first
+            pass
+        return MmapVectorStore(VECTOR_STORE_MMAP_PATH, get_embedding_model())
+    return base
+
+@st.cache_resource
+def get_score_thresholds():
+    """Web search and context thresholds measured against the shared index."""
+    return calibrate(get_base_vector_store(), get_embedding_model())
+
+@st.cache_resource
+def get_overlay_manager():
+    """Registry of per-user upload indexes, with LRU spill to disk."""
+    manager = OverlayManager(
+        get_embedding_model(),
+        spill_dir=os.path.join(os.getcwd(), OVERLAY_SPILL_DIR),
+        max_bytes=OVERLAY_MAX_BYTES,
+        max_resident=OVERLAY_MAX_RESIDENT,
+        idle_seconds=OVERLAY_IDLE_SECONDS
+    )
+    manager.prune(OVERLAY_RETENTION_DAYS * 86400)
+    return manager
 
-def fetch_webpage_content(url: str, max_length: int = 3000):
-    """Fetch and extract content from a webpage."""
+def create_session_vector_store(session_id):
+    """Layer this session's upload overlay on top of the shared base index."""
+    return LayeredVectorStore(get_base_vector_store(), get_overlay_manager(), session_id)
+
+@st.cache_resource
+def get_safety_index():
+    """Toxicity and first-aid facts of the knowledge base, for instant answers."""
+    if not SAFETY_FAST_PATH_ENABLED:
+        return None
     try:
-        from bs4 import BeautifulSoup
-        
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-        
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, "html.parser")
-        
-        # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.extract()
-            
-        # Get text
-        text = soup.get_text(separator="\n")
-        
-        # Clean text
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = "\n".join(chunk for chunk in chunks if chunk)
-        
-        # Truncate if needed
-        if len(text) > max_length:
-            text = text[:max_length] + "..."
-            
-        return text
+        return SafetyIndex.from_knowledge_base(os.path.join(os.getcwd(), "knowledge_base"))
     except Exception as e:
-        logger.error(f"Error fetching webpage content: {str(e)}")
+        logger.error(f"Error building safety index: {str(e)}")
         return None
 
-def generate_response(query, response_mode, selected_pet, use_web_search=True):
-    """Generate response using RAG and/or web search."""
-    try:
-        # First search local documents
-        # If a specific pet is selected, add it to the query for better retrieval
-        search_query = query
-        if selected_pet != "All species":
-            search_query = f"{selected_pet} {query}"
-            
-        context = search_documents(search_query)
-        
-        # If web search is enabled and we don't have enough context, search the web
-        web_results = []
-        if use_web_search and (len(context) < 2):
-            with st.spinner("Searching the web for additional information..."):
-                search_query = query
-                if selected_pet != "All species":
-                    search_query = f"{selected_pet} {query}"
-                
-                search_results = web_search(search_query)
-                
-                # Process search results
-                if search_results:
-                    for result in search_results[:2]:  # Limit to top 2 results
-                        # No need to fetch content as Tavily already provides it
-                        snippet = result.get("snippet", "")
-                        if snippet:
-                            web_results.append(f"From {result['title']} ({result['link']}):\n{snippet}")
-        
-        # Combine local and web context
-        all_context = context + web_results
-        
-        # Generate response
-        system_message = f"You are a helpful pet care assistant providing accurate information about pets."
-        
-        if selected_pet != "All species":
-            system_message += f" The user is specifically asking about {selected_pet}, so focus your response on that species."
-        
-        # Generate response
-        if all_context:
-            response = st.session_state.llm.generate_response(
-                query, 
-                context=all_context, 
-                response_mode=response_mode,
-                system_message=system_message
-            )
+@st.cache_resource
+def get_chat_store():
+    """SQLite chat history shared by every session in this server process."""
+    store = ChatSessionStore(os.path.join(os.getcwd(), CHAT_DB_PATH))
+    pruned = store.prune(CHAT_RETENTION_DAYS * 86400)
+    if pruned:
+        logger.info(f"Deleted {pruned} chat sessions older than {CHAT_RETENTION_DAYS:g} days")
+    return store
+
+def create_chat_session(session_id):
+    """Build the in-memory state of a session, loading its recent history from disk."""
+    return ChatSession(
+        session_id,
+        get_chat_store(),
+        window=CHAT_HISTORY_WINDOW,
+        vector_store=create_session_vector_store(session_id),
+        llm=ModelRouter(TogetherModel()),
+        pending=None
+    )
+
+@st.cache_resource
+def get_session_registry():
+    """Active chat sessions of this server process; idle ones are evicted on a timer."""
+    overlays = get_overlay_manager()
+
+    def sweep_overlays():
+        # Spill idle upload overlays and delete ones abandoned on disk
+        overlays.evict_idle()
+        overlays.prune(OVERLAY_RETENTION_DAYS * 86400)
+
+    return SessionRegistry(
+        create_chat_session,
+        idle_seconds=SESSION_IDLE_SECONDS,
+        sweep_seconds=SESSION_SWEEP_SECONDS,
+        on_sweep=sweep_overlays
+    )
+
+def get_chat_session():
+    """This browser session's chat state.
+
+    ``st.session_state`` only holds the session id and small UI flags; the
+    history, vector store and model client live in the process-wide
+    registry, so an idle tab costs nothing once its session is evicted.
+    """
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    return get_session_registry().get(st.session_state.session_id)
+
+@st.cache_resource
+def get_ingestion_queue():
+    """Worker pool shared by every session in this server process."""
+    return IngestionQueue(max_workers=INGESTION_WORKERS, embed_batch_size=INGESTION_EMBED_BATCH_SIZE)
+
+def submit_document(uploaded_file):
+    """Queue an uploaded file for background ingestion.
+
+    Uploads are keyed by a hash of their contents, so submitting a file that
+    is already indexed or already queued never reaches the embedding model.
+
+    Returns:
+        The new IngestionJob, or None if the file is a duplicate
+    """
+    data = uploaded_file.getvalue()
+    content_hash = compute_content_hash(data)
+    vector_store = get_chat_session().vector_store
+    if vector_store.document_exists(content_hash):
+        return None
+    for job in st.session_state.ingestion_jobs:
+        if job.content_hash == content_hash and not job.done:
+            return None
+
+    job = get_ingestion_queue().submit(vector_store, data, uploaded_file.name, content_hash)
+    st.session_state.ingestion_jobs.append(job)
+    return job
+
+def render_ingestion_jobs():
+    """Show progress for this session's ingestion jobs with cancel controls."""
+    jobs = st.session_state.ingestion_jobs
+    if not jobs:
+        return
+
+    for job in jobs:
+        if job.status == COMPLETED:
+            st.success(f"{job.file_name}: added {job.chunks_total} chunks")
+        elif job.status == FAILED:
+            st.error(f"{job.file_name}: {job.error}")
+        elif job.status == CANCELLED:
+            st.warning(f"{job.file_name}: cancelled")
         else:
-            response = st.session_state.llm.generate_response(
-                query,
-                response_mode=response_mode,
-                system_message=system_message
-            )
-            
-        return response
-    except Exception as e:
-        logger.error(f"Error generating response: {str(e)}")
-        return f"I encountered an error: {str(e)}"
+            st.progress(job.progress, text=f"{job.file_name}: {job.describe()}")
+            if st.button("Cancel", key=f"cancel_{job.job_id}"):
+                job.cancel()
+
+    if any(not job.done for job in jobs):
+        st.button("Refresh progress", key="refresh_ingestion")
+    elif st.button("Clear finished", key="clear_ingestion"):
+        st.session_state.ingestion_jobs = []
+
+def generate_response(query, response_mode, selected_pet, use_web_search=True):
+    """Start generating a response using RAG and/or web search.
+
+    The pipeline runs as a background task, so the script only polls it
+    (see ``render_pending_answer``) and the user can stop it. Everything the
+    task needs from Streamlit is read here, on the script thread.
+
+    Returns:
+        The running CancellableTask
+    """
+    request_id = new_request_id()
+    force_profile = st.experimental_get_query_params().get("profile") == ["1"]
+    session = get_chat_session()
+    vector_store, llm, embedding_model = session.vector_store, session.llm, get_embedding_model()
+    safety_index, score_thresholds = get_safety_index(), get_score_thresholds()
+
+    def run(task):
+        try:
+            with profile_request(request_id, force=force_profile):
+                return answer_query(
+                    query,
+                    response_mode,
+                    selected_pet,
+                    vector_store,
+                    llm,
+                    use_web_search=use_web_search,
+                    web_search_status=lambda: task.stage("Searching the web for additional information..."),
+                    embedding_model=embedding_model,
+                    cancel=task.token,
+                    safety_index=safety_index,
+                    score_thresholds=score_thresholds
+                )
+        except (UpstreamBusy, RequestCancelled):
+            raise
+        except Exception as e:
+            logger.error(f"Error generating response for request {request_id}: {str(e)}")
+            return f"I encountered an error: {str(e)}"
+
+    return CancellableTask(run, timeout=GENERATION_TIMEOUT, abandon_after=GENERATION_ABANDON_SECONDS,
+                           name=f"Request {request_id}")
+
+def render_pending_answer(session):
+    """Poll the session's pending answer, with a Stop control, until it is ready.
+
+    The script only sleeps between polls, so clicking Stop (or any other
+    widget) interrupts it with a rerun; the task keeps running and the rerun
+    resumes polling it. Polling is the task's heartbeat: once no page polls
+    it, e.g. because the tab was closed, the task cancels itself.
+    """
+    prompt, task = session.pending
+    with st.chat_message("user"):
+        st.markdown(prompt)
+
+    with st.chat_message("assistant"):
+        stop_slot = st.empty()
+        if not task.done and stop_slot.button("Stop", key=f"stop_{task.task_id}"):
+            task.cancel("stopped")
+        status = st.empty()
+        while not task.done:
+            task.heartbeat()
+            status.caption(f"{task.status} ({task.elapsed:.0f}s)")
+            task.wait(0.25)
+        stop_slot.empty()
+        status.empty()
+        session.pending = None
+
+        try:
+            response = task.result()
+        except UpstreamBusy as e:
+            st.warning(f"PetCare Companion is handling a lot of questions right now. "
+                       f"Please try again in about {max(1, round(e.retry_after))} seconds.")
+            return
+        except RequestCancelled as e:
+            if e.reason == "deadline":
+                st.warning("That took too long to answer, so it was stopped. Please try again.")
+            else:
+                st.info("Stopped.")
+            return
+        st.markdown(response)
+
+    # Both turns are already on screen, so no st.rerun() is needed; the next
+    # natural rerun picks them up from the history. A question that was not
+    # answered is not stored, so it can simply be asked again.
+    session.add_messages([
+        {"role": "user", "content": prompt},
+        {"role": "assistant", "content": response}
+    ])
+
+def render_chat_history(session):
+    """Render the most recent chat messages, paging older ones in on demand.
+
+    Only the last ``history_visible`` messages are drawn, so rerun cost stays
+    flat as the conversation grows instead of replaying the whole session.
+    Pages beyond the in-memory window are read from the chat database.
+    """
+    hidden = max(0, session.message_count - st.session_state.history_visible)
+    if hidden:
+        if st.button(f"Show earlier messages ({hidden} hidden)", key="show_earlier_messages"):
+            st.session_state.history_visible += CHAT_HISTORY_WINDOW
+            hidden = max(0, session.message_count - st.session_state.history_visible)
+
+    for message in session.history(session.message_count - hidden):
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
 
 def display_feature_card(title, description):
     """Display a feature card using native Streamlit components."""
@@ -705,21 +838,19 @@ def main():
     # --- Step 1: Initialize Session State ---
     if "system_ready" not in st.session_state:
         st.session_state.system_ready = False
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
     if "selected_pet" not in st.session_state:
         st.session_state.selected_pet = "All species"
-    if "vector_store" not in st.session_state:
-        st.session_state.vector_store = None
+    if "history_visible" not in st.session_state:
+        st.session_state.history_visible = CHAT_HISTORY_WINDOW
+    if "ingestion_jobs" not in st.session_state:
+        st.session_state.ingestion_jobs = []
 
     # --- Step 2: Check API Key and Initialize Backend ONCE ---
     if TOGETHER_API_KEY:
         if not st.session_state.system_ready:
             with st.spinner("Initializing models, please wait..."):
                 try:
-                    embedding_model = EmbeddingModel()
-                    st.session_state.vector_store = VectorStore(embedding_model=embedding_model)
-                    st.session_state.llm = TogetherModel()
+                    get_chat_session()
                     st.session_state.system_ready = True
                     st.toast("System ready!")
                 except Exception as e:
@@ -770,12 +901,10 @@ def main():
             if uploaded_file:
                 st.write(f"File: {uploaded_file.name}")
                 if st.button("Process Document"):
-                    if st.session_state.vector_store:
-                        file_path = save_uploaded_file(uploaded_file)
-                        if file_path:
-                            num_chunks = process_document(file_path, uploaded_file.name)
-                            if num_chunks > 0:
-                                st.success(f"Added {num_chunks} chunks")
+                    if submit_document(uploaded_file) is None:
+                        st.info(f"{uploaded_file.name} is already in the knowledge base")
+
+            render_ingestion_jobs()
 
     # Main content area
     if not st.session_state.system_ready:
@@ -801,21 +930,22 @@ def main():
         </div>
         """, unsafe_allow_html=True)
 
-        if not st.session_state.messages:
-            st.write("Try asking things like: 'What can my cat eat?, 'Why is my dog barking at night?'")
-            col1, col2 = st.columns(2)
-            with col1:
-                with st.container(): st.markdown("### Nutrition"); st.write("Dietary advice and recommendations")
-                with st.container(): st.markdown("### Behavior"); st.write("Training tips and interpreting behavior")
-            with col2:
-                with st.container(): st.markdown("### Health & Wellness"); st.write("Understanding symptoms and care")
-                with st.container(): st.markdown("### Seasonal Care"); st.write("Safety and seasonal advice")
+        # The intro lives in a placeholder so it can be cleared in place when
+        # the first question arrives, without forcing another script rerun.
+        intro_placeholder = st.empty()
+        session = get_chat_session()
+        if not session.message_count and session.pending is None:
+            with intro_placeholder.container():
+                st.write("Try asking things like: 'What can my cat eat?, 'Why is my dog barking at night?'")
+                col1, col2 = st.columns(2)
+                with col1:
+                    with st.container(): st.markdown("### Nutrition"); st.write("Dietary advice and recommendations")
+                    with st.container(): st.markdown("### Behavior"); st.write("Training tips and interpreting behavior")
+                with col2:
+                    with st.container(): st.markdown("### Health & Wellness"); st.write("Understanding symptoms and care")
+                    with st.container(): st.markdown("### Seasonal Care"); st.write("Safety and seasonal advice")
         else:
-            for message in st.session_state.messages:
-                # Your original code used custom markdown for chat messages, 
-                # but st.chat_message is the modern, recommended way.
-                with st.chat_message(message["role"]):
-                    st.markdown(message["content"])
+            render_chat_history(session)
         
         # All of your aggressive CSS and JS for the chat input is placed here
         st.markdown("""
@@ -854,20 +984,17 @@ def main():
         
         # Handle new chat input
         if prompt := st.chat_input(f"Ask about {st.session_state.selected_pet.lower()} care..."):
-            st.session_state.messages.append({"role": "user", "content": prompt})
-            with st.chat_message("user"):
-                st.markdown(prompt)
-
-            with st.chat_message("assistant"):
-                with st.spinner("Thinking..."):
-                    response = generate_response(prompt, response_mode, selected_pet, use_web_search)
-                    st.markdown(response)
-            
-            st.session_state.messages.append({"role": "assistant", "content": response})
-            st.rerun()
+            intro_placeholder.empty()
+            if session.pending is not None:
+                # A new question supersedes one that is still being answered
+                session.pending[1].cancel("stopped")
+            session.pending = (prompt, generate_response(prompt, response_mode, selected_pet, use_web_search))
+
+        if session.pending is not None:
+            render_pending_answer(session)
 
-def load_knowledge_base_documents():
-    """Load and process all text files from the knowledge_base directory."""
+def load_knowledge_base_documents(vector_store):
+    """Load and process all text files from the knowledge_base directory into a vector store."""
     try:
         # Get the knowledge_base directory path
         kb_dir = os.path.join(os.getcwd(), "knowledge_base")
@@ -895,11 +1022,11 @@ def load_knowledge_base_documents():
             document_text = load_document(file_path)
             
             # Chunk document
-            chunks = chunk_text(document_text)
+            chunks = chunk_text(document_text, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP)
             
             if chunks:
                 # Add to vector store
-                st.session_state.vector_store.add_documents(chunks, file_name)
+                vector_store.add_documents(chunks, file_name)
                 processed_count += 1
                 logger.info(f"Processed knowledge base document: {file_name} ({len(chunks)} chunks)")
         
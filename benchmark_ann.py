@@ -0,0 +1,79 @@
+# benchmark_ann.py
+import os
+import time
+import argparse
+import logging
+import numpy as np
+from config.config import FAISS_MEMORY_BUDGET_MB
+from models.embeddings import EmbeddingModel
+from utils.vector_backends import FaissBackend, FAISS_INDEX_TYPES, estimate_index_bytes, select_index_type
+from benchmark_backends import load_corpus
+
+# Configure logging
+logging.basicConfig(level=logging.INFO,
+                   format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SWEEPS = {
+    "flat": [None],
+    "hnsw": [16, 32, 64, 128, 256],
+    "ivf": [1, 4, 16, 64],
+    "ivfpq": [1, 4, 16, 64],
+}
+
+def measure(backend: FaissBackend, queries: np.ndarray, truth: np.ndarray, top_k: int) -> dict:
+    """Recall@k and per-query latency percentiles for one parameter setting."""
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        _, found = backend.search(query.reshape(1, -1), top_k)
+        latencies.append(time.perf_counter() - start)
+        hits += len(set(found[0].tolist()) & set(expected.tolist()))
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "recall": hits / truth.size,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+    }
+
+def main():
+    """Report recall and latency of each FAISS index type on the knowledge base."""
+    parser = argparse.ArgumentParser(description="Compare FAISS index types and search parameters.")
+    parser.add_argument("--kb-dir", default=os.path.join(os.getcwd(), "knowledge_base"))
+    parser.add_argument("--replicate", type=int, default=200,
+                        help="Grow the corpus with jittered copies; ANN only pays off on large corpora")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--memory-budget-mb", type=int, default=FAISS_MEMORY_BUDGET_MB)
+    parser.add_argument("--index-types", nargs="+", default=list(FAISS_INDEX_TYPES))
+    args = parser.parse_args()
+
+    embedding_model = EmbeddingModel()
+    corpus, queries = load_corpus(args.kb_dir, embedding_model, args.replicate)
+    n, dimension = corpus.shape
+    ids = np.arange(n, dtype=np.int64)
+    truth = np.argsort(-(queries @ corpus.T), axis=1)[:, :args.top_k]
+    budget = args.memory_budget_mb * 1024 * 1024
+    logger.info(f"Benchmarking {n} vectors of dimension {dimension} with {len(queries)} queries; "
+                f"auto would select {select_index_type(n, dimension, budget)}")
+
+    print(f"{'index':<6} {'param':>6} {'build s':>8} {'MB':>8} {'recall':>7} {'p50 ms':>8} {'p95 ms':>8}")
+    for index_type in args.index_types:
+        backend = FaissBackend(dimension, index_type="flat")
+        start = time.perf_counter()
+        backend.build(index_type, ids, corpus)
+        build_seconds = time.perf_counter() - start
+        megabytes = estimate_index_bytes(index_type, n, dimension) / (1024 * 1024)
+
+        for param in SWEEPS[index_type]:
+            if index_type == "hnsw":
+                backend.set_search_params(ef_search=param)
+            elif param is not None:
+                backend.set_search_params(nprobe=param)
+            row = measure(backend, queries, truth, args.top_k)
+            label = "-" if param is None else str(param)
+            print(f"{index_type:<6} {label:>6} {build_seconds:>8.2f} {megabytes:>8.1f} "
+                  f"{row['recall']:>7.3f} {row['p50_ms']:>8.3f} {row['p95_ms']:>8.3f}")
+
+if __name__ == "__main__":
+    main()
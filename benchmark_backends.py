@@ -0,0 +1,105 @@
+# benchmark_backends.py
+import os
+import time
+import shutil
+import argparse
+import logging
+import tempfile
+import numpy as np
+from config.config import CHUNK_SIZE, CHUNK_OVERLAP
+from models.embeddings import EmbeddingModel
+from utils.rag_utils import load_document, chunk_text
+from utils.vector_backends import BACKENDS, create_backend, save_backend, load_backend
+
+# Configure logging
+logging.basicConfig(level=logging.INFO,
+                   format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def load_corpus(kb_dir: str, embedding_model: EmbeddingModel, replicate: int):
+    """Embed the knowledge base once and optionally grow it with jittered copies."""
+    chunks = []
+    for file_name in sorted(f for f in os.listdir(kb_dir) if f.endswith('.txt')):
+        chunks.extend(chunk_text(load_document(os.path.join(kb_dir, file_name)),
+                                 chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP))
+    vectors = np.asarray(embedding_model.get_embeddings(chunks), dtype=np.float32)
+    queries = vectors[np.random.default_rng(0).choice(len(vectors), size=min(50, len(vectors)), replace=False)]
+
+    rng = np.random.default_rng(1)
+    copies = [vectors] + [vectors + rng.normal(0, 0.01, vectors.shape).astype(np.float32)
+                          for _ in range(replicate - 1)]
+    corpus = np.concatenate(copies)
+    corpus /= np.linalg.norm(corpus, axis=1, keepdims=True)
+    return corpus, queries
+
+def benchmark_backend(name: str, corpus: np.ndarray, queries: np.ndarray, top_k: int, truth: np.ndarray) -> dict:
+    """Time add, search, save and load for one backend and measure recall@k."""
+    backend = create_backend(name, corpus.shape[1])
+    ids = np.arange(len(corpus), dtype=np.int64)
+
+    start = time.perf_counter()
+    backend.add(corpus, ids)
+    add_seconds = time.perf_counter() - start
+
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        _, found = backend.search(query.reshape(1, -1), top_k)
+        latencies.append(time.perf_counter() - start)
+        hits += len(set(found[0].tolist()) & set(expected.tolist()))
+
+    path = tempfile.mkdtemp(prefix=f"bench-{name}-")
+    try:
+        start = time.perf_counter()
+        save_backend(backend, path)
+        save_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        load_backend(path)
+        load_seconds = time.perf_counter() - start
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "backend": name,
+        "add_s": add_seconds,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "recall": hits / truth.size,
+        "save_s": save_seconds,
+        "load_s": load_seconds,
+        "mb": backend.nbytes() / (1024 * 1024),
+    }
+
+def main():
+    """Run every vector backend on the same corpus and print a comparison table."""
+    parser = argparse.ArgumentParser(description="Compare vector backends on the knowledge base.")
+    parser.add_argument("--kb-dir", default=os.path.join(os.getcwd(), "knowledge_base"))
+    parser.add_argument("--replicate", type=int, default=1,
+                        help="Grow the corpus with this many jittered copies to simulate larger deployments")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS))
+    args = parser.parse_args()
+
+    embedding_model = EmbeddingModel()
+    corpus, queries = load_corpus(args.kb_dir, embedding_model, args.replicate)
+    logger.info(f"Benchmarking {len(corpus)} vectors of dimension {corpus.shape[1]} with {len(queries)} queries")
+
+    # Exact top-k as ground truth for recall
+    truth = np.argsort(-(queries @ corpus.T), axis=1)[:, :args.top_k]
+
+    rows = []
+    for name in args.backends:
+        try:
+            rows.append(benchmark_backend(name, corpus, queries, args.top_k, truth))
+        except ImportError as e:
+            logger.warning(f"Skipping {name}: {str(e)}")
+
+    print(f"{'backend':<8} {'add s':>8} {'p50 ms':>8} {'p95 ms':>8} {'recall':>7} {'save s':>8} {'load s':>8} {'MB':>8}")
+    for row in rows:
+        print(f"{row['backend']:<8} {row['add_s']:>8.3f} {row['p50_ms']:>8.3f} {row['p95_ms']:>8.3f} "
+              f"{row['recall']:>7.3f} {row['save_s']:>8.3f} {row['load_s']:>8.3f} {row['mb']:>8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# benchmark_compression.py
+import os
+import time
+import argparse
+import logging
+import itertools
+import numpy as np
+from models.embeddings import EmbeddingModel
+from utils.rag_utils import VectorStore
+from utils.vector_backends import QUANTIZATIONS, estimate_index_bytes
+from benchmark_backends import load_corpus
+
+# Configure logging
+logging.basicConfig(level=logging.INFO,
+                   format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def build_store(corpus: np.ndarray, reduction: str, dimension: int, quantization: str,
+                rescore_factor: int) -> VectorStore:
+    """Index the corpus in a compressed store; chunk texts are the row numbers."""
+    store = VectorStore(None, backend="faiss", reduction=reduction, reduced_dimension=dimension,
+                        quantization=quantization, rescore_factor=rescore_factor)
+    store.add_embeddings([str(i) for i in range(len(corpus))], corpus, "corpus")
+    return store
+
+def measure(store: VectorStore, queries: np.ndarray, truth: np.ndarray, top_k: int) -> dict:
+    """Recall@k against exact float32 search and per-query latency percentiles."""
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        results = store.search_by_vector(query, top_k=top_k)
+        latencies.append(time.perf_counter() - start)
+        found = {int(text.rsplit(": ", 1)[1]) for text, _ in results}
+        hits += len(found & set(expected.tolist()))
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "recall": hits / truth.size,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+    }
+
+def main():
+    """Report recall loss, memory and latency of embedding compression settings."""
+    parser = argparse.ArgumentParser(description="Compare dimensionality reduction and quantization settings.")
+    parser.add_argument("--kb-dir", default=os.path.join(os.getcwd(), "knowledge_base"))
+    parser.add_argument("--replicate", type=int, default=50,
+                        help="Grow the corpus with jittered copies; PCA needs at least 1000 vectors")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--reductions", nargs="+", default=["none", "truncate", "pca"])
+    parser.add_argument("--dimensions", nargs="+", type=int, default=[512, 256, 128])
+    parser.add_argument("--quantizations", nargs="+", default=list(QUANTIZATIONS))
+    parser.add_argument("--rescore-factors", nargs="+", type=int, default=[0, 4])
+    args = parser.parse_args()
+
+    embedding_model = EmbeddingModel()
+    corpus, queries = load_corpus(args.kb_dir, embedding_model, args.replicate)
+    n, full_dimension = corpus.shape
+    truth = np.argsort(-(queries @ corpus.T), axis=1)[:, :args.top_k]
+    logger.info(f"Benchmarking {n} vectors of dimension {full_dimension} with {len(queries)} queries")
+
+    settings = []
+    for reduction in args.reductions:
+        dimensions = [full_dimension] if reduction == "none" else args.dimensions
+        for dimension, quantization, rescore_factor in itertools.product(
+                dimensions, args.quantizations, args.rescore_factors):
+            if reduction == "none" and quantization == "float32" and rescore_factor:
+                continue  # nothing to re-score
+            settings.append((reduction, dimension, quantization, rescore_factor))
+
+    baseline_bytes = estimate_index_bytes("flat", n, full_dimension)
+    print(f"{'reduction':<9} {'dim':>5} {'quant':>8} {'rescore':>7} {'build s':>8} {'MB':>8} "
+          f"{'smaller':>7} {'disk MB':>8} {'recall':>7} {'p50 ms':>8} {'p95 ms':>8}")
+    for reduction, dimension, quantization, rescore_factor in settings:
+        start = time.perf_counter()
+        store = build_store(corpus, reduction, dimension, quantization, rescore_factor)
+        build_seconds = time.perf_counter() - start
+        index_bytes = store.backend.nbytes()
+        disk_bytes = store.originals.nbytes() if store.originals is not None else 0
+        row = measure(store, queries, truth, args.top_k)
+        print(f"{reduction:<9} {dimension:>5} {quantization:>8} {rescore_factor or '-':>7} "
+              f"{build_seconds:>8.2f} {index_bytes / (1024 * 1024):>8.1f} "
+              f"{baseline_bytes / index_bytes:>6.1f}x {disk_bytes / (1024 * 1024):>8.1f} {row['recall']:>7.3f} "
+              f"{row['p50_ms']:>8.3f} {row['p95_ms']:>8.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# build_index.py
+import os
+import argparse
+import logging
+from config.config import INDEX_ARTIFACT_DIR, CHUNK_SIZE, CHUNK_OVERLAP
+from models.embeddings import EmbeddingModel
+from utils.index_artifacts import build_artifact, prune_versions
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, 
+                   format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def main():
+    """Build a versioned index artifact from the knowledge base and publish it."""
+    parser = argparse.ArgumentParser(description="Build a versioned PetCare Companion index artifact.")
+    parser.add_argument("--kb-dir", default=os.path.join(os.getcwd(), "knowledge_base"),
+                        help="Knowledge base directory")
+    parser.add_argument("--output-dir", default=INDEX_ARTIFACT_DIR,
+                        help="Directory holding artifact versions")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--overlap", type=int, default=CHUNK_OVERLAP)
+    parser.add_argument("--no-publish", action="store_true",
+                        help="Build without pointing CURRENT at the new version")
+    parser.add_argument("--keep", type=int, default=3,
+                        help="Number of versions to keep on disk")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.kb_dir):
+        logger.error(f"Knowledge base directory not found: {args.kb_dir}")
+        return
+
+    embedding_model = EmbeddingModel()
+    version = build_artifact(
+        args.kb_dir,
+        args.output_dir,
+        embedding_model,
+        chunk_size=args.chunk_size,
+        overlap=args.overlap,
+        publish=not args.no_publish
+    )
+    prune_versions(args.output_dir, keep=args.keep)
+    logger.info(f"Index artifact {version} written to {args.output_dir}")
+
+if __name__ == "__main__":
+    main()
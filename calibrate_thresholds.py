@@ -0,0 +1,46 @@
+# calibrate_thresholds.py
+import os
+import argparse
+import logging
+import numpy as np
+from config.config import CHUNK_SIZE, CHUNK_OVERLAP, EMBEDDING_MODEL_NAME
+from models.embeddings import EmbeddingModel
+from utils.rag_utils import VectorStore, load_document, chunk_text
+from utils.index_artifacts import knowledge_base_files
+from utils.score_calibration import calibrate
+
+# Configure logging
+logging.basicConfig(level=logging.INFO,
+                   format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def main():
+    """Print the probe score distributions and the thresholds derived from them."""
+    parser = argparse.ArgumentParser(description="Measure retrieval similarity scores and derive relevance thresholds.")
+    parser.add_argument("--kb-dir", default=os.path.join(os.getcwd(), "knowledge_base"))
+    args = parser.parse_args()
+
+    embedding_model = EmbeddingModel()
+    store = VectorStore(embedding_model)
+    for file_name in knowledge_base_files(args.kb_dir):
+        chunks = chunk_text(load_document(os.path.join(args.kb_dir, file_name)),
+                            chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP)
+        store.add_documents(chunks, file_name)
+    logger.info(f"Indexed {len(store)} chunks with {EMBEDDING_MODEL_NAME}")
+
+    thresholds = calibrate(store, embedding_model)
+    if not thresholds.measured:
+        print("All thresholds are set in the environment; unset them to calibrate.")
+        return
+
+    print(f"\n{'probes':<10} {'n':>3} {'min':>6} {'p25':>6} {'median':>6} {'p75':>6} {'max':>6}")
+    for group, scores in thresholds.measured.items():
+        p25, median, p75 = np.percentile(scores, [25, 50, 75])
+        print(f"{group:<10} {len(scores):>3} {min(scores):>6.3f} {p25:>6.3f} {median:>6.3f} "
+              f"{p75:>6.3f} {max(scores):>6.3f}")
+    print(f"\nWEB_SEARCH_SCORE_THRESHOLD={thresholds.web_search:.3f}")
+    print(f"CONTEXT_MIN_SCORE={thresholds.context_min:.3f}")
+    print(f"ROUTER_CONFIDENCE_THRESHOLD={thresholds.router:.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 import os
 import logging
 import streamlit as st
-from typing import Tuple
+from typing import Any, Dict, Tuple
 # load_dotenv is only needed for local development
 from dotenv import load_dotenv
 
@@ -39,23 +39,194 @@ if not TAVILY_API_KEY:
 
 # Embedding Model Settings
 EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "BAAI/bge-large-en-v1.5")
+# Run the embedding model in a separate process that micro-batches concurrent requests
+EMBEDDING_SERVICE_ENABLED = os.getenv("EMBEDDING_SERVICE_ENABLED", "false").lower() == "true"
+EMBEDDING_BATCH_WINDOW_MS = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5"))
+EMBEDDING_MAX_BATCH = int(os.getenv("EMBEDDING_MAX_BATCH", "64"))
 
 # App Settings
 APP_TITLE = os.getenv("APP_TITLE", "PetCare Companion")
 
+# Chat history settings: number of most recent messages rendered per page
+CHAT_HISTORY_WINDOW = int(os.getenv("CHAT_HISTORY_WINDOW", "20"))
+# Chat sessions are persisted in SQLite; only the last CHAT_HISTORY_WINDOW
+# messages of active sessions stay in memory, and sessions idle for
+# SESSION_IDLE_SECONDS are evicted (and rehydrated from disk on return)
+CHAT_DB_PATH = os.getenv("CHAT_DB_PATH", os.path.join(".cache", "chat_sessions.db"))
+SESSION_IDLE_SECONDS = float(os.getenv("SESSION_IDLE_SECONDS", "600"))
+SESSION_SWEEP_SECONDS = float(os.getenv("SESSION_SWEEP_SECONDS", "60"))
+CHAT_RETENTION_DAYS = float(os.getenv("CHAT_RETENTION_DAYS", "30"))
+
 # LLM Settings
 LLM_MODEL = "meta-llama/Llama-3.3-70B-Instruct-Turbo-Free"
+TOGETHER_BASE_URL = os.getenv("TOGETHER_BASE_URL", "https://api.together.xyz/v1")
+TAVILY_API_URL = os.getenv("TAVILY_API_URL", "https://api.tavily.com/search")
+# Longest a Tavily search may take; a request's own deadline can shorten it
+TAVILY_TIMEOUT = float(os.getenv("TAVILY_TIMEOUT", "10"))
+# Retries inside the Together SDK; kept low so 429s reach ModelRouter's
+# fallback instead of being retried into an already overloaded upstream
+TOGETHER_MAX_RETRIES = int(os.getenv("TOGETHER_MAX_RETRIES", "1"))
+
+# Admission control for upstream APIs, shared by every session in the process.
+# Requests per minute of 0 disables the rate limit. Callers wait at most
+# ADMISSION_QUEUE_TIMEOUT seconds, ADMISSION_MAX_QUEUE at a time, before the
+# UI reports that the assistant is busy.
+TOGETHER_MAX_CONCURRENCY = int(os.getenv("TOGETHER_MAX_CONCURRENCY", "8"))
+TOGETHER_REQUESTS_PER_MINUTE = float(os.getenv("TOGETHER_REQUESTS_PER_MINUTE", "60"))
+TAVILY_MAX_CONCURRENCY = int(os.getenv("TAVILY_MAX_CONCURRENCY", "4"))
+TAVILY_REQUESTS_PER_MINUTE = float(os.getenv("TAVILY_REQUESTS_PER_MINUTE", "60"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "32"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10"))
+
+# Chat answers are generated by background tasks that the page polls. A task
+# and its upstream HTTP request are aborted when the user presses Stop, after
+# GENERATION_TIMEOUT seconds, or when no page has polled it for
+# GENERATION_ABANDON_SECONDS (the tab was closed).
+GENERATION_TIMEOUT = float(os.getenv("GENERATION_TIMEOUT", "90"))
+GENERATION_ABANDON_SECONDS = float(os.getenv("GENERATION_ABANDON_SECONDS", "15"))
+GENERATION_WORKERS = int(os.getenv("GENERATION_WORKERS", "16"))
+
+# Clear "can my pet eat X?" and first-aid questions are answered straight from
+# a structured index of the knowledge base, skipping web search and the LLM
+SAFETY_FAST_PATH_ENABLED = os.getenv("SAFETY_FAST_PATH_ENABLED", "true").lower() == "true"
+
+# Model cascade: simple, well-grounded queries go to the fast model first
+LLM_FAST_MODEL = os.getenv("LLM_FAST_MODEL", "meta-llama/Meta-Llama-3.1-8B-Instruct-Turbo")
+LLM_ROUTER_ENABLED = os.getenv("LLM_ROUTER_ENABLED", "true").lower() == "true"
+# Minimum best retrieval score for the fast model; calibrated with the
+# relevance thresholds below unless set here
+ROUTER_CONFIDENCE_THRESHOLD = (float(os.environ["ROUTER_CONFIDENCE_THRESHOLD"])
+                               if os.getenv("ROUTER_CONFIDENCE_THRESHOLD") else None)
+ROUTER_MAX_SIMPLE_WORDS = int(os.getenv("ROUTER_MAX_SIMPLE_WORDS", "20"))
+ROUTER_RATE_LIMIT_COOLDOWN = float(os.getenv("ROUTER_RATE_LIMIT_COOLDOWN", "30"))
 
 # Vector DB Settings
 VECTOR_DIMENSION = 1024  # BGE-large dimension
 COLLECTION_NAME = "documents"
+# Chunker parameters (recorded in index artifact manifests)
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
+# Versioned index artifacts built offline by build_index.py; when one is
+# published here the app serves it and hot-reloads newer versions
+INDEX_ARTIFACT_DIR = os.getenv("INDEX_ARTIFACT_DIR", os.path.join("vector_store", "artifacts"))
+INDEX_RELOAD_SECONDS = float(os.getenv("INDEX_RELOAD_SECONDS", "30"))
+# Vector backend for in-process stores: "faiss" (exact, default), "numpy"
+# (exact, no native dependency) or "chroma" (HNSW, requires chromadb).
+# Compare them on your corpus with benchmark_backends.py.
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "faiss")
+# FAISS index structure: "flat" (exact), "hnsw", "ivf", "ivfpq", or "auto" to
+# choose from corpus size and FAISS_MEMORY_BUDGET_MB. Compare them with
+# benchmark_ann.py before changing the defaults.
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+FAISS_MEMORY_BUDGET_MB = int(os.getenv("FAISS_MEMORY_BUDGET_MB", "1024"))
+FAISS_AUTO_MIN_ANN = int(os.getenv("FAISS_AUTO_MIN_ANN", "20000"))  # "auto" stays exact below this
+FAISS_NLIST = int(os.getenv("FAISS_NLIST", "0"))  # IVF lists; 0 = about 4 * sqrt(n)
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+FAISS_PQ_M = int(os.getenv("FAISS_PQ_M", "0"))  # PQ sub-quantizers; 0 = dimension / 16
+FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+FAISS_EF_CONSTRUCTION = int(os.getenv("FAISS_EF_CONSTRUCTION", "80"))
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))
+FAISS_TRAIN_SAMPLE = int(os.getenv("FAISS_TRAIN_SAMPLE", "50000"))
+# Compression of stored embeddings in VectorStore; compare settings with
+# benchmark_compression.py. VECTOR_REDUCTION is "none", "truncate" (keep the
+# first VECTOR_REDUCED_DIMENSION components) or "pca"; VECTOR_QUANTIZATION is
+# "float32", "float16" or "int8" (FAISS backend only). When compressing, the
+# original vectors are kept on disk in VECTOR_ORIGINALS_DIR and the best
+# VECTOR_RESCORE_FACTOR * top_k candidates are re-scored exactly (0 disables).
+VECTOR_REDUCTION = os.getenv("VECTOR_REDUCTION", "none")
+VECTOR_REDUCED_DIMENSION = int(os.getenv("VECTOR_REDUCED_DIMENSION", "256"))
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "float32")
+VECTOR_RESCORE_FACTOR = int(os.getenv("VECTOR_RESCORE_FACTOR", "4"))
+VECTOR_ORIGINALS_DIR = os.getenv("VECTOR_ORIGINALS_DIR", os.path.join(".cache", "vectors"))
+# Chunk text storage: "" keeps texts uncompressed, "zstd" compresses them in
+# blocks (requires the optional zstandard package)
+CHUNK_COMPRESSION = os.getenv("CHUNK_COMPRESSION", "")
+# Sharded search for large corpora: 1 keeps a single flat index
+VECTOR_SHARDS = int(os.getenv("VECTOR_SHARDS", "1"))
+VECTOR_SHARD_KEY = os.getenv("VECTOR_SHARD_KEY", "source")  # "source", "species" or "chunk"
+VECTOR_SEARCH_WORKERS = int(os.getenv("VECTOR_SEARCH_WORKERS", "0")) or None  # default: one per shard
+# Optional memory-mapped copy of the knowledge base index shared by all worker
+# processes on a host; the first process to start writes it, the rest map it.
+VECTOR_STORE_MMAP_PATH = os.getenv("VECTOR_STORE_MMAP_PATH", "")
+
+# Per-user upload overlays layered on the shared knowledge base index
+OVERLAY_MAX_BYTES = int(os.getenv("OVERLAY_MAX_BYTES", str(32 * 1024 * 1024)))
+OVERLAY_MAX_RESIDENT = int(os.getenv("OVERLAY_MAX_RESIDENT", "50"))
+OVERLAY_IDLE_SECONDS = float(os.getenv("OVERLAY_IDLE_SECONDS", "900"))
+OVERLAY_SPILL_DIR = os.getenv("OVERLAY_SPILL_DIR", os.path.join("vector_store", "overlays"))
+# Spilled overlays of sessions that never come back are deleted after this long
+OVERLAY_RETENTION_DAYS = float(os.getenv("OVERLAY_RETENTION_DAYS", str(CHAT_RETENTION_DAYS)))
+
+# Document ingestion settings (background worker pool shared by all sessions)
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "2"))
+INGESTION_EMBED_BATCH_SIZE = int(os.getenv("INGESTION_EMBED_BATCH_SIZE", "32"))
+
+# Extractive context compression: retrieved chunks and web pages are cut down
+# to the sentences most similar to the question (see each profile's
+# context_sentences) before they are sent to the LLM
+CONTEXT_COMPRESSION_ENABLED = os.getenv("CONTEXT_COMPRESSION_ENABLED", "true").lower() == "true"
+COMPRESSION_MIN_SCORE = float(os.getenv("COMPRESSION_MIN_SCORE", "0.0"))
+
+# Per-request profiling, off by default. Requests are profiled when
+# PROFILING_ENABLED is true, at random with PROFILE_SAMPLE_RATE (0-1), or when
+# the app is opened with ?profile=1. PROFILER is "cprofile" or "sampling"
+# (requires pyinstrument). Summarize the files with profile_summary.py.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILER = os.getenv("PROFILER", "cprofile")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+# Retrieval relevance gating on cosine similarity. Unless set here, both
+# thresholds are measured at startup by running probe questions against the
+# knowledge base index (utils/score_calibration.py), so they follow
+# EMBEDDING_MODEL_NAME and the KB; calibrate_thresholds.py prints the scores.
+WEB_SEARCH_SCORE_THRESHOLD = (float(os.environ["WEB_SEARCH_SCORE_THRESHOLD"])  # search the web below this
+                              if os.getenv("WEB_SEARCH_SCORE_THRESHOLD") else None)
+CONTEXT_MIN_SCORE = (float(os.environ["CONTEXT_MIN_SCORE"])  # drop local chunks below this
+                     if os.getenv("CONTEXT_MIN_SCORE") else None)
+
+# Web page enrichment: full text of the top search results, fetched concurrently
+WEB_FETCH_TOP_N = int(os.getenv("WEB_FETCH_TOP_N", "2"))  # 0 uses Tavily snippets only
+WEB_FETCH_TIMEOUT = float(os.getenv("WEB_FETCH_TIMEOUT", "4"))
+WEB_FETCH_MAX_BYTES = int(os.getenv("WEB_FETCH_MAX_BYTES", str(512 * 1024)))
+WEB_FETCH_MAX_CONNECTIONS = int(os.getenv("WEB_FETCH_MAX_CONNECTIONS", "20"))
+WEB_FETCH_CACHE_DIR = os.getenv("WEB_FETCH_CACHE_DIR", os.path.join(".cache", "web_pages"))
 
 # Response settings
+# Each response mode is a full generation profile, applied end to end:
+#   instruction    appended to the system message
+#   max_tokens     completion budget requested from the model
+#   temperature    sampling temperature
+#   top_k          chunks retrieved from the vector store
+#   context_chars  total characters of retrieved/web context sent in the prompt
+#   model          Together model that serves the mode; None uses LLM_MODEL
 RESPONSE_MODES = {
-    "concise": "Provide a short, summarized answer",
-    "detailed": "Provide a detailed, comprehensive explanation"
+    "concise": {
+        "description": "Provide a short, summarized answer",
+        "instruction": "Keep your responses brief and to the point.",
+        "max_tokens": int(os.getenv("CONCISE_MAX_TOKENS", "300")),
+        "temperature": 0.5,
+        "top_k": int(os.getenv("CONCISE_TOP_K", "3")),
+        "context_chars": int(os.getenv("CONCISE_CONTEXT_CHARS", "2500")),
+        "context_sentences": int(os.getenv("CONCISE_CONTEXT_SENTENCES", "6")),
+        "model": os.getenv("CONCISE_LLM_MODEL") or None,
+    },
+    "detailed": {
+        "description": "Provide a detailed, comprehensive explanation",
+        "instruction": "Provide detailed and comprehensive responses.",
+        "max_tokens": int(os.getenv("DETAILED_MAX_TOKENS", "1000")),
+        "temperature": 0.7,
+        "top_k": int(os.getenv("DETAILED_TOP_K", "5")),
+        "context_chars": int(os.getenv("DETAILED_CONTEXT_CHARS", "8000")),
+        "context_sentences": int(os.getenv("DETAILED_CONTEXT_SENTENCES", "16")),
+        "model": os.getenv("DETAILED_LLM_MODEL") or None,
+    },
 }
 
+def get_response_profile(response_mode: str) -> Dict[str, Any]:
+    """Return the generation profile for a response mode (detailed if unknown)."""
+    return RESPONSE_MODES.get(response_mode, RESPONSE_MODES["detailed"])
+
 # Pet species options
 PET_SPECIES = [
     "All species",
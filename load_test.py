@@ -0,0 +1,230 @@
+# load_test.py
+import os
+import gc
+import time
+import uuid
+import shutil
+import hashlib
+import argparse
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+import numpy as np
+from utils.mock_servers import MockTogetherServer, MockTavilyServer
+
+# Configure logging
+logging.basicConfig(level=logging.WARNING,
+                   format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+QUERIES = [
+    "What should I feed my puppy?",
+    "How often should I take my cat to the vet?",
+    "Is chocolate dangerous for dogs?",
+    "How do I set up a hamster cage?",
+    "Why is my rabbit not eating hay?",
+    "What vaccines does a kitten need?",
+    "How much exercise does a border collie need each day?",
+    "Can parrots eat avocado?",
+    "Explain the difference between wet and dry cat food",
+    "How do I trim my dog's nails safely?",
+]
+
+STAGES = ["fast_path", "retrieval", "web_search", "web_fetch", "compression", "generation", "total"]
+
+class HashingEmbeddingModel:
+    """Deterministic bag-of-words embeddings for load tests without the BGE model.
+
+    Much cheaper than the real model, so use it to measure everything but
+    embedding cost, or when the model is not cached locally.
+    """
+
+    def __init__(self, dimension: int = 1024):
+        self.dimension = dimension
+
+    def get_embeddings(self, texts) -> np.ndarray:
+        if isinstance(texts, str):
+            texts = [texts]
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                digest = hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest()
+                vectors[row, int.from_bytes(digest, 'little') % self.dimension] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.get_embeddings(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.get_embeddings(text)[0].tolist()
+
+def rss_bytes() -> int:
+    """Current resident set size of this process."""
+    try:
+        with open("/proc/self/statm", 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # Peak rather than current RSS on platforms without /proc (KiB on Linux, bytes on macOS)
+        import resource
+        import sys
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if sys.platform == "darwin" else usage * 1024
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """p50/p95/p99 and mean of latencies in seconds, reported in milliseconds."""
+    data = np.array(values) * 1000
+    return {
+        "n": len(data),
+        "mean": float(data.mean()),
+        "p50": float(np.percentile(data, 50)),
+        "p95": float(np.percentile(data, 95)),
+        "p99": float(np.percentile(data, 99)),
+    }
+
+def main():
+    """Simulate concurrent chat sessions against local Together and Tavily stand-ins."""
+    parser = argparse.ArgumentParser(description="Offline load test of the PetCare Companion pipeline.")
+    parser.add_argument("--sessions", type=int, default=10, help="Concurrent chat sessions")
+    parser.add_argument("--queries", type=int, default=5, help="Questions asked per session")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Seconds between a session's questions")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="Seconds over which sessions start")
+    parser.add_argument("--response-mode", default="concise")
+    parser.add_argument("--web-search", choices=["auto", "always", "never"], default="auto",
+                        help="auto uses the calibrated WEB_SEARCH_SCORE_THRESHOLD")
+    parser.add_argument("--embeddings", choices=["model", "hashing"], default="model",
+                        help="hashing avoids loading the BGE model")
+    parser.add_argument("--ttft", type=float, default=0.3, help="Mock Together time to first token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--response-tokens", type=int, default=200)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of LLM requests answered 429")
+    parser.add_argument("--tavily-latency", type=float, default=0.5)
+    parser.add_argument("--page-latency", type=float, default=0.2)
+    parser.add_argument("--fast-path", action="store_true",
+                        help="Answer toxicity and first-aid questions from the safety index")
+    parser.add_argument("--kb-dir", default=os.path.join(os.getcwd(), "knowledge_base"))
+    args = parser.parse_args()
+
+    together = MockTogetherServer(ttft=args.ttft, tokens_per_second=args.tokens_per_second,
+                                  response_tokens=args.response_tokens,
+                                  rate_limit_rate=args.rate_limit_rate, seed=0).start()
+    tavily = MockTavilyServer(latency=args.tavily_latency, page_latency=args.page_latency).start()
+    spill_dir = tempfile.mkdtemp(prefix="load-test-overlays-")
+
+    # Configuration is read at import time, so the app modules are imported
+    # only once the stand-ins' URLs are in the environment
+    os.environ.update({
+        "TOGETHER_BASE_URL": f"{together.url}/v1",
+        "TOGETHER_API_KEY": "load-test",
+        "TAVILY_API_URL": f"{tavily.url}/search",
+        "TAVILY_API_KEY": "load-test",
+        "WEB_FETCH_CACHE_DIR": "",
+    })
+    if args.web_search == "always":
+        os.environ["WEB_SEARCH_SCORE_THRESHOLD"] = "2.0"
+    from config.config import CHUNK_SIZE, CHUNK_OVERLAP
+    from models.llm import TogetherModel, ModelRouter
+    from utils.rag_utils import VectorStore, load_document, chunk_text
+    from utils.overlay_store import OverlayManager, LayeredVectorStore
+    from utils.pipeline import answer_query
+    from utils.web_search import get_page_fetcher
+    from utils.admission import UpstreamBusy
+    from utils.safety_index import SafetyIndex
+    from utils.score_calibration import calibrate
+
+    if args.embeddings == "hashing":
+        embedding_model = HashingEmbeddingModel()
+    else:
+        from models.embeddings import EmbeddingModel
+        embedding_model = EmbeddingModel()
+
+    base = VectorStore(embedding_model)
+    for file_name in sorted(f for f in os.listdir(args.kb_dir) if f.endswith('.txt')):
+        chunks = chunk_text(load_document(os.path.join(args.kb_dir, file_name)),
+                            chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP)
+        base.add_documents(chunks, file_name)
+    overlays = OverlayManager(embedding_model, spill_dir=spill_dir)
+    use_web_search = args.web_search != "never"
+    safety_index = SafetyIndex.from_knowledge_base(args.kb_dir) if args.fast_path else None
+    score_thresholds = calibrate(base, embedding_model)
+
+    samples: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    errors = []
+    busy = []
+    samples_lock = threading.Lock()
+
+    def ask(store, llm, query: str) -> str:
+        timings: Dict[str, float] = {}
+        start = time.perf_counter()
+        try:
+            response = answer_query(query, args.response_mode, "All species", store, llm,
+                                    use_web_search=use_web_search, timings=timings,
+                                    embedding_model=embedding_model, safety_index=safety_index,
+                                    score_thresholds=score_thresholds)
+        except UpstreamBusy as e:
+            with samples_lock:
+                busy.append(time.perf_counter() - start)
+            return str(e)
+        timings["total"] = time.perf_counter() - start
+        with samples_lock:
+            for stage, seconds in timings.items():
+                samples[stage].append(seconds)
+            if response.startswith(("I encountered an error", "All models are currently rate limited")):
+                errors.append(response)
+        return response
+
+    def run_session(index: int) -> List[Dict[str, str]]:
+        time.sleep(args.ramp_up * index / max(1, args.sessions))
+        # What a Streamlit session holds: its layered store, its client and its history
+        store = LayeredVectorStore(base, overlays, uuid.uuid4().hex)
+        llm = ModelRouter(TogetherModel())
+        messages = []
+        for i in range(args.queries):
+            query = QUERIES[(index + i) % len(QUERIES)]
+            messages.append({"role": "user", "content": query})
+            messages.append({"role": "assistant", "content": ask(store, llm, query)})
+            if args.think_time:
+                time.sleep(args.think_time)
+        return messages
+
+    # Warm up connection pools and lazy singletons outside the measurement
+    ask(base, ModelRouter(TogetherModel()), QUERIES[0])
+    for stage in samples:
+        samples[stage].clear()
+    errors.clear()
+    busy.clear()
+    gc.collect()
+    rss_before = rss_bytes()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+        histories = list(pool.map(run_session, range(args.sessions)))
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    rss_after = rss_bytes()
+
+    total_queries = len(samples["total"])
+    print(f"\nSessions: {args.sessions}  queries: {total_queries}  wall time: {elapsed:.2f}s  "
+          f"throughput: {total_queries / elapsed:.2f} queries/s  errors: {len(errors)}  "
+          f"rejected as busy: {len(busy)}")
+    print(f"Mock Together: {together.stats}  mock Tavily: {tavily.stats}")
+    print(f"\n{'stage':<12} {'n':>5} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for stage in STAGES:
+        if samples[stage]:
+            row = percentiles(samples[stage])
+            print(f"{stage:<12} {row['n']:>5} {row['mean']:>9.1f} {row['p50']:>9.1f} "
+                  f"{row['p95']:>9.1f} {row['p99']:>9.1f}")
+    growth = rss_after - rss_before
+    print(f"\nRSS: {rss_before / 2**20:.1f} MiB -> {rss_after / 2**20:.1f} MiB "
+          f"({growth / 2**20:+.1f} MiB, {growth / max(1, len(histories)) / 2**10:+.1f} KiB per session)")
+
+    get_page_fetcher().close()
+    together.stop()
+    tavily.stop()
+    shutil.rmtree(spill_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
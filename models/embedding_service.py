@@ -0,0 +1,174 @@
+# models/embedding_service.py
+
+import time
+import queue
+import logging
+import itertools
+import threading
+import multiprocessing as mp
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Union
+import numpy as np
+from langchain.embeddings.base import Embeddings
+from config.config import EMBEDDING_MODEL_NAME
+
+logger = logging.getLogger(__name__)
+
+def _serve(model_name: str, requests, responses, batch_window: float, max_batch: int) -> None:
+    """Worker process loop: gather requests briefly, encode them in one batch."""
+    from models.embeddings import EmbeddingModel
+    try:
+        model = EmbeddingModel(model_name)
+    except Exception as e:
+        responses.put((None, e))
+        return
+    responses.put((None, model.dimension))
+
+    while True:
+        item = requests.get()
+        if item is None:
+            break
+        batch = [item]
+        size = len(item[1])
+        deadline = time.monotonic() + batch_window
+        stop = False
+        # Collect whatever else arrives within the window, up to max_batch texts
+        while size < max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                stop = True
+                break
+            batch.append(item)
+            size += len(item[1])
+
+        texts = [text for _, request_texts in batch for text in request_texts]
+        try:
+            embeddings = model.get_embeddings(texts)
+            start = 0
+            for request_id, request_texts in batch:
+                responses.put((request_id, embeddings[start:start + len(request_texts)]))
+                start += len(request_texts)
+        except Exception as e:
+            for request_id, _ in batch:
+                responses.put((request_id, e))
+        if stop:
+            break
+
+class EmbeddingService:
+    """Embedding model hosted in a dedicated worker process.
+
+    Requests from every session thread are sent over one queue. The worker
+    waits up to ``batch_window_ms`` for more requests to arrive and encodes
+    them all in a single batched ``encode`` call, so under concurrent load
+    throughput rises and the Streamlit process no longer contends with
+    torch for the GIL. Results come back on a response queue and are routed
+    to the waiting callers by a dispatcher thread.
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME, batch_window_ms: float = 5.0,
+                 max_batch: int = 64, startup_timeout: float = 300.0):
+        """Start the worker process and wait for the model to load.
+
+        Args:
+            model_name: Sentence-transformers model to load in the worker
+            batch_window_ms: How long the worker waits to fill a batch
+            max_batch: Maximum texts encoded per batch
+            startup_timeout: Seconds to wait for the model to load
+        """
+        context = mp.get_context("spawn")
+        self._requests = context.Queue()
+        self._responses = context.Queue()
+        self._pending: Dict[int, Future] = {}
+        self._pending_lock = threading.Lock()
+        self._ids = itertools.count()
+        self._process = context.Process(
+            target=_serve,
+            args=(model_name, self._requests, self._responses, batch_window_ms / 1000.0, max_batch),
+            name="embedding-service",
+            daemon=True,
+        )
+        self._process.start()
+
+        try:
+            _, ready = self._responses.get(timeout=startup_timeout)
+        except queue.Empty:
+            self._process.terminate()
+            raise Exception("Embedding service did not start in time")
+        if isinstance(ready, Exception):
+            raise Exception(f"Failed to load embedding model: {ready}")
+        self.dimension = ready
+
+        self._dispatcher = threading.Thread(target=self._dispatch, name="embedding-dispatch", daemon=True)
+        self._dispatcher.start()
+        logger.info(f"Embedding service started (pid {self._process.pid})")
+
+    def _dispatch(self) -> None:
+        while True:
+            try:
+                request_id, result = self._responses.get()
+            except (EOFError, OSError):
+                break
+            if request_id is None:
+                break
+            with self._pending_lock:
+                future = self._pending.pop(request_id, None)
+            if future is None:
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def submit(self, texts: List[str]) -> Future:
+        """Queue texts for embedding and return a Future for the array."""
+        future: Future = Future()
+        request_id = next(self._ids)
+        with self._pending_lock:
+            self._pending[request_id] = future
+        self._requests.put((request_id, list(texts)))
+        return future
+
+    def embed(self, texts: List[str], timeout: Optional[float] = 60.0) -> np.ndarray:
+        """Embed texts, blocking until the worker returns them."""
+        if not self._process.is_alive():
+            raise Exception("Embedding service process is not running")
+        return self.submit(texts).result(timeout=timeout)
+
+    def close(self) -> None:
+        """Stop the worker process and the dispatcher."""
+        self._requests.put(None)
+        self._process.join(timeout=10)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._responses.put((None, None))
+
+class RemoteEmbeddingModel(Embeddings):
+    """Drop-in replacement for ``EmbeddingModel`` backed by an ``EmbeddingService``."""
+
+    def __init__(self, service: EmbeddingService):
+        self.service = service
+        self.dimension = service.dimension
+
+    def get_embeddings(self, texts: Union[str, List[str]]) -> np.ndarray:
+        """Embed texts through the shared service."""
+        try:
+            if isinstance(texts, str):
+                texts = [texts]
+            return self.service.embed(texts)
+        except Exception as e:
+            raise Exception(f"Error generating embeddings: {e}")
+
+    # --- Methods for LangChain Compatibility ---
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """For LangChain: embeds a list of documents."""
+        return self.get_embeddings(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """For LangChain: embeds a single query string."""
+        return self.get_embeddings(text)[0].tolist()
@@ -1,10 +1,80 @@
+import re
+import time
 import logging
+import threading
+import aiohttp
 from typing import List, Dict, Any, Optional, Tuple
-from config.config import TOGETHER_API_KEY, LLM_MODEL
+from config.config import (TOGETHER_API_KEY, TOGETHER_BASE_URL, TOGETHER_MAX_RETRIES, LLM_MODEL, LLM_FAST_MODEL, LLM_ROUTER_ENABLED,
+                           ROUTER_CONFIDENCE_THRESHOLD, ROUTER_MAX_SIMPLE_WORDS, ROUTER_RATE_LIMIT_COOLDOWN,
+                           get_response_profile)
 from together import Together
+from utils.admission import UpstreamBusy, get_limiter
+from utils.cancellation import CancelToken, RequestCancelled
 
 logger = logging.getLogger(__name__)
 
+def fit_context(context: List[str], max_chars: int) -> List[str]:
+    """Keep context items in order until ``max_chars`` is used up.
+    
+    The item that crosses the budget is truncated rather than dropped, so the
+    best-ranked context always makes it into the prompt.
+    """
+    fitted = []
+    remaining = max_chars
+    for ctx in context:
+        if remaining <= 0:
+            break
+        if len(ctx) > remaining:
+            ctx = ctx[:remaining] + "..."
+        fitted.append(ctx)
+        remaining -= len(ctx)
+    return fitted
+
+def build_messages(prompt: str,
+                   context: Optional[List[str]] = None,
+                   response_mode: str = "detailed",
+                   system_message: str = None) -> List[Dict[str, str]]:
+    """Build the chat messages for a prompt, its context and the response mode.
+    
+    Shared by the sync and async clients so both send identical requests.
+    
+    Args:
+        prompt: User query
+        context: Optional list of context strings retrieved from the vector database
+        response_mode: Key of config.RESPONSE_MODES selecting the generation profile
+        system_message: Optional custom system message
+        
+    Returns:
+        List of chat messages
+    """
+    profile = get_response_profile(response_mode)
+    
+    # Build system prompt with context and response mode instruction
+    if not system_message:
+        system_message = "You are a helpful assistant providing accurate information."
+    system_message += " " + profile["instruction"]
+        
+    # Add context if available, within the mode's context budget
+    context_text = ""
+    context = fit_context(context or [], profile["context_chars"])
+    if context:
+        context_text = "Here's relevant information to help answer the question:\n"
+        for i, ctx in enumerate(context):
+            context_text += f"{i+1}. {ctx}\n"
+    
+    # Prepare messages
+    messages = [
+        {"role": "system", "content": system_message},
+    ]
+    
+    # Add context as assistant message if available
+    if context_text:
+        messages.append({"role": "assistant", "content": context_text})
+        
+    # Add user prompt
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
 class TogetherModel:
     def __init__(self, api_key: str = TOGETHER_API_KEY, model_name: str = LLM_MODEL):
         """Initialize the Together AI model.
@@ -17,7 +87,8 @@ class TogetherModel:
             raise ValueError("Together API key is missing. Please check your .env file.")
             
         try:
-            self.client = Together(api_key=api_key)
+            self.client = Together(api_key=api_key, base_url=TOGETHER_BASE_URL, max_retries=TOGETHER_MAX_RETRIES)
+            self.api_key = api_key
             self.model = model_name
             logger.info(f"Successfully initialized Together AI model: {model_name}")
         except Exception as e:
@@ -39,61 +110,62 @@ class TogetherModel:
         
         return True, "API key format appears valid"
             
+    def complete(self, messages: List[Dict[str, str]], max_tokens: int = 1000,
+                 temperature: float = 0.7, model: Optional[str] = None,
+                 cancel: Optional[CancelToken] = None) -> str:
+        """Send one chat completion request and return the message text.
+        
+        Unlike ``generate_response``, errors (including rate limits) are raised
+        so callers such as ``ModelRouter`` can react to them.
+        
+        With a ``cancel`` token the request is sent through the shared
+        ``AsyncTogetherModel`` instead of the SDK, so cancelling the token
+        aborts the HTTP request rather than waiting for Together to answer.
+        
+        Raises:
+            UpstreamBusy: If the request is not admitted within the queue budget
+            RequestCancelled: If ``cancel`` is cancelled first
+        """
+        if cancel is not None:
+            return cancel.run(get_async_client(self.api_key).complete(
+                messages, max_tokens=max_tokens, temperature=temperature, model=model or self.model))
+        with get_limiter("together").admit():
+            response = self.client.chat.completions.create(
+                model=model or self.model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+            )
+        return response.choices[0].message.content
+            
     def generate_response(self, 
                          prompt: str, 
                          context: Optional[List[str]] = None,
                          response_mode: str = "detailed",
-                         system_message: str = None) -> str:
+                         system_message: str = None,
+                         cancel: Optional[CancelToken] = None) -> str:
         """Generate a response based on the prompt and optional context.
         
         Args:
             prompt: User query
             context: Optional list of context strings retrieved from the vector database
-            response_mode: Whether to generate a concise or detailed response
+            response_mode: Key of config.RESPONSE_MODES selecting the generation profile
             system_message: Optional custom system message
+            cancel: Optional token that aborts the request
             
         Returns:
             Generated response as a string
         """
         try:
-            # Build system prompt with context and response mode instruction
-            if not system_message:
-                system_message = "You are a helpful assistant providing accurate information."
-            
-            if response_mode == "concise":
-                system_message += " Keep your responses brief and to the point."
-            else:
-                system_message += " Provide detailed and comprehensive responses."
-                
-            # Add context if available
-            context_text = ""
-            if context and len(context) > 0:
-                context_text = "Here's relevant information to help answer the question:\n"
-                for i, ctx in enumerate(context):
-                    context_text += f"{i+1}. {ctx}\n"
-            
-            # Prepare messages
-            messages = [
-                {"role": "system", "content": system_message},
-            ]
-            
-            # Add context as assistant message if available
-            if context_text:
-                messages.append({"role": "assistant", "content": context_text})
-                
-            # Add user prompt
-            messages.append({"role": "user", "content": prompt})
+            messages = build_messages(prompt, context, response_mode, system_message)
+            profile = get_response_profile(response_mode)
             
             # Generate response
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                max_tokens=1000,
-                temperature=0.7,
-            )
-            
-            return response.choices[0].message.content
+            return self.complete(messages, max_tokens=profile["max_tokens"],
+                                 temperature=profile["temperature"], model=profile["model"], cancel=cancel)
             
+        except (UpstreamBusy, RequestCancelled):
+            raise
         except Exception as e:
             logger.error(f"Error generating response: {str(e)}")
             return f"I encountered an error generating a response: {str(e)}"
@@ -109,12 +181,280 @@ class TogetherModel:
             Generated response as a string
         """
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=100,
-            )
+            with get_limiter("together").admit():
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=100,
+                )
             return response.choices[0].message.content
         except Exception as e:
             logger.error(f"Error in simple response: {str(e)}")
-            return f"Error: {str(e)}"
\ No newline at end of file
+            return f"Error: {str(e)}"
+
+def is_rate_limited(error: Exception) -> bool:
+    """Whether an error from either Together client is an HTTP 429."""
+    status = getattr(error, "http_status", None) or getattr(error, "status", None)
+    return status == 429 or type(error).__name__ == "RateLimitError"
+
+# Models that recently returned 429, shared by every router in the process
+_rate_limited_until: Dict[str, float] = {}
+_rate_limit_lock = threading.Lock()
+
+class ModelRouter:
+    """Cascade between a fast model and the large model.
+    
+    Simple queries whose retrieval confidence is high go to the fast model;
+    everything else goes to the response profile's model (the large one by
+    default). When a model answers 429 it is put on a process-wide cooldown
+    and the request falls back to the profile's model, then to the others.
+    Every routing decision and its latency is logged.
+    """
+
+    # Cues that a question needs reasoning rather than a lookup
+    COMPLEX_CUES = re.compile(
+        r"\b(why|how come|compare|difference|versus|vs|explain|pros and cons|recommend\w*|diagnos\w*|symptoms?)\b"
+    )
+
+    def __init__(self, client: TogetherModel, fast_model: str = LLM_FAST_MODEL,
+                 large_model: str = LLM_MODEL, enabled: bool = LLM_ROUTER_ENABLED,
+                 confidence_threshold: Optional[float] = ROUTER_CONFIDENCE_THRESHOLD,
+                 max_simple_words: int = ROUTER_MAX_SIMPLE_WORDS,
+                 cooldown: float = ROUTER_RATE_LIMIT_COOLDOWN):
+        """Initialize the router.
+        
+        Args:
+            client: Together client used for both models
+            fast_model: Cheaper, faster model for simple lookups
+            large_model: Model used when the query needs it
+            enabled: If False, always start with the large model (fallback still applies)
+            confidence_threshold: Minimum retrieval score to allow the fast model when
+                none is passed per request; if None, only calibrated requests use it
+            max_simple_words: Longest query still considered simple
+            cooldown: Seconds a rate-limited model is skipped
+        """
+        self.client = client
+        self.fast_model = fast_model
+        self.large_model = large_model
+        self.enabled = enabled
+        self.confidence_threshold = confidence_threshold
+        self.max_simple_words = max_simple_words
+        self.cooldown = cooldown
+
+    def is_simple_query(self, query: str) -> bool:
+        """Heuristic: short, single questions without reasoning cues."""
+        text = query.lower()
+        if len(text.split()) > self.max_simple_words or text.count("?") > 1:
+            return False
+        return self.COMPLEX_CUES.search(text) is None
+
+    def choose_model(self, query: str, retrieval_score: Optional[float],
+                     response_mode: str = "detailed",
+                     confidence_threshold: Optional[float] = None) -> Tuple[str, str]:
+        """Pick the first model to try.
+        
+        Args:
+            query: User query
+            retrieval_score: Best local retrieval similarity, if any
+            response_mode: Key of config.RESPONSE_MODES selecting the generation profile
+            confidence_threshold: Calibrated minimum retrieval score for the fast
+                model (``ScoreThresholds.router``); defaults to the router's own
+        
+        Returns:
+            Tuple of (model name, reason for the decision)
+        """
+        large_model = get_response_profile(response_mode)["model"] or self.large_model
+        if confidence_threshold is None:
+            confidence_threshold = self.confidence_threshold
+        if not self.enabled:
+            return large_model, "router disabled"
+        if not self.is_simple_query(query):
+            return large_model, "complex query"
+        if confidence_threshold is None:
+            return large_model, "no calibrated confidence threshold"
+        if retrieval_score is None or retrieval_score < confidence_threshold:
+            return large_model, "low retrieval confidence"
+        return self.fast_model, "simple query, confident retrieval"
+
+    def _cooling_down(self, model: str) -> bool:
+        with _rate_limit_lock:
+            return _rate_limited_until.get(model, 0) > time.monotonic()
+
+    def _mark_rate_limited(self, model: str) -> None:
+        with _rate_limit_lock:
+            _rate_limited_until[model] = time.monotonic() + self.cooldown
+
+    def generate_response(self,
+                          prompt: str,
+                          context: Optional[List[str]] = None,
+                          response_mode: str = "detailed",
+                          system_message: str = None,
+                          retrieval_score: Optional[float] = None,
+                          cancel: Optional[CancelToken] = None,
+                          confidence_threshold: Optional[float] = None) -> str:
+        """Route a request and generate the response, falling back on 429s.
+        
+        Args:
+            prompt: User query
+            context: Optional list of context strings
+            response_mode: Key of config.RESPONSE_MODES selecting the generation profile
+            system_message: Optional custom system message
+            retrieval_score: Best local retrieval similarity, if any
+            cancel: Optional token that aborts the request
+            confidence_threshold: Calibrated minimum retrieval score for the fast model
+            
+        Returns:
+            Generated response as a string
+        """
+        model, reason = self.choose_model(prompt, retrieval_score, response_mode, confidence_threshold)
+        profile = get_response_profile(response_mode)
+        # After the first choice, the profile's model before the others
+        candidates = []
+        for candidate in (model, profile["model"] or self.large_model, self.large_model, self.fast_model):
+            if candidate not in candidates:
+                candidates.append(candidate)
+        # Prefer a model that isn't cooling down, but never skip every model
+        ready = [m for m in candidates if not self._cooling_down(m)]
+        order = ready + [m for m in candidates if m not in ready]
+
+        messages = build_messages(prompt, context, response_mode, system_message)
+        for candidate in order:
+            start = time.perf_counter()
+            try:
+                response = self.client.complete(messages, max_tokens=profile["max_tokens"],
+                                                temperature=profile["temperature"], model=candidate,
+                                                cancel=cancel)
+                latency_ms = (time.perf_counter() - start) * 1000
+                logger.info(f"Routed to {candidate} ({reason if candidate == model else 'fallback'}) "
+                            f"in {latency_ms:.0f} ms")
+                return response
+            except (UpstreamBusy, RequestCancelled):
+                # Local overload or an abandoned request: trying the other model would only add load
+                raise
+            except Exception as e:
+                latency_ms = (time.perf_counter() - start) * 1000
+                if is_rate_limited(e):
+                    self._mark_rate_limited(candidate)
+                    logger.warning(f"{candidate} rate limited after {latency_ms:.0f} ms; "
+                                   f"cooling down for {self.cooldown:.0f}s")
+                    continue
+                logger.error(f"Error generating response with {candidate}: {str(e)}")
+                return f"I encountered an error generating a response: {str(e)}"
+
+        return "All models are currently rate limited. Please try again in a moment."
+
+    def simple_response(self, prompt: str) -> str:
+        """Generate a simple response with the underlying client."""
+        return self.client.simple_response(prompt)
+
+class AsyncTogetherModel:
+    """Asyncio counterpart of ``TogetherModel`` over a pooled HTTP connection.
+    
+    Calls go straight to Together's OpenAI-compatible chat completions
+    endpoint through one ``aiohttp`` session, so many completions can be in
+    flight at once without an OS thread each. The session is bound to the
+    event loop it was created on; use one instance per loop, e.g. the shared
+    loop in ``utils.async_runtime``.
+    """
+
+    def __init__(self, api_key: str = TOGETHER_API_KEY, model_name: str = LLM_MODEL,
+                 base_url: str = TOGETHER_BASE_URL, max_connections: int = 50,
+                 timeout: float = 60.0):
+        """Initialize the async Together AI client.
+        
+        Args:
+            api_key: Together API key
+            model_name: Model name to use
+            base_url: API base URL
+            max_connections: Size of the connection pool
+            timeout: Total seconds allowed per completion
+        """
+        if not api_key:
+            raise ValueError("Together API key is missing. Please check your .env file.")
+        self.api_key = api_key
+        self.model = model_name
+        self.base_url = base_url.rstrip("/")
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def complete(self, messages: List[Dict[str, str]], max_tokens: int = 1000,
+                       temperature: float = 0.7, model: Optional[str] = None) -> str:
+        """Send one chat completion request and return the message text.
+        
+        Raises:
+            aiohttp.ClientResponseError: On HTTP errors such as 429 rate limits
+            UpstreamBusy: If the request is not admitted within the queue budget
+        """
+        payload = {
+            "model": model or self.model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+        }
+        async with get_limiter("together").admit_async():
+            async with self._get_session().post(f"{self.base_url}/chat/completions", json=payload) as response:
+                response.raise_for_status()
+                data = await response.json()
+        return data["choices"][0]["message"]["content"]
+
+    async def generate_response(self,
+                                prompt: str,
+                                context: Optional[List[str]] = None,
+                                response_mode: str = "detailed",
+                                system_message: str = None) -> str:
+        """Async version of ``TogetherModel.generate_response``."""
+        try:
+            messages = build_messages(prompt, context, response_mode, system_message)
+            profile = get_response_profile(response_mode)
+            return await self.complete(messages, max_tokens=profile["max_tokens"],
+                                       temperature=profile["temperature"], model=profile["model"])
+        except UpstreamBusy:
+            raise
+        except Exception as e:
+            logger.error(f"Error generating response: {str(e)}")
+            return f"I encountered an error generating a response: {str(e)}"
+
+    async def simple_response(self, prompt: str) -> str:
+        """Async version of ``TogetherModel.simple_response``."""
+        try:
+            return await self.complete([{"role": "user", "content": prompt}], max_tokens=100)
+        except Exception as e:
+            logger.error(f"Error in simple response: {str(e)}")
+            return f"Error: {str(e)}"
+
+    async def close(self) -> None:
+        """Close the pooled connections."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def __aenter__(self) -> "AsyncTogetherModel":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+# One pooled async client per API key on the shared event loop, used for
+# requests that must be cancellable
+_async_clients: Dict[str, AsyncTogetherModel] = {}
+_async_clients_lock = threading.Lock()
+
+def get_async_client(api_key: str = TOGETHER_API_KEY) -> AsyncTogetherModel:
+    """Return the process-wide ``AsyncTogetherModel`` for an API key.
+
+    Its connection pool is bound to the loop in ``utils.async_runtime``, so
+    only run its coroutines there (e.g. via ``CancelToken.run``).
+    """
+    with _async_clients_lock:
+        if api_key not in _async_clients:
+            _async_clients[api_key] = AsyncTogetherModel(api_key=api_key)
+        return _async_clients[api_key]
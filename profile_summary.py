@@ -0,0 +1,59 @@
+# profile_summary.py
+import os
+import glob
+import pstats
+import argparse
+from config.config import PROFILE_DIR
+
+def find_profiles(paths, latest):
+    """Expand files and directories into profile files, newest last."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = glob.glob(os.path.join(path, "*.prof")) + glob.glob(os.path.join(path, "*.txt"))
+            files.extend(sorted(found, key=os.path.getmtime)[-latest:])
+        else:
+            files.append(path)
+    return files
+
+def main():
+    """Print the hottest functions of one or more per-request profiles."""
+    parser = argparse.ArgumentParser(description="Summarize per-request profiles written by utils.profiling.")
+    parser.add_argument("paths", nargs="*", default=[PROFILE_DIR],
+                        help="Profile files or directories (default: PROFILE_DIR)")
+    parser.add_argument("--latest", type=int, default=1, help="Profiles taken from each directory, newest first")
+    parser.add_argument("--request", help="Only profiles whose file name contains this request id")
+    parser.add_argument("--sort", default="cumulative", choices=["cumulative", "tottime", "ncalls"])
+    parser.add_argument("--limit", type=int, default=25, help="Functions shown")
+    parser.add_argument("--filter", help="Regex restricting functions shown, e.g. 'embeddings|faiss|chunk_text'")
+    parser.add_argument("--aggregate", action="store_true", help="Merge all selected cProfile files into one report")
+    args = parser.parse_args()
+
+    if args.request:
+        files = [f for path in args.paths
+                 for f in glob.glob(os.path.join(path, f"*{args.request}*")) if os.path.isdir(path)]
+    else:
+        files = find_profiles(args.paths, args.latest)
+    if not files:
+        print("No profiles found.")
+        return
+
+    restrictions = [args.filter] if args.filter else []
+    prof_files = [f for f in files if f.endswith(".prof")]
+    for path in files:
+        if path.endswith(".txt"):
+            # Sampling profiler reports are already human-readable
+            print(f"=== {path}")
+            with open(path, 'r', encoding='utf-8') as f:
+                print(f.read())
+        elif not args.aggregate:
+            print(f"=== {path}")
+            pstats.Stats(path).strip_dirs().sort_stats(args.sort).print_stats(*restrictions, args.limit)
+
+    if args.aggregate and prof_files:
+        print(f"=== {len(prof_files)} profiles aggregated")
+        stats = pstats.Stats(*prof_files)
+        stats.strip_dirs().sort_stats(args.sort).print_stats(*restrictions, args.limit)
+
+if __name__ == "__main__":
+    main()
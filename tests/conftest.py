@@ -0,0 +1,32 @@
+import hashlib
+from typing import List
+import numpy as np
+import pytest
+
+class HashingEmbeddingModel:
+    """Deterministic bag-of-words embeddings, so tests don't load the BGE model."""
+
+    def __init__(self, dimension: int = 64):
+        self.dimension = dimension
+
+    def get_embeddings(self, texts) -> np.ndarray:
+        if isinstance(texts, str):
+            texts = [texts]
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                digest = hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest()
+                vectors[row, int.from_bytes(digest, 'little') % self.dimension] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.get_embeddings(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.get_embeddings(text)[0].tolist()
+
+@pytest.fixture
+def embedding_model():
+    return HashingEmbeddingModel()
@@ -0,0 +1,82 @@
+import time
+import asyncio
+import threading
+import pytest
+from utils.admission import UpstreamLimiter, UpstreamBusy
+
+def wait_until(condition, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+def test_queue_full_is_rejected_at_once():
+    limiter = UpstreamLimiter("test", max_concurrency=1, max_queue=1, queue_timeout=2.0)
+    limiter.acquire()
+    queued = threading.Thread(target=limiter.acquire)
+    queued.start()
+    wait_until(lambda: limiter.waiting == 1)
+
+    start = time.monotonic()
+    with pytest.raises(UpstreamBusy) as busy:
+        limiter.acquire()
+    assert busy.value.reason == "queue full"
+    assert time.monotonic() - start < 0.5
+
+    limiter.release()
+    queued.join()
+    assert limiter.in_flight == 1 and limiter.waiting == 0
+
+def test_timeout_while_all_slots_are_in_use():
+    limiter = UpstreamLimiter("test", max_concurrency=1)
+    limiter.acquire()
+    with pytest.raises(UpstreamBusy) as busy:
+        limiter.acquire(timeout=0.05)
+    assert busy.value.reason == "all slots in use"
+    assert limiter.in_flight == 1 and limiter.waiting == 0 and limiter.rejected == 1
+
+def test_rate_limit_rejection_releases_the_slot():
+    limiter = UpstreamLimiter("test", max_concurrency=1, requests_per_minute=600, burst=1)
+    with limiter.admit():
+        pass
+    with pytest.raises(UpstreamBusy) as busy:
+        limiter.acquire(timeout=0.01)
+    assert busy.value.reason == "rate limit"
+    # Only one slot: this times out unless the rejected call gave it back
+    limiter.acquire(timeout=1.0)
+    assert limiter.in_flight == 1
+
+def test_async_waiter_is_woken_by_release():
+    limiter = UpstreamLimiter("test", max_concurrency=1)
+    limiter.acquire()
+
+    async def main():
+        threading.Timer(0.05, limiter.release).start()
+        async with limiter.admit_async(timeout=2.0):
+            assert limiter.in_flight == 1
+
+    start = time.monotonic()
+    asyncio.run(main())
+    assert time.monotonic() - start < 1.0
+    assert limiter.in_flight == 0
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    limiter = UpstreamLimiter("test", max_concurrency=1)
+    limiter.acquire()
+
+    async def main():
+        async def wait_for_slot():
+            async with limiter.admit_async(timeout=2.0):
+                pass
+
+        waiter = asyncio.ensure_future(wait_for_slot())
+        await asyncio.sleep(0.05)
+        assert limiter.waiting == 1
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        limiter.release()
+
+    asyncio.run(main())
+    assert limiter.waiting == 0 and limiter.in_flight == 0
+    limiter.acquire(timeout=0.1)
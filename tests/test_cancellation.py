@@ -0,0 +1,39 @@
+import time
+import asyncio
+import threading
+import pytest
+from utils import pipeline
+from utils.cancellation import CancelToken, RequestCancelled
+from utils.web_fetch import PageFetcher
+
+def test_stop_aborts_page_fetches():
+    fetcher = PageFetcher()
+
+    async def slow_fetch_many(urls, max_length=3000):
+        await asyncio.sleep(30)
+
+    fetcher.fetch_many = slow_fetch_many
+    token = CancelToken()
+    threading.Timer(0.2, token.cancel).start()
+    start = time.monotonic()
+    with pytest.raises(RequestCancelled):
+        fetcher.fetch_pages(["https://example.com"], cancel=token)
+    assert time.monotonic() - start < 5
+
+def test_web_context_stops_after_a_cancelled_search(monkeypatch):
+    token = CancelToken()
+    fetched = []
+
+    def search(query, search_depth, max_results, cancel):
+        token.cancel()
+        return [{"title": "Parrots", "link": "https://example.com", "snippet": "seed mixes"}]
+
+    monkeypatch.setattr(pipeline, "tavily_search", search)
+    monkeypatch.setattr(pipeline, "fetch_webpage_contents", lambda urls, cancel=None: fetched.append(urls))
+    with pytest.raises(RequestCancelled):
+        pipeline.gather_web_context("parrot food", cancel=token)
+    assert not fetched
+
+def test_remaining_is_bounded_by_the_deadline():
+    assert CancelToken().remaining(10) == 10
+    assert CancelToken(timeout=2).remaining(10) <= 2
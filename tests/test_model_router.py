@@ -0,0 +1,37 @@
+import pytest
+from models import llm
+from models.llm import ModelRouter
+
+class RateLimited(Exception):
+    status = 429
+
+class FakeClient:
+    def __init__(self, limited=()):
+        self.limited = set(limited)
+        self.calls = []
+
+    def complete(self, messages, max_tokens, temperature, model, cancel=None):
+        self.calls.append(model)
+        if model in self.limited:
+            raise RateLimited("429")
+        return f"answer from {model}"
+
+@pytest.fixture(autouse=True)
+def no_cooldowns(monkeypatch):
+    monkeypatch.setattr(llm, "_rate_limited_until", {})
+
+def test_calibrated_threshold_gates_the_fast_model():
+    router = ModelRouter(FakeClient(), fast_model="fast", large_model="large", confidence_threshold=None)
+    assert router.choose_model("Can cats eat tuna?", 0.9)[0] == "large"
+    assert router.choose_model("Can cats eat tuna?", 0.9, confidence_threshold=0.8)[0] == "fast"
+    assert router.choose_model("Can cats eat tuna?", 0.7, confidence_threshold=0.8)[0] == "large"
+
+def test_rate_limit_falls_back_to_the_profile_model_first(monkeypatch):
+    monkeypatch.setitem(llm.get_response_profile("concise"), "model", "profile")
+    client = FakeClient(limited={"fast"})
+    router = ModelRouter(client, fast_model="fast", large_model="large")
+
+    response = router.generate_response("Can cats eat tuna?", response_mode="concise",
+                                        retrieval_score=0.9, confidence_threshold=0.5)
+    assert response == "answer from profile"
+    assert client.calls == ["fast", "profile"]
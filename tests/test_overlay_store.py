@@ -0,0 +1,100 @@
+import os
+import time
+import threading
+from utils.rag_utils import VectorStore
+from utils.overlay_store import OverlayManager, LayeredVectorStore
+
+def test_pinned_overlay_is_not_spilled_while_written(embedding_model, tmp_path):
+    manager = OverlayManager(embedding_model, spill_dir=str(tmp_path), max_resident=1)
+    layered = LayeredVectorStore(VectorStore(embedding_model), manager, "writer")
+    layered.add_documents(["first upload about parrots"], "doc-1")
+
+    with manager.pinned("writer") as overlay:
+        manager.get("other")  # would evict "writer" if it were not pinned
+        assert manager.peek("writer") is overlay
+        overlay.add_documents(["second upload about hamsters"], "doc-2")
+
+    manager.get("third")  # unpinned now, so it can be spilled
+    assert manager.peek("writer") is None
+    reloaded = manager.get("writer")
+    assert reloaded.document_exists("doc-1") and reloaded.document_exists("doc-2")
+
+def test_prune_deletes_old_spills_only(embedding_model, tmp_path):
+    manager = OverlayManager(embedding_model, spill_dir=str(tmp_path), max_resident=0)
+    base = VectorStore(embedding_model)
+    for session_id in ("old", "new"):
+        LayeredVectorStore(base, manager, session_id).add_documents([f"{session_id} notes"], session_id)
+    manager.evict_idle()
+    old = os.path.join(str(tmp_path), "old")
+    stale = time.time() - 3 * 86400
+    os.utime(old, (stale, stale))
+
+    assert manager.prune(86400) == 1
+    assert not os.path.exists(old)
+    assert manager.has_overlay("new")
+
+class CompressedVectorStore(VectorStore):
+    def __init__(self, embedding_model, **kwargs):
+        kwargs.setdefault("reduction", "truncate")
+        kwargs.setdefault("reduced_dimension", 32)
+        kwargs.setdefault("quantization", "int8")
+        super().__init__(embedding_model, **kwargs)
+
+def test_spilled_compressed_overlay_survives_reload(embedding_model, tmp_path, monkeypatch):
+    monkeypatch.setattr("utils.overlay_store.VectorStore", CompressedVectorStore)
+    manager = OverlayManager(embedding_model, spill_dir=str(tmp_path), max_resident=1)
+    layered = LayeredVectorStore(VectorStore(embedding_model), manager, "uploader")
+    documents = [f"note {i} about feeding schedule {i % 7} for rabbits" for i in range(300)]
+    layered.add_documents(documents + ["the axolotl tank needs cool water"], "upload-1")
+    assert manager.peek("uploader").originals is not None
+
+    manager.get("other")  # spills "uploader"
+    assert os.path.isdir(os.path.join(str(tmp_path), "uploader"))
+    # Reloading deletes the spill directory; the store must not depend on it
+    results = layered.search_with_scores("axolotl tank cool water", top_k=1)
+    assert not os.path.isdir(os.path.join(str(tmp_path), "uploader"))
+    assert "axolotl" in results[0][0]
+
+    layered.add_documents(["second upload about ferret toys"], "upload-2")
+    assert "ferret" in layered.search_with_scores("ferret toys", top_k=1)[0][0]
+
+def test_reads_during_a_spill_use_the_in_memory_overlay(embedding_model, tmp_path):
+    manager = OverlayManager(embedding_model, spill_dir=str(tmp_path), max_resident=0)
+    LayeredVectorStore(VectorStore(embedding_model), manager, "writer").add_documents(["notes about parrots"], "doc-1")
+    overlay = manager.peek("writer")
+    started, release = threading.Event(), threading.Event()
+    save = overlay.save
+
+    def slow_save(path):
+        started.set()
+        release.wait(5)
+        save(path)
+
+    overlay.save = slow_save
+    spiller = threading.Thread(target=manager.evict_idle)
+    spiller.start()
+    assert started.wait(5)
+    # The manager lock is free while the spill is written, and nothing is in place yet
+    assert manager.has_overlay("writer")
+    assert not os.path.exists(os.path.join(str(tmp_path), "writer"))
+    with manager.pinned("writer") as current:
+        assert current is overlay
+    release.set()
+    spiller.join(5)
+
+    assert manager.get("writer").document_exists("doc-1")
+
+def test_failed_spill_keeps_the_overlay_in_memory(embedding_model, tmp_path):
+    manager = OverlayManager(embedding_model, spill_dir=str(tmp_path), max_resident=0)
+    LayeredVectorStore(VectorStore(embedding_model), manager, "writer").add_documents(["notes about parrots"], "doc-1")
+    overlay = manager.peek("writer")
+
+    def failing_save(path):
+        os.makedirs(path)
+        raise OSError("disk full")
+
+    overlay.save = failing_save
+    manager.evict_idle()
+
+    assert os.listdir(str(tmp_path)) == []
+    assert manager.peek("writer") is overlay
@@ -0,0 +1,102 @@
+import os
+import pytest
+from utils.safety_index import SafetyIndex, find_species
+
+KB_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "knowledge_base")
+
+@pytest.fixture(scope="module")
+def index():
+    return SafetyIndex.from_knowledge_base(KB_DIR)
+
+def facts_for(index, substance):
+    return {(f.species, f.severity, f.citation()) for f in index.facts if f.substance.lower() == substance}
+
+def test_extracts_toxic_foods_per_species(index):
+    assert ("Dogs", "toxic", "pet_safety_emergency.txt (Toxic Foods)") in facts_for(index, "xylitol")
+    assert ("Birds", "toxic", "pet_safety_emergency.txt (Toxic Foods)") in facts_for(index, "avocado")
+    assert ("Cats", "toxic", "cat_care_essentials.txt (Basic Nutrition)") in facts_for(index, "onions")
+    grapes = next(f for f in index.facts if f.substance == "grapes/raisins")
+    assert {"grape", "grapes", "raisin", "raisins"} <= set(grapes.terms)
+
+def test_extracts_plants_and_household_hazards(index):
+    lilies = next(f for f in index.facts if f.substance == "Lilies")
+    assert (lilies.species, lilies.severity) == ("All species", "severe")
+    assert "kidney failure" in lilies.guidance
+    assert facts_for(index, "oleander") == {("All species", "toxic", "pet_safety_emergency.txt (Toxic Plants)")}
+    assert facts_for(index, "antifreeze") == {
+        ("All species", "hazardous", "pet_safety_emergency.txt (Hazardous Household Items)")}
+
+def test_extracts_first_aid_steps(index):
+    assert {"bleeding", "choking", "seizures", "heatstroke", "poisoning"} <= set(index.first_aid)
+    assert any("888-426-4435" in step for step in index.first_aid["poisoning"])
+    assert index.first_aid_source == "pet_safety_emergency.txt"
+
+def test_find_species_uses_aliases():
+    assert find_species("Can my puppy eat grapes?") == ["Dogs"]
+    assert find_species("my budgie and my kitten") == ["Birds", "Cats"]
+    assert find_species("medication for my pet") == []
+
+@pytest.mark.parametrize("query, selected_pet, expected", [
+    ("Can my cat eat onions?", "All species", "**No. Onions are toxic to cats**"),
+    ("Is chocolate dangerous for dogs?", "All species", "**No. Chocolate is toxic to dogs**"),
+    ("Can parrots eat avocado?", "All species", "**No. Avocado is toxic to birds**"),
+    ("Are lilies toxic?", "Cats", "**No. Lilies are highly toxic to all pets**"),
+    ("Is chocolate toxic?", "All species", "toxic to dogs, cats, small mammals and birds"),
+])
+def test_answers_clear_toxicity_questions(index, query, selected_pet, expected):
+    answer = index.answer(query, selected_pet)
+    assert expected in answer
+    assert "888-426-4435" in answer
+    assert "*Source: " in answer
+
+@pytest.mark.parametrize("query, selected_pet, expected", [
+    ("My dog ate chocolate", "All species", "Chocolate is toxic to dogs"),
+    ("my cat just swallowed a lily leaf", "All species", "Lilies are highly toxic to all pets"),
+    ("My dog got into the antifreeze", "All species", "Antifreeze is listed as a household hazard for all pets"),
+])
+def test_answers_ingestion_with_poisoning_steps(index, query, selected_pet, expected):
+    answer = index.answer(query, selected_pet)
+    assert answer.startswith(f"**This may be an emergency.** {expected}")
+    assert "**No." not in answer
+    assert "888-426-4435" in answer
+    assert "(Poisoning)" in answer
+
+@pytest.mark.parametrize("query, topic", [
+    ("My dog is choking", "choking"),
+    ("my cat is having a seizure right now", "seizures"),
+    ("My dog's overheating", "heatstroke"),
+])
+def test_answers_first_aid_questions(index, query, topic):
+    answer = index.answer(query, "All species")
+    assert answer.startswith(f"**This may be an emergency.** First aid for {topic}")
+    assert f"Basic First Aid: {topic.capitalize()}" in answer
+
+@pytest.mark.parametrize("query", [
+    "can my dog eat peanut butter with no xylitol",
+    "give my dog a grape-free snack",
+    "my dog is not choking anymore, is he ok?",
+    "my cat isn't allowed chocolate, right?",
+    "are treats without onions safe for cats",
+])
+def test_negated_terms_fall_back(index, query):
+    assert index.answer(query, "Dogs") is None
+
+@pytest.mark.parametrize("query, selected_pet", [
+    ("Can dogs eat carrots?", "All species"),  # not in the KB: never declared safe
+    ("Can my fish eat chocolate?", "All species"),  # KB lists chocolate for other species only
+    ("Why is chocolate bad for dogs?", "All species"),
+    ("How much chocolate is dangerous for a dog?", "All species"),
+    ("Can my cat and dog eat onions?", "All species"),
+    ("Can my dog eat grapes and onions?", "Dogs"),
+    ("Tell me about onions", "Cats"),  # no safety cue
+    ("What vaccines does my puppy need?", "Dogs"),
+    ("my vet gave my dog medications, is it ok to give them with food", "All species"),
+    ("what medications are safe for dogs", "All species"),
+    ("how do I stop my dog from chewing string", "All species"),
+    ("how can I prevent heatstroke in my dog", "All species"),
+    ("what does a seizure look like in cats", "All species"),
+    ("my dog choked on a toy yesterday but seems fine, should I worry", "All species"),
+    ("Tell me about seizures in dogs", "All species"),  # a topic without an emergency cue
+])
+def test_ambiguous_questions_fall_back(index, query, selected_pet):
+    assert index.answer(query, selected_pet) is None
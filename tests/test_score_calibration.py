@@ -0,0 +1,44 @@
+import os
+import numpy as np
+import pytest
+from utils import score_calibration
+from utils.rag_utils import VectorStore, load_document, chunk_text
+from utils.index_artifacts import knowledge_base_files
+from utils.score_calibration import best_cut, calibrate, UNCALIBRATED_WEB_SEARCH
+
+KB_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "knowledge_base")
+
+@pytest.fixture
+def kb_store(embedding_model):
+    store = VectorStore(embedding_model)
+    for file_name in knowledge_base_files(KB_DIR):
+        store.add_documents(chunk_text(load_document(os.path.join(KB_DIR, file_name))), file_name)
+    return store
+
+def test_best_cut_separates_groups():
+    assert best_cut([0.8, 0.9], [0.3, 0.5]) == pytest.approx(0.65)
+    # One overlapping score cannot be separated; the cut misclassifies only it
+    cut = best_cut([0.6, 0.8, 0.9], [0.3, 0.7])
+    assert 0.6 < cut < 0.8
+
+def test_calibrate_measures_the_knowledge_base(kb_store, embedding_model):
+    thresholds = calibrate(kb_store, embedding_model)
+    assert {group: len(scores) for group, scores in thresholds.measured.items()} == {
+        "covered": len(score_calibration.COVERED_PROBES),
+        "uncovered": len(score_calibration.UNCOVERED_PROBES),
+        "unrelated": len(score_calibration.UNRELATED_PROBES),
+    }
+    assert thresholds.context_min == pytest.approx(np.median(thresholds.measured["unrelated"]))
+    assert thresholds.context_min <= thresholds.web_search
+    assert thresholds.router == pytest.approx(max(np.median(thresholds.measured["covered"]), thresholds.web_search))
+
+def test_configured_thresholds_win(kb_store, embedding_model, monkeypatch):
+    monkeypatch.setattr(score_calibration, "WEB_SEARCH_SCORE_THRESHOLD", 2.0)
+    thresholds = calibrate(kb_store, embedding_model)
+    assert thresholds.web_search == 2.0
+    assert thresholds.context_min == pytest.approx(np.median(thresholds.measured["unrelated"]))
+
+def test_empty_index_is_uncalibrated(embedding_model):
+    thresholds = calibrate(VectorStore(embedding_model), embedding_model)
+    assert thresholds.web_search == UNCALIBRATED_WEB_SEARCH
+    assert not thresholds.measured
@@ -0,0 +1,33 @@
+import pytest
+from utils.rag_utils import VectorStore
+from utils.sharded_store import ShardedVectorStore, detect_species
+
+def test_detect_species_matches_whole_words():
+    assert detect_species("Medication dosing tables indicate education needs") is None
+    assert detect_species("A selfish approach") is None
+    assert detect_species("vet_manual.pdf\nMedication guide for cats and kittens") == "cats"
+
+def test_detect_species_reads_file_names():
+    assert detect_species("cat_care_essentials.txt") == "cats"
+    assert detect_species("dog-training.pdf") == "dogs"
+
+def test_failed_shard_add_leaves_document_unprocessed(embedding_model, monkeypatch):
+    store = ShardedVectorStore(embedding_model, num_shards=2, shard_key="chunk")
+    add = VectorStore.add_embeddings
+    calls = []
+
+    def flaky_add(self, *args, **kwargs):
+        calls.append(self)
+        if len(calls) == 2:
+            raise Exception("disk full")
+        return add(self, *args, **kwargs)
+
+    monkeypatch.setattr(VectorStore, "add_embeddings", flaky_add)
+    documents = ["rabbits need hay", "rabbits need space"]
+    with pytest.raises(Exception):
+        store.add_documents(documents, "rabbit-guide")
+    assert not store.document_exists("rabbit-guide")
+
+    store.add_documents(documents, "rabbit-guide")
+    assert store.document_exists("rabbit-guide")
+    assert len(store) == 2
@@ -0,0 +1,38 @@
+import os
+import shutil
+import numpy as np
+from utils.vector_compression import FullPrecisionVectors
+
+def test_loaded_vectors_outlive_the_saved_directory(tmp_path):
+    originals = FullPrecisionVectors(4, directory=str(tmp_path / "work"))
+    rows = np.arange(12, dtype=np.float32).reshape(3, 4)
+    originals.append(rows, [0, 1, 2])
+    saved = tmp_path / "saved"
+    saved.mkdir()
+    originals.save(str(saved))
+
+    loaded = FullPrecisionVectors.load(str(saved), 4)
+    shutil.rmtree(saved)
+    np.testing.assert_array_equal(loaded.get([2, 0]), rows[[2, 0]])
+    loaded.append(np.ones((1, 4), dtype=np.float32), [3])
+    assert len(loaded) == 4 and loaded.get([3])[0].tolist() == [1.0] * 4
+
+def test_append_after_load_leaves_the_saved_copy_alone(tmp_path):
+    originals = FullPrecisionVectors(2, directory=str(tmp_path / "work"))
+    originals.append(np.zeros((2, 2), dtype=np.float32), [0, 1])
+    originals.save(str(tmp_path))
+    saved_size = os.path.getsize(tmp_path / "original_vectors.f32")
+
+    first = FullPrecisionVectors.load(str(tmp_path), 2)
+    second = FullPrecisionVectors.load(str(tmp_path), 2)
+    first.append(np.ones((1, 2), dtype=np.float32), [2])
+    first.save(str(tmp_path))
+
+    assert os.path.getsize(tmp_path / "original_vectors.f32") > saved_size
+    assert len(second) == 2 and second.get([0, 1]).sum() == 0.0
+
+def test_private_file_is_deleted_with_the_object(tmp_path):
+    originals = FullPrecisionVectors(2, directory=str(tmp_path))
+    path = originals.path
+    del originals
+    assert not os.path.exists(path)
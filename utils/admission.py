@@ -0,0 +1,240 @@
+import time
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager, asynccontextmanager
+from typing import Dict, Iterator, AsyncIterator, Optional, Set, Tuple
+from config.config import (TOGETHER_MAX_CONCURRENCY, TOGETHER_REQUESTS_PER_MINUTE, TAVILY_MAX_CONCURRENCY,
+                           TAVILY_REQUESTS_PER_MINUTE, ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT)
+
+logger = logging.getLogger(__name__)
+
+class UpstreamBusy(Exception):
+    """Raised when a call to an upstream API cannot be admitted in time."""
+
+    def __init__(self, upstream: str, reason: str, retry_after: float):
+        super().__init__(f"{upstream} is busy ({reason}); retry in {retry_after:.0f}s")
+        self.upstream = upstream
+        self.reason = reason
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """Token-bucket rate limiter: ``rate`` tokens per second, bursts up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        """Take a token if one is available.
+
+        Returns:
+            0.0 if a token was taken, otherwise seconds until the next one
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return 0.0
+            return (1.0 - self._tokens) / self.rate
+
+class UpstreamLimiter:
+    """Admission control for one upstream API, shared by every session.
+
+    A call is admitted once it holds one of ``max_concurrency`` slots and a
+    token from the rate bucket. At most ``max_queue`` callers may wait, and
+    none waits longer than ``queue_timeout``; beyond that ``UpstreamBusy``
+    is raised at once, so bursts are shed locally instead of piling more
+    requests (and 429s) onto the upstream.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, requests_per_minute: float = 0,
+                 burst: Optional[int] = None, max_queue: int = 32, queue_timeout: float = 10.0):
+        """Initialize the limiter.
+
+        Args:
+            name: Upstream name used in logs and errors
+            max_concurrency: Calls allowed in flight at once
+            requests_per_minute: Sustained rate limit; 0 disables it
+            burst: Bucket capacity; defaults to ``max_concurrency``
+            max_queue: Callers allowed to wait for admission
+            queue_timeout: Longest a caller waits before ``UpstreamBusy``
+        """
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._bucket = (TokenBucket(requests_per_minute / 60.0, burst or max_concurrency)
+                        if requests_per_minute > 0 else None)
+        self._lock = threading.Lock()
+        self._async_waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        self.waiting = 0
+        self.in_flight = 0
+        self.rejected = 0
+
+    def acquire(self, timeout: Optional[float] = None) -> float:
+        """Wait for admission.
+
+        Args:
+            timeout: Queue-time budget; defaults to ``queue_timeout``
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            UpstreamBusy: If the queue is full or the budget runs out
+        """
+        start = time.monotonic()
+        deadline = start + (self.queue_timeout if timeout is None else timeout)
+        self._enter_queue()
+        try:
+            if not self._slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+                self._reject("all slots in use", self.queue_timeout)
+            try:
+                wait = self._next_token(deadline)
+                while wait:
+                    time.sleep(wait)
+                    wait = self._next_token(deadline)
+            except BaseException:
+                self._slots.release()
+                raise
+        finally:
+            self._leave_queue()
+        return self._admitted(start)
+
+    async def acquire_async(self, timeout: Optional[float] = None) -> float:
+        """``acquire`` for coroutines.
+
+        The wait happens on the event loop rather than on a worker thread:
+        ``release`` wakes waiting coroutines, so a queued caller costs no
+        thread, and cancelling it while it waits leaves no slot behind.
+        """
+        start = time.monotonic()
+        deadline = start + (self.queue_timeout if timeout is None else timeout)
+        self._enter_queue()
+        try:
+            if not await self._acquire_slot_async(deadline):
+                self._reject("all slots in use", self.queue_timeout)
+            try:
+                wait = self._next_token(deadline)
+                while wait:
+                    await asyncio.sleep(wait)
+                    wait = self._next_token(deadline)
+            except BaseException:
+                self._slots.release()
+                raise
+        finally:
+            self._leave_queue()
+        return self._admitted(start)
+
+    async def _acquire_slot_async(self, deadline: float) -> bool:
+        wakeup = (asyncio.get_running_loop(), asyncio.Event())
+        # Registered before the first attempt, so a release in between still wakes us
+        with self._lock:
+            self._async_waiters.add(wakeup)
+        try:
+            while not self._slots.acquire(blocking=False):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                try:
+                    await asyncio.wait_for(wakeup[1].wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+                wakeup[1].clear()
+            return True
+        finally:
+            with self._lock:
+                self._async_waiters.discard(wakeup)
+
+    def _enter_queue(self) -> None:
+        with self._lock:
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise UpstreamBusy(self.name, "queue full", self.queue_timeout)
+            self.waiting += 1
+
+    def _leave_queue(self) -> None:
+        with self._lock:
+            self.waiting -= 1
+
+    def _next_token(self, deadline: float) -> float:
+        """Take a rate token; returns seconds to wait before trying again, 0.0 once taken."""
+        if self._bucket is None:
+            return 0.0
+        wait = self._bucket.try_acquire()
+        if wait and time.monotonic() + wait > deadline:
+            self._reject("rate limit", wait)
+        return wait
+
+    def _admitted(self, start: float) -> float:
+        with self._lock:
+            self.in_flight += 1
+        waited = time.monotonic() - start
+        if waited > 0.5:
+            logger.info(f"{self.name} call admitted after {waited:.1f}s in queue")
+        return waited
+
+    def _reject(self, reason: str, retry_after: float) -> None:
+        with self._lock:
+            self.rejected += 1
+        logger.warning(f"Rejected {self.name} call: {self.in_flight} in flight, {self.waiting} waiting")
+        raise UpstreamBusy(self.name, reason, retry_after)
+
+    def release(self) -> None:
+        """Return the slot taken by ``acquire``."""
+        with self._lock:
+            self.in_flight -= 1
+            waiters = list(self._async_waiters)
+        self._slots.release()
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # the waiter's event loop has closed
+
+    @contextmanager
+    def admit(self, timeout: Optional[float] = None) -> Iterator[None]:
+        """Hold an admission slot for the duration of a block."""
+        self.acquire(timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def admit_async(self, timeout: Optional[float] = None) -> AsyncIterator[None]:
+        """``admit`` for coroutines; see ``acquire_async``."""
+        await self.acquire_async(timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+_UPSTREAM_SETTINGS = {
+    "together": (TOGETHER_MAX_CONCURRENCY, TOGETHER_REQUESTS_PER_MINUTE),
+    "tavily": (TAVILY_MAX_CONCURRENCY, TAVILY_REQUESTS_PER_MINUTE),
+}
+
+_limiters: Dict[str, UpstreamLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(upstream: str) -> UpstreamLimiter:
+    """Return the process-wide limiter for an upstream ("together" or "tavily")."""
+    with _limiters_lock:
+        if upstream not in _limiters:
+            max_concurrency, requests_per_minute = _UPSTREAM_SETTINGS[upstream]
+            _limiters[upstream] = UpstreamLimiter(
+                upstream,
+                max_concurrency=max_concurrency,
+                requests_per_minute=requests_per_minute,
+                max_queue=ADMISSION_MAX_QUEUE,
+                queue_timeout=ADMISSION_QUEUE_TIMEOUT
+            )
+        return _limiters[upstream]
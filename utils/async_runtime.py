@@ -0,0 +1,44 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, Optional
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Return the process-wide event loop, starting its thread on first use.
+
+    Streamlit runs each session's script on its own thread without an event
+    loop. Running all async I/O on one long-lived loop lets connection pools
+    (which are bound to a loop) be shared by every session.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="async-runtime", daemon=True)
+            thread.start()
+            _loop = loop
+        return _loop
+
+def submit(coro: Coroutine) -> Future:
+    """Schedule a coroutine on the shared loop and return a concurrent Future."""
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+
+def run(coro: Coroutine, timeout: Optional[float] = None) -> Any:
+    """Run a coroutine on the shared loop and block until it finishes.
+
+    Args:
+        coro: Coroutine to run
+        timeout: Seconds to wait; the coroutine is cancelled on expiry
+
+    Returns:
+        The coroutine's result
+    """
+    future = submit(coro)
+    try:
+        return future.result(timeout=timeout)
+    except BaseException:
+        future.cancel()
+        raise
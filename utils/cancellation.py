@@ -0,0 +1,206 @@
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, CancelledError, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from typing import Any, Callable, Coroutine, Iterator, Optional, Set
+from config.config import GENERATION_WORKERS
+from utils import async_runtime
+
+logger = logging.getLogger(__name__)
+
+# How often blocked waits re-check for cancellation, deadline and heartbeat
+POLL_SECONDS = 0.25
+
+CANCEL_REASONS = {
+    "stopped": "stopped by the user",
+    "deadline": "timed out",
+    "abandoned": "abandoned after the page stopped polling",
+}
+
+class RequestCancelled(Exception):
+    """Raised inside a request once its ``CancelToken`` has been cancelled."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Request {CANCEL_REASONS.get(reason, reason)}")
+        self.reason = reason
+
+class CancelToken:
+    """Cancellation state of one request, shared by the UI and the worker.
+
+    A token is cancelled explicitly (``cancel``), when its deadline passes,
+    or when nobody has called ``heartbeat`` for ``abandon_after`` seconds,
+    i.e. the page that started it is gone. Coroutines started through
+    ``run`` are cancelled with it, which aborts their HTTP requests.
+    """
+
+    def __init__(self, timeout: Optional[float] = None, abandon_after: Optional[float] = None):
+        """Initialize the token.
+
+        Args:
+            timeout: Seconds until the request is cancelled regardless
+            abandon_after: Seconds without a heartbeat before it is cancelled
+        """
+        now = time.monotonic()
+        self.deadline = now + timeout if timeout else None
+        self.abandon_after = abandon_after
+        self.reason: Optional[str] = None
+        self._last_heartbeat = now
+        self._event = threading.Event()
+        self._futures: Set[Future] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def heartbeat(self) -> None:
+        """Record that the requester is still waiting for the result."""
+        self._last_heartbeat = time.monotonic()
+
+    def cancel(self, reason: str = "stopped") -> None:
+        """Cancel the request and any coroutine it is waiting on."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            futures = list(self._futures)
+        for future in futures:
+            future.cancel()
+
+    def remaining(self, limit: float) -> float:
+        """Seconds left before the deadline, at most ``limit``.
+
+        Use it as the timeout of blocking calls that ``run`` cannot abort.
+
+        Raises:
+            RequestCancelled: If the request should already stop
+        """
+        self.check()
+        if self.deadline is None:
+            return limit
+        return max(0.0, min(limit, self.deadline - time.monotonic()))
+
+    def check(self) -> None:
+        """Raise ``RequestCancelled`` if the request should stop.
+
+        Raises:
+            RequestCancelled: If cancelled, past the deadline or abandoned
+        """
+        if not self._event.is_set():
+            now = time.monotonic()
+            if self.deadline is not None and now >= self.deadline:
+                self.cancel("deadline")
+            elif self.abandon_after and now - self._last_heartbeat > self.abandon_after:
+                self.cancel("abandoned")
+        if self._event.is_set():
+            raise RequestCancelled(self.reason)
+
+    def run(self, coro: Coroutine) -> Any:
+        """Run a coroutine on the shared event loop and wait for it, cancellably.
+
+        Raises:
+            RequestCancelled: If the token is cancelled first; the coroutine
+                is cancelled too, closing its connection
+        """
+        self.check()
+        future = async_runtime.submit(coro)
+        with self._lock:
+            self._futures.add(future)
+        try:
+            while True:
+                self.check()
+                try:
+                    return future.result(timeout=POLL_SECONDS)
+                except FutureTimeout:
+                    continue
+                except CancelledError:
+                    self.check()
+                    raise
+        except RequestCancelled:
+            future.cancel()
+            raise
+        finally:
+            with self._lock:
+                self._futures.discard(future)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=GENERATION_WORKERS, thread_name_prefix="generation")
+        return _executor
+
+class CancellableTask:
+    """A request running on the shared worker pool, with a ``CancelToken``.
+
+    ``fn`` receives the task and should pass ``task.token`` to anything
+    that blocks. The caller polls ``done`` (calling ``heartbeat`` while it
+    still wants the result) and collects ``result``, which re-raises the
+    task's exception, ``RequestCancelled`` included.
+    """
+
+    def __init__(self, fn: Callable[["CancellableTask"], Any], timeout: Optional[float] = None,
+                 abandon_after: Optional[float] = None, name: str = "request"):
+        """Start the task.
+
+        Args:
+            fn: Work to run; called with this task
+            timeout: Hard deadline in seconds
+            abandon_after: Cancel after this long without a heartbeat
+            name: Used in log messages
+        """
+        self.task_id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.token = CancelToken(timeout=timeout, abandon_after=abandon_after)
+        self.status = "Thinking..."
+        self.started = time.monotonic()
+        self._future = _get_executor().submit(self._run, fn)
+
+    def _run(self, fn: Callable[["CancellableTask"], Any]) -> Any:
+        try:
+            self.token.check()
+            return fn(self)
+        except RequestCancelled as e:
+            logger.info(f"{self.name} {CANCEL_REASONS.get(e.reason, e.reason)} after {self.elapsed:.1f}s")
+            raise
+
+    @property
+    def done(self) -> bool:
+        return self._future.done()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def heartbeat(self) -> None:
+        self.token.heartbeat()
+
+    def cancel(self, reason: str = "stopped") -> None:
+        self.token.cancel(reason)
+
+    def wait(self, timeout: float) -> bool:
+        """Wait up to ``timeout`` seconds for the task; returns ``done``."""
+        try:
+            self._future.exception(timeout=timeout)
+        except (FutureTimeout, CancelledError):
+            pass
+        return self.done
+
+    def result(self) -> Any:
+        """The task's return value; re-raises its exception."""
+        return self._future.result()
+
+    @contextmanager
+    def stage(self, status: str) -> Iterator[None]:
+        """Show ``status`` to the polling UI for the duration of a block."""
+        previous, self.status = self.status, status
+        try:
+            yield
+        finally:
+            self.status = previous
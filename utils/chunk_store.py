@@ -0,0 +1,167 @@
+import os
+import json
+import logging
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+class ChunkRecord:
+    """A single chunk as seen by callers; only built on access."""
+
+    __slots__ = ("position", "text", "source")
+
+    def __init__(self, position: int, text: str, source: str):
+        self.position = position
+        self.text = text
+        self.source = source
+
+    def __repr__(self) -> str:
+        return f"ChunkRecord(position={self.position}, source={self.source!r}, text={self.text[:40]!r})"
+
+class ChunkStore:
+    """Compact, append-only storage for chunk texts and their sources.
+
+    Instead of one object and metadata dict per chunk, texts are appended to
+    a shared UTF-8 buffer addressed by an ``array('Q')`` of offsets, and each
+    chunk's source is an interned integer id in an ``array('I')`` column.
+    That is 12 bytes of bookkeeping per chunk plus the text itself.
+
+    With ``compression="zstd"`` (requires the ``zstandard`` package) every
+    ``block_size`` chunks are sealed into an independently compressed block;
+    reads decompress a block at a time and keep a few recent ones cached.
+    """
+
+    def __init__(self, compression: Optional[str] = None, block_size: int = 256, cache_blocks: int = 8):
+        """Initialize an empty store.
+
+        Args:
+            compression: None, or "zstd" to compress sealed blocks of text
+            block_size: Chunks per compressed block
+            cache_blocks: Decompressed blocks kept for repeated reads
+        """
+        if compression not in (None, "", "zstd"):
+            raise ValueError(f"Unsupported chunk compression: {compression}")
+        if compression == "zstd" and zstandard is None:
+            logger.warning("zstandard is not installed. Chunk texts will be stored uncompressed.")
+            compression = None
+        self.compression = compression or None
+        self.block_size = block_size
+        self._sources: List[str] = []
+        self._source_index: Dict[str, int] = {}
+        self._source_ids = array('I')
+        self._offsets = array('Q', [0])
+        # Uncompressed text of the chunks not yet sealed into a block
+        self._tail = bytearray()
+        self._blocks: List[bytes] = []
+        self._block_cache: "OrderedDict[int, bytes]" = OrderedDict()
+        self._cache_blocks = cache_blocks
+        if self.compression:
+            self._compressor = zstandard.ZstdCompressor(level=3)
+            self._decompressor = zstandard.ZstdDecompressor()
+
+    def __len__(self) -> int:
+        return len(self._source_ids)
+
+    def _intern(self, source: str) -> int:
+        source_id = self._source_index.get(source)
+        if source_id is None:
+            source_id = len(self._sources)
+            self._sources.append(source)
+            self._source_index[source] = source_id
+        return source_id
+
+    def append(self, text: str, source: str) -> int:
+        """Store one chunk and return its position."""
+        encoded = text.encode('utf-8')
+        self._tail += encoded
+        self._offsets.append(self._offsets[-1] + len(encoded))
+        self._source_ids.append(self._intern(source))
+
+        if self.compression and len(self) % self.block_size == 0:
+            self._blocks.append(self._compressor.compress(bytes(self._tail)))
+            self._tail = bytearray()
+        return len(self) - 1
+
+    def extend(self, texts: Iterable[str], source: str) -> None:
+        """Store several chunks from the same source."""
+        for text in texts:
+            self.append(text, source)
+
+    def _block_bytes(self, block: int) -> bytes:
+        if block == len(self._blocks):
+            return self._tail
+        cached = self._block_cache.get(block)
+        if cached is None:
+            cached = self._decompressor.decompress(self._blocks[block])
+            self._block_cache[block] = cached
+            if len(self._block_cache) > self._cache_blocks:
+                self._block_cache.popitem(last=False)
+        else:
+            self._block_cache.move_to_end(block)
+        return cached
+
+    def text(self, position: int) -> str:
+        """Decode the text of one chunk."""
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        if self.compression:
+            block = position // self.block_size
+            base = self._offsets[block * self.block_size]
+        else:
+            block, base = len(self._blocks), 0
+        data = self._block_bytes(block)
+        return bytes(data[self._offsets[position] - base:self._offsets[position + 1] - base]).decode('utf-8')
+
+    def source(self, position: int) -> str:
+        """Source name of one chunk."""
+        return self._sources[self._source_ids[position]]
+
+    def get(self, position: int) -> ChunkRecord:
+        """Materialize one chunk as a record."""
+        return ChunkRecord(position, self.text(position), self.source(position))
+
+    @property
+    def sources(self) -> List[str]:
+        """Distinct source names, in order of first appearance."""
+        return list(self._sources)
+
+    def nbytes(self) -> int:
+        """Approximate memory held by texts and metadata columns."""
+        text_bytes = len(self._tail) + sum(len(block) for block in self._blocks)
+        column_bytes = (self._offsets.itemsize * len(self._offsets)
+                        + self._source_ids.itemsize * len(self._source_ids))
+        return text_bytes + column_bytes + sum(len(source) for source in self._sources)
+
+    def save(self, path: str) -> None:
+        """Write the store to a directory as an uncompressed text blob plus columns."""
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "chunks.bin"), 'wb') as f:
+            for block in range(len(self._blocks)):
+                f.write(self._block_bytes(block))
+            f.write(self._tail)
+        np.save(os.path.join(path, "chunk_offsets.npy"), np.frombuffer(self._offsets, dtype=np.uint64))
+        np.save(os.path.join(path, "chunk_source_ids.npy"), np.frombuffer(self._source_ids, dtype=np.uint32))
+        with open(os.path.join(path, "chunk_sources.json"), 'w', encoding='utf-8') as f:
+            json.dump(self._sources, f)
+
+    @classmethod
+    def load(cls, path: str, compression: Optional[str] = None, block_size: int = 256) -> "ChunkStore":
+        """Read a store written by ``save``, re-compressing if requested."""
+        store = cls(compression=compression, block_size=block_size)
+        with open(os.path.join(path, "chunks.bin"), 'rb') as f:
+            data = f.read()
+        offsets = np.load(os.path.join(path, "chunk_offsets.npy"))
+        source_ids = np.load(os.path.join(path, "chunk_source_ids.npy"))
+        with open(os.path.join(path, "chunk_sources.json"), 'r', encoding='utf-8') as f:
+            sources = json.load(f)
+        for position, source_id in enumerate(source_ids):
+            store.append(data[offsets[position]:offsets[position + 1]].decode('utf-8'), sources[source_id])
+        return store
@@ -0,0 +1,94 @@
+import re
+import logging
+from typing import List, Tuple
+import numpy as np
+from utils.document_processor import normalize_vectors
+
+logger = logging.getLogger(__name__)
+
+# Sentence ends: terminal punctuation followed by whitespace, or a line break
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\n+")
+# Attribution prefixes produced by the retrieval stage:
+# "From <title> (<url>):\n<text>" for web results, "From <source>: <text>" for chunks
+_WEB_ATTRIBUTION = re.compile(r"^(From .+?\(\S+\)):\n", re.DOTALL)
+_LOCAL_ATTRIBUTION = re.compile(r"^(From [^:\n]+):\s")
+
+def split_attribution(item: str) -> Tuple[str, str]:
+    """Split a context item into its "From ..." attribution and its text."""
+    match = _WEB_ATTRIBUTION.match(item) or _LOCAL_ATTRIBUTION.match(item)
+    if match is None:
+        return "", item
+    return match.group(1), item[match.end():]
+
+def split_sentences(text: str, min_chars: int = 20) -> List[str]:
+    """Split text into sentences, merging fragments shorter than ``min_chars`` into the next one."""
+    sentences = []
+    pending = ""
+    for piece in _SENTENCE_BREAK.split(text):
+        piece = piece.strip()
+        if not piece:
+            continue
+        pending = f"{pending} {piece}" if pending else piece
+        if len(pending) >= min_chars:
+            sentences.append(pending)
+            pending = ""
+    if pending:
+        if sentences:
+            sentences[-1] = f"{sentences[-1]} {pending}"
+        else:
+            sentences.append(pending)
+    return sentences
+
+def compress_context(query: str, context: List[str], embedding_model, max_sentences: int = 10,
+                     min_score: float = 0.0) -> List[str]:
+    """Keep only the sentences of the context that are closest to the query.
+
+    Every context item is split into sentences, which are embedded together
+    with the query in one batched call and ranked by cosine similarity. The
+    best ``max_sentences`` are kept and regrouped under their original
+    attribution, in their original order, so the prompt keeps its sources.
+
+    Args:
+        query: User question
+        context: Context items, e.g. "From <source>: <text>"
+        embedding_model: Model with ``embed_documents``
+        max_sentences: Sentences kept across all items
+        min_score: Sentences less similar than this are dropped
+
+    Returns:
+        Compressed context items, in the order of ``context``
+    """
+    attributions = []
+    sentences: List[Tuple[int, str]] = []
+    for item_index, item in enumerate(context):
+        attribution, text = split_attribution(item)
+        attributions.append(attribution)
+        sentences.extend((item_index, sentence) for sentence in split_sentences(text))
+    if len(sentences) <= max_sentences:
+        return context
+
+    try:
+        vectors = normalize_vectors(embedding_model.embed_documents([query] + [s for _, s in sentences]))
+    except Exception as e:
+        logger.error(f"Error compressing context, sending it uncompressed: {str(e)}")
+        return context
+    scores = vectors[1:] @ vectors[0]
+
+    ranked = np.argsort(-scores)[:max_sentences]
+    keep = sorted(int(i) for i in ranked if scores[i] >= min_score)
+
+    grouped: List[List[str]] = [[] for _ in context]
+    for position in keep:
+        item_index, sentence = sentences[position]
+        grouped[item_index].append(sentence)
+
+    compressed = []
+    for attribution, kept in zip(attributions, grouped):
+        if kept:
+            text = " ".join(kept)
+            compressed.append(f"{attribution}: {text}" if attribution else text)
+    before = sum(len(item) for item in context)
+    after = sum(len(item) for item in compressed)
+    logger.info(f"Compressed context from {before} to {after} characters "
+                f"({len(keep)}/{len(sentences)} sentences)")
+    return compressed
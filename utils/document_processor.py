@@ -1,7 +1,7 @@
 import os
 import PyPDF2
 import numpy as np
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
 
 def extract_text(file_path: str) -> str:
     """Extract text from PDF or text files"""
@@ -40,67 +40,176 @@ def chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]
         print(f"Error chunking text: {e}")
         return []
 
-def create_document_index(document_dir: str, model) -> Tuple[List[Dict], np.ndarray]:
-    """Create searchable index from documents (optimized)"""
+def normalize_vectors(vectors: np.ndarray) -> np.ndarray:
+    """Return a C-contiguous float32 copy of ``vectors`` with unit L2 norm rows.
+
+    Zero vectors are left as zeros instead of producing NaNs.
+    """
+    vectors = np.array(vectors, dtype=np.float32, order='C', ndmin=2, copy=True)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    vectors /= norms
+    return vectors
+
+def top_k_similar(vectors: np.ndarray, queries: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact inner-product top-k of ``queries`` against the rows of ``vectors``.
+
+    Uses ``argpartition`` so only the k winners are sorted. ``vectors`` may be
+    any 2-D array-like, including a read-only ``np.memmap``.
+
+    Returns:
+        Tuple of (scores, indices), each of shape (n_queries, k), best first
+    """
+    k = min(top_k, len(vectors))
+    if k <= 0:
+        empty = np.empty((len(queries), 0))
+        return empty.astype(np.float32), empty.astype(np.int64)
+
+    similarities = queries @ np.asarray(vectors).T
+    if k < len(vectors):
+        candidates = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(len(vectors)), (len(queries), len(vectors)))
+    candidate_scores = np.take_along_axis(similarities, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1)
+    indices = np.take_along_axis(candidates, order, axis=1).astype(np.int64)
+    scores = np.take_along_axis(candidate_scores, order, axis=1)
+    return scores, indices
+
+class NumpyVectorIndex:
+    """Dependency-light in-memory vector index using cosine similarity.
+
+    Vectors are L2-normalized on insert and kept in one contiguous float32
+    matrix, so a search is a single matrix product followed by an
+    ``argpartition`` top-k. Storage grows append-only with capacity doubling,
+    which keeps the amortized cost of ``add`` constant per vector. This is the
+    FAISS-free fallback and the baseline used in benchmarks.
+    """
+
+    def __init__(self, dimension: int, initial_capacity: int = 1024):
+        """Initialize an empty index.
+
+        Args:
+            dimension: Embedding dimension
+            initial_capacity: Number of rows to preallocate
+        """
+        self.dimension = dimension
+        self._vectors = np.empty((max(1, initial_capacity), dimension), dtype=np.float32)
+        self._size = 0
+        self.metadata: List[Dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """View of the stored (normalized) vectors, without spare capacity."""
+        return self._vectors[:self._size]
+
+    def _reserve(self, capacity: int) -> None:
+        """Grow the backing matrix to hold at least ``capacity`` rows."""
+        if capacity <= self._vectors.shape[0]:
+            return
+        new_capacity = max(capacity, 2 * self._vectors.shape[0])
+        grown = np.empty((new_capacity, self.dimension), dtype=np.float32)
+        grown[:self._size] = self._vectors[:self._size]
+        self._vectors = grown
+
+    def add(self, vectors: np.ndarray, metadatas: Optional[List[Dict[str, Any]]] = None) -> None:
+        """Append vectors (and optional per-vector metadata) to the index.
+
+        Args:
+            vectors: Array of shape (n, dimension) or (dimension,)
+            metadatas: Optional metadata dict for each vector
+        """
+        vectors = normalize_vectors(vectors)
+        if vectors.shape[1] != self.dimension:
+            raise ValueError(f"Expected vectors of dimension {self.dimension}, got {vectors.shape[1]}")
+        if metadatas is not None and len(metadatas) != len(vectors):
+            raise ValueError("Number of metadatas must match number of vectors")
+
+        self._reserve(self._size + len(vectors))
+        self._vectors[self._size:self._size + len(vectors)] = vectors
+        self._size += len(vectors)
+        self.metadata.extend(metadatas if metadatas is not None else [{} for _ in range(len(vectors))])
+
+    def search(self, query_vectors: np.ndarray, top_k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """Find the ``top_k`` most similar stored vectors for each query.
+
+        Args:
+            query_vectors: Array of shape (n_queries, dimension) or (dimension,)
+            top_k: Number of neighbours to return per query
+
+        Returns:
+            Tuple of (scores, indices), each of shape (n_queries, k) with
+            k = min(top_k, len(index)), ordered by descending cosine similarity
+        """
+        return top_k_similar(self.vectors, normalize_vectors(query_vectors), top_k)
+
+def create_document_index(document_dir: str, model) -> NumpyVectorIndex:
+    """Create a searchable index from the documents in a directory.
+
+    Args:
+        document_dir: Directory containing .pdf and .txt files
+        model: An ``EmbeddingModel`` (anything with ``get_embeddings``)
+
+    Returns:
+        NumpyVectorIndex whose metadata holds the chunk text and source
+    """
+    chunks_with_metadata = []
+    chunk_texts = []
+
+    for file in sorted(os.listdir(document_dir)):
+        if file.endswith(('.pdf', '.txt')):
+            file_path = os.path.join(document_dir, file)
+            text = extract_text(file_path)
+            chunks = chunk_text(text)
+
+            for i, chunk in enumerate(chunks):
+                chunks_with_metadata.append({
+                    'text': chunk,
+                    'source': file,
+                    'chunk_id': i
+                })
+                chunk_texts.append(chunk)
+
+    if not chunk_texts:
+        return NumpyVectorIndex(dimension=getattr(model, 'dimension', 1024))
+
     try:
-        chunks_with_metadata = []
-        chunk_texts = []
-        
-        file_count = 0
-        for file in os.listdir(document_dir):
-            if file.endswith(('.pdf', '.txt')):
-                # Limit number of files processed
-                file_count += 1
-                if file_count > 5:  # Process max 5 files
-                    break
-                    
-                file_path = os.path.join(document_dir, file)
-                text = extract_text(file_path)
-                chunks = chunk_text(text)
-                
-                for i, chunk in enumerate(chunks):
-                    chunks_with_metadata.append({
-                        'text': chunk,
-                        'source': file,
-                        'chunk_id': i
-                    })
-                    chunk_texts.append(chunk)
-        
-        # Create embeddings for all chunks
-        from models.embeddings import get_embeddings
-        embeddings = get_embeddings(chunk_texts, model)
-        
-        return chunks_with_metadata, embeddings
+        embeddings = model.get_embeddings(chunk_texts)
     except Exception as e:
-        print(f"Error creating document index: {e}")
-        return [], np.array([])
+        raise Exception(f"Error creating document index: {e}")
 
-def search_documents(query: str, chunks_with_metadata: List[Dict], 
-                   embeddings: np.ndarray, model, top_k: int = 2) -> List[Dict]:
-    """Search for relevant document chunks (optimized)"""
+    index = NumpyVectorIndex(dimension=embeddings.shape[1], initial_capacity=len(chunk_texts))
+    index.add(embeddings, chunks_with_metadata)
+    return index
+
+def search_documents(query: str, index: NumpyVectorIndex, model, top_k: int = 2) -> List[Dict]:
+    """Search for relevant document chunks.
+
+    Args:
+        query: Search query
+        index: Index built by ``create_document_index``
+        model: The embedding model used to build the index
+        top_k: Number of results to return
+
+    Returns:
+        List of dicts with 'text', 'source' and 'similarity' keys
+    """
     try:
-        from models.embeddings import get_embeddings
-        query_embedding = get_embeddings([query], model)[0]
-        
-        # For TF-IDF vectorizer with sparse matrices
-        if hasattr(embeddings, 'toarray'):
-            embeddings = embeddings.toarray()
-            
-        # Calculate similarity (simplified)
-        similarities = np.dot(embeddings, query_embedding.T).flatten()
-        
-        # Get top matches (limit to 2 for faster processing)
-        top_indices = np.argsort(similarities)[::-1][:top_k]
+        query_embedding = model.get_embeddings([query])
+        scores, indices = index.search(query_embedding, top_k=top_k)
+
         results = []
-        
-        for idx in top_indices:
+        for score, idx in zip(scores[0], indices[0]):
             results.append({
-                'text': chunks_with_metadata[idx]['text'],
-                'source': chunks_with_metadata[idx]['source'],
-                'similarity': float(similarities[idx])
+                'text': index.metadata[idx].get('text', ''),
+                'source': index.metadata[idx].get('source', 'unknown'),
+                'similarity': float(score)
             })
-            
+
         return results
     except Exception as e:
         print(f"Error searching documents: {e}")
-        return []
\ No newline at end of file
+        return []
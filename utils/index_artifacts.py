@@ -0,0 +1,221 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from config.config import EMBEDDING_MODEL_NAME, CHUNK_SIZE, CHUNK_OVERLAP
+from models.embeddings import EmbeddingModel
+from utils.rag_utils import VectorStore, load_document, chunk_text
+from utils.mmap_store import MmapVectorStore, ReadOnlyStoreError, export_vector_store
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+CURRENT_FILE = "CURRENT"
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def artifact_checksum(path: str) -> str:
+    """Checksum over every data file of an artifact, excluding the manifest."""
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(path)):
+        if name == MANIFEST_FILE:
+            continue
+        digest.update(name.encode('utf-8'))
+        digest.update(_file_sha256(os.path.join(path, name)).encode('ascii'))
+    return digest.hexdigest()
+
+def knowledge_base_files(kb_dir: str) -> List[str]:
+    """Files in the knowledge base that get indexed, in a stable order."""
+    return sorted(f for f in os.listdir(kb_dir) if f.endswith('.txt'))
+
+def build_artifact(kb_dir: str, output_dir: str, embedding_model: EmbeddingModel,
+                   chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP,
+                   model_name: str = EMBEDDING_MODEL_NAME, publish: bool = True) -> str:
+    """Build a versioned, memory-mappable index artifact from a knowledge base.
+
+    The artifact directory holds the ``mmap_store`` files plus a manifest
+    recording the embedding model, chunker parameters, the SHA-256 of every
+    source file and a checksum of the artifact itself. Publishing rewrites
+    ``CURRENT`` atomically, which running apps pick up via ``HotReloadingVectorStore``.
+
+    Args:
+        kb_dir: Knowledge base directory
+        output_dir: Directory holding all artifact versions
+        embedding_model: Model used to embed the chunks
+        chunk_size: Chunker size parameter
+        overlap: Chunker overlap parameter
+        model_name: Embedding model name recorded in the manifest
+        publish: Point ``CURRENT`` at the new version when done
+
+    Returns:
+        The new version name
+    """
+    store = VectorStore(embedding_model)
+    file_hashes: Dict[str, str] = {}
+    for file_name in knowledge_base_files(kb_dir):
+        file_path = os.path.join(kb_dir, file_name)
+        file_hashes[file_name] = _file_sha256(file_path)
+        chunks = chunk_text(load_document(file_path), chunk_size=chunk_size, overlap=overlap)
+        store.add_documents(chunks, file_name)
+        logger.info(f"Indexed {file_name} ({len(chunks)} chunks)")
+
+    os.makedirs(output_dir, exist_ok=True)
+    staging_name = f".build-{os.getpid()}-{int(time.time())}"
+    staging = os.path.join(output_dir, staging_name)
+    export_vector_store(store, staging)
+
+    checksum = artifact_checksum(staging)
+    version = f"{time.strftime('%Y%m%d-%H%M%S')}-{checksum[:8]}"
+    manifest = {
+        "version": version,
+        "created_at": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        "embedding_model": model_name,
+        "dimension": getattr(embedding_model, "dimension", None),
+        "chunker": {"chunk_size": chunk_size, "overlap": overlap},
+        "files": file_hashes,
+        "chunk_count": len(store),
+        "checksum": checksum,
+    }
+    with open(os.path.join(staging, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.rename(staging, os.path.join(output_dir, version))
+    logger.info(f"Built index artifact {version} ({len(store)} chunks)")
+
+    if publish:
+        publish_version(output_dir, version)
+    return version
+
+def publish_version(output_dir: str, version: str) -> None:
+    """Atomically point ``CURRENT`` at a version."""
+    tmp_path = os.path.join(output_dir, f".{CURRENT_FILE}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(version + "\n")
+    os.replace(tmp_path, os.path.join(output_dir, CURRENT_FILE))
+
+def read_current(output_dir: str) -> Optional[str]:
+    """Return the published version name, if any."""
+    try:
+        with open(os.path.join(output_dir, CURRENT_FILE), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def prune_versions(output_dir: str, keep: int = 3) -> None:
+    """Delete all but the newest ``keep`` versions, never the current one."""
+    current = read_current(output_dir)
+    versions = sorted(name for name in os.listdir(output_dir)
+                      if os.path.isfile(os.path.join(output_dir, name, MANIFEST_FILE)))
+    for version in versions[:-keep] if keep > 0 else versions:
+        if version != current:
+            shutil.rmtree(os.path.join(output_dir, version), ignore_errors=True)
+
+def load_artifact(path: str, embedding_model: EmbeddingModel, verify: bool = True,
+                  model_name: str = EMBEDDING_MODEL_NAME) -> Tuple[MmapVectorStore, Dict]:
+    """Open an artifact after checking it matches this app's embedding model.
+
+    Returns:
+        Tuple of (store, manifest)
+    """
+    with open(os.path.join(path, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get("embedding_model") != model_name:
+        raise ValueError(f"Artifact {manifest.get('version')} was built with "
+                         f"{manifest.get('embedding_model')}, but the app uses {model_name}")
+    if verify and artifact_checksum(path) != manifest.get("checksum"):
+        raise ValueError(f"Artifact {manifest.get('version')} failed checksum verification")
+    return MmapVectorStore(path, embedding_model), manifest
+
+class HotReloadingVectorStore:
+    """Read-only store that follows the published index artifact.
+
+    A background thread polls ``CURRENT``; when it changes, the new version
+    is opened and verified on that thread and then swapped in with a single
+    reference assignment. Every call reads the reference once, so queries
+    already in flight finish on the version they started with, and a bad
+    artifact is logged and skipped while the old one keeps serving.
+    """
+
+    def __init__(self, artifact_dir: str, embedding_model: EmbeddingModel, poll_seconds: float = 30.0):
+        """Load the current artifact and start watching for new ones.
+
+        Args:
+            artifact_dir: Directory written by ``build_artifact``
+            embedding_model: Model used to embed queries
+            poll_seconds: How often to check ``CURRENT``
+        """
+        self.artifact_dir = artifact_dir
+        self.embedding_model = embedding_model
+        self.poll_seconds = poll_seconds
+        version = read_current(artifact_dir)
+        if version is None:
+            raise ValueError(f"No published index artifact in {artifact_dir}")
+        self._store, self.manifest = load_artifact(os.path.join(artifact_dir, version), embedding_model)
+        self.version = version
+        self._stop = threading.Event()
+        self._watcher = threading.Thread(target=self._watch, name="index-reloader", daemon=True)
+        self._watcher.start()
+        logger.info(f"Serving index artifact {version}")
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_seconds):
+            self.check_for_update()
+
+    def check_for_update(self) -> bool:
+        """Load and swap in a newly published version; returns True if swapped."""
+        version = read_current(self.artifact_dir)
+        if version is None or version == self.version:
+            return False
+        try:
+            store, manifest = load_artifact(os.path.join(self.artifact_dir, version), self.embedding_model)
+        except Exception as e:
+            logger.error(f"Not reloading index artifact {version}: {str(e)}")
+            return False
+        self._store, self.manifest, self.version = store, manifest, version
+        logger.info(f"Hot-reloaded index artifact {version}")
+        return True
+
+    def stop(self) -> None:
+        """Stop watching for new versions."""
+        self._stop.set()
+
+    @property
+    def processed_docs(self):
+        return self._store.processed_docs
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def memory_bytes(self) -> int:
+        return self._store.memory_bytes()
+
+    def document_exists(self, document_id: str) -> bool:
+        return self._store.document_exists(document_id)
+
+    def export_chunks(self) -> Tuple[np.ndarray, List[str], List[str]]:
+        return self._store.export_chunks()
+
+    def add_documents(self, documents: List[str], document_id: str, source: Optional[str] = None) -> None:
+        raise ReadOnlyStoreError("Index artifacts are read-only")
+
+    def add_embeddings(self, documents: List[str], embeddings: List[List[float]],
+                       document_id: str, source: Optional[str] = None) -> None:
+        raise ReadOnlyStoreError("Index artifacts are read-only")
+
+    def search(self, query: str, top_k: int = 5) -> List[str]:
+        return self._store.search(query, top_k=top_k)
+
+    def search_with_scores(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
+        return self._store.search_with_scores(query, top_k=top_k)
+
+    def search_by_vector(self, embedding: List[float], top_k: int = 5) -> List[Tuple[str, float]]:
+        return self._store.search_by_vector(embedding, top_k=top_k)
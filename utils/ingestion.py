@@ -0,0 +1,143 @@
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import List, Optional
+from config.config import CHUNK_SIZE, CHUNK_OVERLAP
+from utils.rag_utils import VectorStore, load_document_pages, chunk_text
+from utils.profiling import profile_request
+
+logger = logging.getLogger(__name__)
+
+# Job states
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+class JobCancelled(Exception):
+    """Raised inside a worker when its job has been cancelled."""
+
+class IngestionJob:
+    """Progress and control handle for one document being ingested.
+
+    Progress counters are written by the worker thread and read by the UI;
+    each is a plain int so reads never need a lock.
+    """
+
+    def __init__(self, file_name: str, content_hash: str):
+        self.job_id = uuid.uuid4().hex
+        self.file_name = file_name
+        self.content_hash = content_hash
+        self.status = PENDING
+        self.pages_total = 0
+        self.pages_parsed = 0
+        self.chunks_total = 0
+        self.chunks_embedded = 0
+        self.error: Optional[str] = None
+        self._cancel_event = threading.Event()
+        self._future: Optional[Future] = None
+
+    @property
+    def done(self) -> bool:
+        """Whether the job has reached a terminal state."""
+        return self.status in (COMPLETED, FAILED, CANCELLED)
+
+    @property
+    def progress(self) -> float:
+        """Fraction complete in [0, 1]; parsing and embedding count half each."""
+        if self.status == COMPLETED:
+            return 1.0
+        parsed = self.pages_parsed / self.pages_total if self.pages_total else 0.0
+        embedded = self.chunks_embedded / self.chunks_total if self.chunks_total else 0.0
+        return 0.5 * parsed + 0.5 * embedded
+
+    def describe(self) -> str:
+        """Short human-readable progress line."""
+        return (f"{self.pages_parsed}/{self.pages_total} pages parsed, "
+                f"{self.chunks_embedded}/{self.chunks_total} chunks embedded")
+
+    def cancel(self) -> None:
+        """Request cancellation; the worker stops at its next checkpoint."""
+        self._cancel_event.set()
+        if self._future is not None and self._future.cancel():
+            # Never started, so no worker will update the status
+            self.status = CANCELLED
+
+    def _check_cancelled(self) -> None:
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+
+class IngestionQueue:
+    """Process-wide pool that parses, chunks and embeds uploads off the UI thread.
+
+    Results are merged into the target ``VectorStore`` only when a job
+    finishes, so a cancelled or failed job leaves the index untouched.
+    """
+
+    def __init__(self, max_workers: int = 2, embed_batch_size: int = 32):
+        """Initialize the worker pool.
+
+        Args:
+            max_workers: Number of documents ingested concurrently
+            embed_batch_size: Chunks per embedding call (cancellation checkpoint)
+        """
+        self.embed_batch_size = embed_batch_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingestion")
+
+    def submit(self, vector_store: VectorStore, data: bytes, file_name: str, content_hash: str) -> IngestionJob:
+        """Queue a document for ingestion.
+
+        Args:
+            vector_store: Store the chunks are merged into on completion
+            data: Raw file contents
+            file_name: Original file name, shown as the chunk source
+            content_hash: Document identifier from ``compute_content_hash``
+
+        Returns:
+            The job handle for progress reporting and cancellation
+        """
+        job = IngestionJob(file_name, content_hash)
+        job._future = self._executor.submit(self._run, job, vector_store, data)
+        return job
+
+    def _run(self, job: IngestionJob, vector_store: VectorStore, data: bytes) -> None:
+        with profile_request(job.job_id, kind="ingest"):
+            self._ingest(job, vector_store, data)
+
+    def _ingest(self, job: IngestionJob, vector_store: VectorStore, data: bytes) -> None:
+        job.status = RUNNING
+        try:
+            job.pages_total, pages = load_document_pages(data, job.file_name)
+            page_texts = []
+            for page_text in pages:
+                job._check_cancelled()
+                page_texts.append(page_text)
+                job.pages_parsed += 1
+
+            chunks = chunk_text("".join(page_texts), chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP)
+            job.chunks_total = len(chunks)
+
+            embeddings: List[List[float]] = []
+            for start in range(0, len(chunks), self.embed_batch_size):
+                job._check_cancelled()
+                batch = chunks[start:start + self.embed_batch_size]
+                embeddings.extend(vector_store.embedding_model.embed_documents(batch))
+                job.chunks_embedded += len(batch)
+
+            job._check_cancelled()
+            vector_store.add_embeddings(chunks, embeddings, job.content_hash, source=job.file_name)
+            job.status = COMPLETED
+            logger.info(f"Ingested {job.file_name} ({len(chunks)} chunks)")
+        except JobCancelled:
+            job.status = CANCELLED
+            logger.info(f"Ingestion of {job.file_name} cancelled")
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+            logger.error(f"Error ingesting {job.file_name}: {str(e)}")
+
+    def shutdown(self) -> None:
+        """Stop accepting jobs and cancel those not yet started."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
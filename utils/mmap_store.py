@@ -0,0 +1,186 @@
+import os
+import json
+import shutil
+import logging
+import tempfile
+import numpy as np
+from typing import List, Optional, Tuple
+from models.embeddings import EmbeddingModel
+from utils.document_processor import normalize_vectors, top_k_similar
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+# Files making up an on-disk store
+META_FILE = "meta.json"
+VECTORS_FILE = "vectors.f32"
+TEXTS_FILE = "texts.bin"
+OFFSETS_FILE = "offsets.npy"
+SOURCE_IDS_FILE = "source_ids.npy"
+SOURCES_FILE = "sources.json"
+
+class ReadOnlyStoreError(TypeError):
+    """Raised when chunks are added to a vector store that cannot be written to."""
+
+def write_mmap_store(path: str, vectors: np.ndarray, texts: List[str], sources: List[str],
+                     processed_docs: Optional[List[str]] = None) -> None:
+    """Write chunks in the memory-mappable on-disk format.
+
+    The store is a directory holding a raw float32 vector matrix, one UTF-8
+    blob with all chunk texts plus an int64 offsets array into it, and an
+    int32 source-id column with the distinct source names stored once. The
+    directory is assembled next to ``path`` and renamed into place, so
+    readers never see a half-written store.
+
+    Args:
+        path: Target directory; must not already exist
+        vectors: Array of shape (n, dimension)
+        texts: Chunk text for each vector
+        sources: Source name for each vector
+        processed_docs: Document ids recorded as indexed
+    """
+    if not (len(vectors) == len(texts) == len(sources)):
+        raise ValueError("vectors, texts and sources must have the same length")
+
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".mmap-", dir=parent)
+    try:
+        vectors = normalize_vectors(vectors) if len(vectors) else np.empty((0, 0), dtype=np.float32)
+        vectors.tofile(os.path.join(staging, VECTORS_FILE))
+
+        encoded = [text.encode('utf-8') for text in texts]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(blob) for blob in encoded], out=offsets[1:])
+        with open(os.path.join(staging, TEXTS_FILE), 'wb') as f:
+            for blob in encoded:
+                f.write(blob)
+        np.save(os.path.join(staging, OFFSETS_FILE), offsets)
+
+        source_names = sorted(set(sources))
+        source_index = {name: i for i, name in enumerate(source_names)}
+        np.save(os.path.join(staging, SOURCE_IDS_FILE),
+                np.array([source_index[s] for s in sources], dtype=np.int32))
+        with open(os.path.join(staging, SOURCES_FILE), 'w', encoding='utf-8') as f:
+            json.dump(source_names, f)
+
+        with open(os.path.join(staging, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump({
+                "format_version": FORMAT_VERSION,
+                "count": int(vectors.shape[0]),
+                "dimension": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+                "processed_docs": sorted(processed_docs or []),
+            }, f)
+
+        os.rename(staging, path)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+def export_vector_store(store, path: str) -> None:
+    """Write any store exposing ``export_chunks`` (flat or sharded) to ``path``."""
+    vectors, texts, sources = store.export_chunks()
+    write_mmap_store(path, vectors, texts, sources, processed_docs=list(store.processed_docs))
+
+class MmapVectorStore:
+    """Read-only vector store served straight from memory-mapped files.
+
+    Opening only reads the small metadata files; vectors, chunk texts and
+    offsets are mapped with ``np.memmap`` and paged in on demand, so every
+    worker process on a host shares one physical copy through the page cache.
+    Search is an exact blockwise scan, scored by cosine similarity like
+    ``VectorStore.search_by_vector``.
+    """
+
+    def __init__(self, path: str, embedding_model: EmbeddingModel, block_size: int = 65536):
+        """Open an on-disk store written by ``write_mmap_store``.
+
+        Args:
+            path: Store directory
+            embedding_model: Model used to embed queries
+            block_size: Rows scanned per matrix product, bounding scratch memory
+        """
+        self.path = path
+        self.embedding_model = embedding_model
+        self.block_size = block_size
+        try:
+            with open(os.path.join(path, META_FILE), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get("format_version") != FORMAT_VERSION:
+                raise ValueError(f"Unsupported store format: {meta.get('format_version')}")
+            self.count = meta["count"]
+            self.dimension = meta["dimension"]
+            self.processed_docs = set(meta.get("processed_docs", []))
+
+            if self.count:
+                self.vectors = np.memmap(os.path.join(path, VECTORS_FILE), dtype=np.float32,
+                                         mode='r', shape=(self.count, self.dimension))
+                self._texts = np.memmap(os.path.join(path, TEXTS_FILE), dtype=np.uint8, mode='r')
+            else:
+                self.vectors = np.empty((0, self.dimension), dtype=np.float32)
+                self._texts = np.empty(0, dtype=np.uint8)
+            self._offsets = np.load(os.path.join(path, OFFSETS_FILE), mmap_mode='r')
+            self._source_ids = np.load(os.path.join(path, SOURCE_IDS_FILE), mmap_mode='r')
+            with open(os.path.join(path, SOURCES_FILE), 'r', encoding='utf-8') as f:
+                self._sources = json.load(f)
+        except Exception as e:
+            raise Exception(f"Error opening memory-mapped vector store: {e}")
+
+    def __len__(self) -> int:
+        return self.count
+
+    def memory_bytes(self) -> int:
+        """Private heap usage; the mapped files live in the shared page cache."""
+        return sum(len(source) for source in self._sources)
+
+    def document_exists(self, document_id: str) -> bool:
+        """Check if a document is part of this store."""
+        return document_id in self.processed_docs
+
+    def chunk_text(self, position: int) -> str:
+        """Decode the text of one chunk."""
+        start, end = self._offsets[position], self._offsets[position + 1]
+        return self._texts[start:end].tobytes().decode('utf-8')
+
+    def chunk_source(self, position: int) -> str:
+        """Source name of one chunk."""
+        return self._sources[self._source_ids[position]]
+
+    def export_chunks(self) -> Tuple[np.ndarray, List[str], List[str]]:
+        """Return (vectors, chunk texts, sources) for every chunk."""
+        return (np.asarray(self.vectors),
+                [self.chunk_text(i) for i in range(self.count)],
+                [self.chunk_source(i) for i in range(self.count)])
+
+    def add_documents(self, documents: List[str], document_id: str, source: Optional[str] = None) -> None:
+        raise ReadOnlyStoreError("Memory-mapped vector stores are read-only")
+
+    def add_embeddings(self, documents: List[str], embeddings: List[List[float]],
+                       document_id: str, source: Optional[str] = None) -> None:
+        raise ReadOnlyStoreError("Memory-mapped vector stores are read-only")
+
+    def search(self, query: str, top_k: int = 5) -> List[str]:
+        """Search for relevant document chunks."""
+        return [text for text, _ in self.search_with_scores(query, top_k=top_k)]
+
+    def search_with_scores(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
+        """Search and return (formatted chunk, similarity) pairs."""
+        if not self.count:
+            return []
+        embedding = self.embedding_model.embed_query(query)
+        return self.search_by_vector(embedding, top_k=top_k)
+
+    def search_by_vector(self, embedding: List[float], top_k: int = 5) -> List[Tuple[str, float]]:
+        """Exact top-k over the mapped vectors, one block at a time."""
+        if not self.count:
+            return []
+        query = normalize_vectors(np.asarray(embedding, dtype=np.float32))
+        best: List[Tuple[float, int]] = []
+        for start in range(0, self.count, self.block_size):
+            block = self.vectors[start:start + self.block_size]
+            scores, indices = top_k_similar(block, query, top_k)
+            best.extend((float(score), start + int(idx)) for score, idx in zip(scores[0], indices[0]))
+            best = sorted(best, reverse=True)[:top_k]
+
+        return [(f"From {self.chunk_source(pos)}: {self.chunk_text(pos)}", score) for score, pos in best]
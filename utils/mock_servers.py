@@ -0,0 +1,185 @@
+import json
+import time
+import random
+import asyncio
+import logging
+import threading
+from typing import Dict, Optional
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+LOREM = ("Dogs and cats need fresh water, a balanced diet and regular veterinary check-ups. "
+         "Watch for changes in appetite, energy or behaviour and ask a vet when in doubt. ").split()
+
+class MockServer:
+    """Local aiohttp server running on its own event loop in a daemon thread.
+
+    Used by the load-test harness to stand in for remote APIs without
+    network access. The loop is separate from ``async_runtime``'s, so the
+    server does not compete with the clients it is measuring.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        """Initialize the server; ``port`` 0 picks a free port on ``start``."""
+        self.host = host
+        self.port = port
+        self.stats: Dict[str, int] = {}
+        self._stats_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def count(self, key: str) -> None:
+        """Increment a request counter."""
+        with self._stats_lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def routes(self, app: web.Application) -> None:
+        """Register handlers; implemented by subclasses."""
+        raise NotImplementedError
+
+    async def _start(self) -> None:
+        app = web.Application()
+        self.routes(app)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    def start(self) -> "MockServer":
+        """Start serving and return once the port is bound."""
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name=type(self).__name__, daemon=True).start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result(timeout=10)
+        logger.info(f"{type(self).__name__} listening on {self.url}")
+        return self
+
+    def stop(self) -> None:
+        """Shut the server down and stop its loop."""
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(timeout=10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+
+class MockTogetherServer(MockServer):
+    """Stand-in for Together's OpenAI-compatible ``/v1/chat/completions``.
+
+    Responses take ``ttft`` seconds before the first token and then
+    ``1 / tokens_per_second`` per token, for ``min(max_tokens,
+    response_tokens)`` tokens. Streaming requests receive the tokens as
+    server-sent events at that pace. A ``rate_limit_rate`` fraction of
+    requests is answered with 429.
+    """
+
+    def __init__(self, ttft: float = 0.3, tokens_per_second: float = 50.0, response_tokens: int = 200,
+                 rate_limit_rate: float = 0.0, seed: Optional[int] = None, **kwargs):
+        """Initialize the mock.
+
+        Args:
+            ttft: Seconds before the first token
+            tokens_per_second: Generation speed after the first token
+            response_tokens: Tokens generated when ``max_tokens`` allows
+            rate_limit_rate: Fraction of requests answered with HTTP 429
+            seed: Seed for the rate-limit draws
+        """
+        super().__init__(**kwargs)
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.rate_limit_rate = rate_limit_rate
+        self._random = random.Random(seed)
+
+    def routes(self, app: web.Application) -> None:
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+
+    async def chat_completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        self.count("requests")
+        if self._random.random() < self.rate_limit_rate:
+            self.count("rate_limited")
+            return web.json_response(
+                {"error": {"message": "Rate limit exceeded", "type": "rate_limit_exceeded"}},
+                status=429, headers={"Retry-After": "1"})
+
+        n_tokens = max(1, min(body.get("max_tokens") or self.response_tokens, self.response_tokens))
+        tokens = [LOREM[i % len(LOREM)] + " " for i in range(n_tokens)]
+        model = body.get("model", "mock")
+        created = int(time.time())
+        await asyncio.sleep(self.ttft)
+
+        if body.get("stream"):
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+            await response.prepare(request)
+            for token in tokens:
+                chunk = {"id": "mock", "object": "chat.completion.chunk", "created": created, "model": model,
+                         "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+                await response.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                await asyncio.sleep(1.0 / self.tokens_per_second)
+            await response.write(b"data: [DONE]\n\n")
+            await response.write_eof()
+            return response
+
+        await asyncio.sleep(n_tokens / self.tokens_per_second)
+        if request.transport is None or request.transport.is_closing():
+            # The client gave up (e.g. a cancelled generation) before the answer was ready
+            self.count("aborted")
+        prompt_tokens = sum(len(m.get("content", "").split()) for m in body.get("messages", []))
+        return web.json_response({
+            "id": "mock",
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)},
+                         "finish_reason": "length" if n_tokens < self.response_tokens else "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": n_tokens,
+                      "total_tokens": prompt_tokens + n_tokens},
+        })
+
+class MockTavilyServer(MockServer):
+    """Stand-in for Tavily's ``/search`` plus the pages its results link to.
+
+    Results point back at ``/page/<n>`` on this server, so the page fetcher
+    is exercised too. Both endpoints answer after a fixed latency.
+    """
+
+    def __init__(self, latency: float = 0.5, page_latency: float = 0.2, page_bytes: int = 20000, **kwargs):
+        """Initialize the mock.
+
+        Args:
+            latency: Seconds before a search response
+            page_latency: Seconds before a page response
+            page_bytes: Approximate size of each HTML page
+        """
+        super().__init__(**kwargs)
+        self.latency = latency
+        self.page_latency = page_latency
+        paragraph = "<p>" + " ".join(LOREM) + "</p>\n"
+        self._page = ("<html><head><title>Pet care</title></head><body>"
+                      + paragraph * max(1, page_bytes // len(paragraph)) + "</body></html>").encode('utf-8')
+
+    def routes(self, app: web.Application) -> None:
+        app.router.add_post("/search", self.search)
+        app.router.add_get("/page/{page}", self.page)
+
+    async def search(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self.count("searches")
+        await asyncio.sleep(self.latency)
+        results = [{
+            "title": f"Pet care result {i}",
+            "url": f"{self.url}/page/{i}",
+            "content": " ".join(LOREM[:20]),
+            "score": 0.9 - i * 0.1,
+        } for i in range(body.get("max_results", 5))]
+        return web.json_response({"query": body.get("query", ""), "results": results})
+
+    async def page(self, request: web.Request) -> web.Response:
+        self.count("pages")
+        await asyncio.sleep(self.page_latency)
+        return web.Response(body=self._page, content_type="text/html")
@@ -0,0 +1,272 @@
+import os
+import time
+import shutil
+import uuid
+import heapq
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from models.embeddings import EmbeddingModel
+from utils.rag_utils import VectorStore
+
+logger = logging.getLogger(__name__)
+
+class OverlayLimitError(Exception):
+    """Raised when an upload would push a user's overlay past its memory cap."""
+
+class OverlayManager:
+    """Process-wide registry of small per-user upload indexes.
+
+    At most ``max_resident`` overlays are kept in memory. The least recently
+    used ones, and any idle for longer than ``idle_seconds``, are spilled to
+    ``spill_dir`` and transparently reloaded on their next access. Overlays
+    being written to are pinned and never spilled mid-write.
+    """
+
+    def __init__(self, embedding_model: EmbeddingModel, spill_dir: str,
+                 max_bytes: int = 32 * 1024 * 1024, max_resident: int = 50,
+                 idle_seconds: float = 900):
+        """Initialize the manager.
+
+        Args:
+            embedding_model: Shared model used by every overlay
+            spill_dir: Directory where evicted overlays are written
+            max_bytes: Memory cap for a single user's overlay
+            max_resident: Maximum overlays held in memory at once
+            idle_seconds: Overlays untouched for this long are spilled
+        """
+        self.embedding_model = embedding_model
+        self.spill_dir = spill_dir
+        self.max_bytes = max_bytes
+        self.max_resident = max_resident
+        self.idle_seconds = idle_seconds
+        self._overlays: "OrderedDict[str, Tuple[VectorStore, float]]" = OrderedDict()
+        self._pins: Dict[str, int] = {}
+        # Evicted overlays whose spill is still being written, and the latest
+        # spill generation per session so an older write never replaces a newer one
+        self._spilling: Dict[str, Tuple[VectorStore, int]] = {}
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.RLock()
+
+    def _spill_path(self, session_id: str) -> str:
+        return os.path.join(self.spill_dir, session_id)
+
+    def get(self, session_id: str) -> VectorStore:
+        """Return the overlay for a session, reloading it from disk if spilled."""
+        with self._lock:
+            if session_id in self._overlays:
+                overlay, _ = self._overlays.pop(session_id)
+            elif session_id in self._spilling:
+                # Still being written out; the in-memory copy is current
+                overlay, _ = self._spilling.pop(session_id)
+            else:
+                path = self._spill_path(session_id)
+                if os.path.isdir(path):
+                    overlay = VectorStore.load(path, self.embedding_model)
+                    # Only delete the spill once it has loaded
+                    shutil.rmtree(path, ignore_errors=True)
+                    logger.info(f"Reloaded spilled overlay for session {session_id}")
+                else:
+                    overlay = VectorStore(self.embedding_model)
+            self._overlays[session_id] = (overlay, time.monotonic())
+            evicted = self._evict()
+        self._spill_all(evicted)
+        return overlay
+
+    @contextmanager
+    def pinned(self, session_id: str) -> Iterator[VectorStore]:
+        """The session's overlay, kept resident until the block exits.
+
+        Writes must go through this: an overlay spilled while chunks are
+        being added would keep them only in a detached copy that is never
+        saved again.
+        """
+        with self._lock:
+            self._pins[session_id] = self._pins.get(session_id, 0) + 1
+        try:
+            yield self.get(session_id)
+        finally:
+            with self._lock:
+                self._pins[session_id] -= 1
+                if not self._pins[session_id]:
+                    del self._pins[session_id]
+
+    def peek(self, session_id: str) -> Optional[VectorStore]:
+        """Return a resident overlay without reloading or creating one."""
+        with self._lock:
+            entry = self._overlays.get(session_id) or self._spilling.get(session_id)
+            return entry[0] if entry else None
+
+    def has_overlay(self, session_id: str) -> bool:
+        """Whether the session has uploads, resident or spilled."""
+        with self._lock:
+            overlay = self.peek(session_id)
+            if overlay is not None:
+                return len(overlay) > 0
+            return os.path.isdir(self._spill_path(session_id))
+
+    def check_capacity(self, overlay: VectorStore, texts: List[str], embeddings: List[List[float]]) -> None:
+        """Raise OverlayLimitError if adding these chunks would exceed the cap."""
+        added = sum(len(t.encode('utf-8')) for t in texts)
+        if embeddings:
+            added += len(embeddings) * len(embeddings[0]) * 4
+        if overlay.memory_bytes() + added > self.max_bytes:
+            raise OverlayLimitError(
+                f"Upload limit reached ({self.max_bytes // (1024 * 1024)} MB per user)"
+            )
+
+    def _spill(self, session_id: str, overlay: VectorStore, generation: int) -> None:
+        """Write an evicted overlay to a temporary directory, then swap it into place.
+
+        Runs without the manager lock. Only the swap takes it, and a write
+        superseded by a later spill or a drop of the same session is discarded.
+        """
+        temp_path = os.path.join(self.spill_dir, f".{session_id}.{uuid.uuid4().hex}")
+        try:
+            overlay.save(temp_path)
+        except Exception as e:
+            logger.error(f"Error spilling overlay for session {session_id}: {str(e)}")
+            shutil.rmtree(temp_path, ignore_errors=True)
+            with self._lock:
+                # Keep it in memory rather than lose the uploads
+                if self._spilling.get(session_id, (None, None))[1] == generation:
+                    del self._spilling[session_id]
+                    self._overlays[session_id] = (overlay, time.monotonic())
+            return
+
+        stale_path = temp_path
+        with self._lock:
+            if self._generations.get(session_id) == generation:
+                path = self._spill_path(session_id)
+                stale_path = None
+                if os.path.isdir(path):
+                    stale_path = f"{temp_path}.old"
+                    os.rename(path, stale_path)
+                os.rename(temp_path, path)
+                if self._spilling.get(session_id, (None, None))[1] == generation:
+                    del self._spilling[session_id]
+                logger.info(f"Spilled overlay for session {session_id} to disk")
+        if stale_path:
+            shutil.rmtree(stale_path, ignore_errors=True)
+
+    def _spill_all(self, evicted: List[Tuple[str, VectorStore, int]]) -> None:
+        for session_id, overlay, generation in evicted:
+            self._spill(session_id, overlay, generation)
+
+    def _evict(self) -> List[Tuple[str, VectorStore, int]]:
+        """Take the overlays due for spilling out of the LRU.
+
+        Must be called with the lock held; the caller passes the result to
+        ``_spill_all`` after releasing it.
+        """
+        now = time.monotonic()
+        evicted = []
+        # Least recently used first; pinned overlays are skipped, not spilled
+        for session_id, (overlay, last_used) in list(self._overlays.items()):
+            if len(self._overlays) <= self.max_resident and now - last_used < self.idle_seconds:
+                break
+            if session_id in self._pins:
+                continue
+            del self._overlays[session_id]
+            if len(overlay) == 0 and not overlay.processed_docs:
+                continue
+            generation = self._generations.get(session_id, 0) + 1
+            self._generations[session_id] = generation
+            self._spilling[session_id] = (overlay, generation)
+            evicted.append((session_id, overlay, generation))
+        return evicted
+
+    def evict_idle(self) -> None:
+        """Spill overlays that have been idle for longer than ``idle_seconds``."""
+        with self._lock:
+            evicted = self._evict()
+        self._spill_all(evicted)
+
+    def drop(self, session_id: str) -> None:
+        """Forget a session's overlay, both in memory and on disk."""
+        with self._lock:
+            self._overlays.pop(session_id, None)
+            self._spilling.pop(session_id, None)
+            # Discards any spill of this session still being written
+            self._generations[session_id] = self._generations.get(session_id, 0) + 1
+            shutil.rmtree(self._spill_path(session_id), ignore_errors=True)
+
+    def prune(self, max_age_seconds: float) -> int:
+        """Delete spilled overlays not written for longer than ``max_age_seconds``.
+
+        Returns:
+            Number of overlays deleted
+        """
+        if not os.path.isdir(self.spill_dir):
+            return 0
+        cutoff = time.time() - max_age_seconds
+        pruned = 0
+        with self._lock:
+            for session_id in os.listdir(self.spill_dir):
+                path = self._spill_path(session_id)
+                if session_id in self._overlays or session_id in self._spilling or not os.path.isdir(path):
+                    continue
+                try:
+                    if os.path.getmtime(path) >= cutoff:
+                        continue
+                except OSError:
+                    continue
+                shutil.rmtree(path, ignore_errors=True)
+                pruned += 1
+        if pruned:
+            logger.info(f"Deleted {pruned} spilled overlays older than {max_age_seconds / 86400:g} days")
+        return pruned
+
+class LayeredVectorStore:
+    """Read-only shared base index plus a per-user overlay, queried together.
+
+    Exposes the subset of the ``VectorStore`` interface used by the app and
+    the ingestion queue. Writes always go to the overlay; searches embed the
+    query once, search both layers and merge the hits by similarity.
+    """
+
+    def __init__(self, base: VectorStore, overlays: OverlayManager, session_id: str):
+        self.base = base
+        self.overlays = overlays
+        self.session_id = session_id
+        self.embedding_model = base.embedding_model
+
+    def document_exists(self, document_id: str) -> bool:
+        """Check the base index and this user's overlay."""
+        if self.base.document_exists(document_id):
+            return True
+        if not self.overlays.has_overlay(self.session_id):
+            return False
+        return self.overlays.get(self.session_id).document_exists(document_id)
+
+    def add_documents(self, documents: List[str], document_id: str, source: Optional[str] = None) -> None:
+        """Embed and add chunks to this user's overlay."""
+        if not documents:
+            return
+        embeddings = self.embedding_model.embed_documents(documents)
+        self.add_embeddings(documents, embeddings, document_id, source=source)
+
+    def add_embeddings(self, documents: List[str], embeddings: List[List[float]],
+                       document_id: str, source: Optional[str] = None) -> None:
+        """Add precomputed chunks to this user's overlay, enforcing its cap."""
+        with self.overlays.pinned(self.session_id) as overlay:
+            self.overlays.check_capacity(overlay, documents, embeddings)
+            overlay.add_embeddings(documents, embeddings, document_id, source=source)
+
+    def search(self, query: str, top_k: int = 5) -> List[str]:
+        """Search both layers and return the merged chunk texts."""
+        return [text for text, _ in self.search_with_scores(query, top_k=top_k)]
+
+    def search_with_scores(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
+        """Search both layers and merge (chunk, similarity) pairs by score."""
+        embedding = self.embedding_model.embed_query(query)
+        return self.search_by_vector(embedding, top_k=top_k)
+
+    def search_by_vector(self, embedding: List[float], top_k: int = 5) -> List[Tuple[str, float]]:
+        """Search both layers with a precomputed query embedding."""
+        results = self.base.search_by_vector(embedding, top_k=top_k)
+        if self.overlays.has_overlay(self.session_id):
+            results += self.overlays.get(self.session_id).search_by_vector(embedding, top_k=top_k)
+        return heapq.nlargest(top_k, results, key=lambda item: item[1])
@@ -0,0 +1,158 @@
+import time
+import logging
+from contextlib import contextmanager, nullcontext
+from typing import Callable, ContextManager, Dict, Iterator, List, Optional, Tuple
+from config.config import (WEB_FETCH_TOP_N, CONTEXT_COMPRESSION_ENABLED, COMPRESSION_MIN_SCORE,
+                           get_response_profile)
+from utils.web_search import tavily_search, fetch_webpage_contents
+from utils.context_compression import compress_context
+from utils.cancellation import CancelToken
+from utils.safety_index import SafetyIndex
+from utils.score_calibration import ScoreThresholds
+
+logger = logging.getLogger(__name__)
+
+@contextmanager
+def timed(timings: Optional[Dict[str, float]], stage: str) -> Iterator[None]:
+    """Add the wall time of a block to ``timings[stage]``, if timings are collected."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+
+def species_query(query: str, selected_pet: str) -> str:
+    """Prefix the selected species to a query for better retrieval."""
+    if selected_pet != "All species":
+        return f"{selected_pet} {query}"
+    return query
+
+def retrieve_context(vector_store, query: str, top_k: int) -> List[Tuple[str, float]]:
+    """Search the local index; returns (chunk text, similarity) pairs, best first."""
+    try:
+        if vector_store:
+            return vector_store.search_with_scores(query, top_k=top_k)
+        return []
+    except Exception as e:
+        logger.error(f"Error searching documents: {str(e)}")
+        return []
+
+def gather_web_context(query: str, num_results: int = 5,
+                       timings: Optional[Dict[str, float]] = None,
+                       cancel: Optional[CancelToken] = None) -> List[str]:
+    """Search the web and return context strings for the top results.
+
+    The top pages are enriched with their full text, fetched concurrently;
+    Tavily's snippet is the fallback. ``cancel`` bounds the search by its
+    deadline, aborts the fetches and is checked after each.
+    """
+    with timed(timings, "web_search"):
+        search_results = tavily_search(query=query, search_depth="basic", max_results=num_results,
+                                       cancel=cancel)
+    if cancel is not None:
+        cancel.check()
+    if not search_results:
+        return []
+
+    top_results = search_results[:2]  # Limit to top 2 results
+    with timed(timings, "web_fetch"):
+        pages = fetch_webpage_contents([r["link"] for r in top_results[:WEB_FETCH_TOP_N]], cancel=cancel)
+    if cancel is not None:
+        cancel.check()
+    web_results = []
+    for i, result in enumerate(top_results):
+        content = (pages[i] if i < len(pages) else None) or result.get("snippet", "")
+        if content:
+            web_results.append(f"From {result['title']} ({result['link']}):\n{content}")
+    return web_results
+
+def answer_query(query: str, response_mode: str, selected_pet: str, vector_store, llm,
+                 use_web_search: bool = True, timings: Optional[Dict[str, float]] = None,
+                 web_search_status: Callable[[], ContextManager] = nullcontext,
+                 embedding_model=None, cancel: Optional[CancelToken] = None,
+                 safety_index: Optional[SafetyIndex] = None,
+                 score_thresholds: Optional[ScoreThresholds] = None) -> str:
+    """Run the RAG pipeline for one question: retrieve, optionally search the web, generate.
+
+    This is the UI-independent core of the chat app, shared by ``app.py`` and
+    the load-test harness.
+
+    Args:
+        query: User question
+        response_mode: Key of config.RESPONSE_MODES
+        selected_pet: Species selected in the sidebar, or "All species"
+        vector_store: Store searched for local context
+        llm: ``ModelRouter`` used for generation
+        use_web_search: Allow falling back to web search
+        timings: Optional dict that receives seconds spent per stage
+            ("fast_path", "retrieval", "web_search", "web_fetch", "compression", "generation")
+        web_search_status: Context manager factory wrapped around the web
+            search, e.g. a spinner
+        embedding_model: Model used to compress the context to its most
+            relevant sentences; without it the context is sent whole
+        cancel: Optional token checked between stages and passed to the
+            LLM, whose request it aborts
+        safety_index: Optional ``SafetyIndex``; questions it can answer on
+            its own skip the rest of the pipeline
+        score_thresholds: Relevance and routing thresholds calibrated for ``vector_store``;
+            defaults to the configured ones
+
+    Returns:
+        Generated response text
+
+    Raises:
+        RequestCancelled: If ``cancel`` is cancelled before the answer is ready
+    """
+    if safety_index is not None:
+        with timed(timings, "fast_path"):
+            fast_answer = safety_index.answer(query, selected_pet)
+        if fast_answer is not None:
+            return fast_answer
+
+    thresholds = score_thresholds or ScoreThresholds.from_config()
+    search_query = species_query(query, selected_pet)
+    profile = get_response_profile(response_mode)
+    with timed(timings, "retrieval"):
+        scored_context = retrieve_context(vector_store, search_query, top_k=profile["top_k"])
+    best_score = scored_context[0][1] if scored_context else 0.0
+
+    # Only confident local matches go into the prompt
+    context = [text for text, score in scored_context if score >= thresholds.context_min]
+    logger.info(f"Local retrieval: best score {best_score:.3f}, "
+                f"{len(context)}/{len(scored_context)} chunks kept")
+
+    # If web search is enabled and the local knowledge base isn't confident, search the web
+    web_results = []
+    if use_web_search and best_score < thresholds.web_search:
+        if cancel is not None:
+            cancel.check()
+        with web_search_status():
+            web_results = gather_web_context(search_query, timings=timings, cancel=cancel)
+
+    # Combine local and web context
+    all_context = context + web_results
+    if CONTEXT_COMPRESSION_ENABLED and embedding_model is not None and all_context:
+        with timed(timings, "compression"):
+            all_context = compress_context(query, all_context, embedding_model,
+                                           max_sentences=profile["context_sentences"],
+                                           min_score=COMPRESSION_MIN_SCORE)
+        if cancel is not None:
+            cancel.check()
+
+    system_message = "You are a helpful pet care assistant providing accurate information about pets."
+    if selected_pet != "All species":
+        system_message += f" The user is specifically asking about {selected_pet}, so focus your response on that species."
+
+    if cancel is not None:
+        cancel.check()
+    with timed(timings, "generation"):
+        return llm.generate_response(
+            query,
+            context=all_context or None,
+            response_mode=response_mode,
+            system_message=system_message,
+            retrieval_score=best_score,
+            cancel=cancel,
+            confidence_threshold=thresholds.router
+        )
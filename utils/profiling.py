@@ -0,0 +1,107 @@
+import os
+import time
+import uuid
+import random
+import cProfile
+import logging
+import threading
+from contextlib import nullcontext
+from typing import ContextManager, Optional
+from config.config import PROFILING_ENABLED, PROFILE_SAMPLE_RATE, PROFILER, PROFILE_DIR
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+_DISABLED = nullcontext()
+# Profilers are process-wide on Python 3.12+, so only one request is
+# profiled at a time; overlapping requests simply run unprofiled
+_profiler_lock = threading.Lock()
+
+def new_request_id() -> str:
+    """Short random id used to correlate a request's logs and profile file."""
+    return uuid.uuid4().hex[:12]
+
+class RequestProfile:
+    """Profile one request and write the result to ``profile_dir``.
+
+    With ``profiler="cprofile"`` a deterministic cProfile ``.prof`` file is
+    written (read it with ``profile_summary.py`` or ``pstats``). With
+    ``"sampling"`` the optional ``pyinstrument`` sampling profiler is used,
+    which costs far less on call-heavy code, and a text report is written.
+    Only the calling thread is profiled.
+    """
+
+    def __init__(self, request_id: str, kind: str = "chat", profiler: str = PROFILER,
+                 profile_dir: str = PROFILE_DIR):
+        self.request_id = request_id
+        self.kind = kind
+        self.profiler = profiler
+        self.profile_dir = profile_dir
+        self.path: Optional[str] = None
+        self._profile = None
+        self._start = 0.0
+
+    def __enter__(self) -> "RequestProfile":
+        if not _profiler_lock.acquire(blocking=False):
+            logger.debug(f"Not profiling request {self.request_id}: another profile is running")
+            return self
+        try:
+            if self.profiler == "sampling" and pyinstrument is not None:
+                self._profile = pyinstrument.Profiler(async_mode="disabled")
+                self._profile.start()
+            else:
+                if self.profiler == "sampling":
+                    logger.warning("pyinstrument is not installed. Falling back to cProfile.")
+                self._profile = cProfile.Profile()
+                self._profile.enable()
+        except Exception as e:
+            logger.warning(f"Could not start profiler for request {self.request_id}: {str(e)}")
+            self._profile = None
+            _profiler_lock.release()
+            return self
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if self._profile is None:
+            return False
+        try:
+            elapsed = time.perf_counter() - self._start
+            os.makedirs(self.profile_dir, exist_ok=True)
+            name = f"{time.strftime('%Y%m%d-%H%M%S')}-{self.kind}-{self.request_id}"
+            if isinstance(self._profile, cProfile.Profile):
+                self._profile.disable()
+                self.path = os.path.join(self.profile_dir, name + ".prof")
+                self._profile.dump_stats(self.path)
+            else:
+                self._profile.stop()
+                self.path = os.path.join(self.profile_dir, name + ".txt")
+                with open(self.path, 'w', encoding='utf-8') as f:
+                    f.write(self._profile.output_text(unicode=True, color=False))
+            logger.info(f"Profiled {self.kind} request {self.request_id} ({elapsed * 1000:.0f} ms): {self.path}")
+        except Exception as e:
+            logger.warning(f"Could not write profile for request {self.request_id}: {str(e)}")
+        finally:
+            self._profile = None
+            _profiler_lock.release()
+        return False
+
+def profile_request(request_id: str, kind: str = "chat", force: bool = False) -> ContextManager:
+    """Context manager that profiles a request when profiling is switched on.
+
+    A request is profiled if ``force`` is set, ``PROFILING_ENABLED`` is true,
+    or it is picked by ``PROFILE_SAMPLE_RATE``. Otherwise a shared no-op
+    context is returned, so the disabled path costs two comparisons.
+
+    Args:
+        request_id: Id included in the profile file name
+        kind: Request type included in the file name, e.g. "chat" or "ingest"
+        force: Profile this request regardless of configuration
+    """
+    if not (force or PROFILING_ENABLED or (PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE)):
+        return _DISABLED
+    return RequestProfile(request_id, kind=kind)
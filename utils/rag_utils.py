@@ -1,10 +1,18 @@
 import os
+import io
+import json
+import hashlib
+import threading
 import PyPDF2
 from docx import Document
 import numpy as np
-from langchain_community.vectorstores import FAISS
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, BinaryIO, Iterator
+from config.config import (CHUNK_COMPRESSION, VECTOR_BACKEND, VECTOR_REDUCTION, VECTOR_REDUCED_DIMENSION,
+                           VECTOR_QUANTIZATION, VECTOR_RESCORE_FACTOR)
 from models.embeddings import EmbeddingModel
+from utils.chunk_store import ChunkStore
+from utils.vector_backends import VectorBackend, create_backend, save_backend, load_backend
+from utils.vector_compression import DimensionReducer, FullPrecisionVectors, rescore
 
 # --- All of your helper functions below are unchanged ---
 
@@ -23,23 +31,75 @@ def load_document(file_path: str) -> str:
     except Exception as e:
         raise Exception(f"Error loading document: {e}")
 
-def load_pdf(file_path: str) -> str:
-    """Load text from PDF file."""
+def load_document_bytes(data: bytes, file_name: str) -> str:
+    """Load document content from an in-memory buffer, e.g. a Streamlit upload.
+
+    Args:
+        data: Raw file contents
+        file_name: Original file name, used to pick the parser
+
+    Returns:
+        Extracted text
+    """
+    try:
+        _, pages = load_document_pages(data, file_name)
+        return "".join(pages)
+    except Exception as e:
+        raise Exception(f"Error loading document: {e}")
+
+def load_document_pages(data: bytes, file_name: str) -> Tuple[int, Iterator[str]]:
+    """Open an in-memory document for page-by-page extraction.
+
+    PDFs yield one item per page; DOCX and text files are a single page.
+
+    Args:
+        data: Raw file contents
+        file_name: Original file name, used to pick the parser
+
+    Returns:
+        Tuple of (page count, lazy iterator over page texts)
+    """
+    _, file_extension = os.path.splitext(file_name)
+    if file_extension.lower() == '.pdf':
+        reader = PyPDF2.PdfReader(io.BytesIO(data))
+        return len(reader.pages), (page.extract_text() + "\n" for page in reader.pages)
+    elif file_extension.lower() == '.docx':
+        return 1, iter([read_docx(io.BytesIO(data))])
+    elif file_extension.lower() in ['.txt', '.md', '.csv']:
+        return 1, iter([data.decode('utf-8', errors='replace')])
+    else:
+        raise ValueError(f"Unsupported file format: {file_extension}")
+
+def compute_content_hash(data: bytes) -> str:
+    """Return a stable identifier for a document's raw contents."""
+    return f"sha256:{hashlib.sha256(data).hexdigest()}"
+
+def read_pdf(stream: BinaryIO) -> str:
+    """Extract text from a binary PDF stream."""
     text = ""
-    with open(file_path, 'rb') as file:
-        reader = PyPDF2.PdfReader(file)
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
+    reader = PyPDF2.PdfReader(stream)
+    for page in reader.pages:
+        text += page.extract_text() + "\n"
     return text
 
-def load_docx(file_path: str) -> str:
-    """Load text from DOCX file."""
-    doc = Document(file_path)
+def read_docx(stream: BinaryIO) -> str:
+    """Extract text from a binary DOCX stream."""
+    doc = Document(stream)
     text = ""
     for para in doc.paragraphs:
         text += para.text + "\n"
     return text
 
+def load_pdf(file_path: str) -> str:
+    """Load text from PDF file."""
+    with open(file_path, 'rb') as file:
+        return read_pdf(file)
+
+def load_docx(file_path: str) -> str:
+    """Load text from DOCX file."""
+    with open(file_path, 'rb') as file:
+        return read_docx(file)
+
 def load_text(file_path: str) -> str:
     """Load text from TXT, MD, or CSV file."""
     with open(file_path, 'r', encoding='utf-8') as file:
@@ -66,55 +126,259 @@ def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> List[st
 # --- The VectorStore class is now corrected ---
 
 class VectorStore:
-    def __init__(self, embedding_model: EmbeddingModel, persist_dir: Optional[str] = None):
-        """Initialize the vector store using FAISS."""
+    def __init__(self, embedding_model: EmbeddingModel, persist_dir: Optional[str] = None,
+                 chunk_compression: Optional[str] = CHUNK_COMPRESSION, backend: str = VECTOR_BACKEND,
+                 reduction: str = VECTOR_REDUCTION, reduced_dimension: int = VECTOR_REDUCED_DIMENSION,
+                 quantization: str = VECTOR_QUANTIZATION, rescore_factor: int = VECTOR_RESCORE_FACTOR):
+        """Initialize the vector store.
+
+        Vectors live in a pluggable ``VectorBackend`` (FAISS by default, see
+        ``utils.vector_backends``); chunk texts and sources live in a
+        ``ChunkStore``, and a chunk's position there is its vector id.
+
+        Vectors can be compressed before indexing: reduced to fewer
+        dimensions (``utils.vector_compression``) and/or scalar-quantized by
+        the backend. The originals are then kept on disk, used to re-score
+        the best ``rescore_factor * top_k`` candidates exactly and returned
+        by ``export_chunks``.
+
+        Args:
+            embedding_model: Model used to embed documents and queries
+            persist_dir: Unused; kept for callers that pass it
+            chunk_compression: Compression for chunk texts
+            backend: Vector backend name ("faiss", "numpy" or "chroma")
+            reduction: "none", "truncate" or "pca"
+            reduced_dimension: Dimension kept by ``reduction``
+            quantization: "float32", "float16" or "int8"
+            rescore_factor: Candidates re-scored per result; 0 disables
+        """
         self.embedding_model = embedding_model
-        # REMOVED the incorrect line that was causing the error.
-        # self.langchain_embeddings = self.embedding_model.get_embedding_function() 
-        self.vector_store: Optional[FAISS] = None
+        self.backend_name = backend
+        self.backend: Optional[VectorBackend] = None
+        self.reducer = DimensionReducer(reduction, reduced_dimension) if reduction != "none" else None
+        self.quantization = quantization
+        self.rescore_factor = rescore_factor
+        self.originals: Optional[FullPrecisionVectors] = None
+        self.chunks = ChunkStore(compression=chunk_compression)
         self.processed_docs = set()
+        # Background ingestion jobs merge into the index while the session
+        # keeps searching it, so index access is serialized.
+        self._lock = threading.RLock()
 
     def document_exists(self, document_id: str) -> bool:
         """Check if a document has already been processed."""
         return document_id in self.processed_docs
 
-    def add_documents(self, documents: List[str], document_id: str) -> None:
-        """Add documents to the FAISS vector store."""
+    def add_documents(self, documents: List[str], document_id: str, source: Optional[str] = None) -> None:
+        """Add documents to the vector store.
+
+        Args:
+            documents: Chunk texts to embed and index
+            document_id: Identifier recorded in ``processed_docs``, e.g. a
+                file name or a content hash from ``compute_content_hash``
+            source: Name shown in search results; defaults to ``document_id``
+        """
+        if not documents:
+            return
         try:
-            metadatas = [{"source": document_id} for _ in documents]
-
-            if self.vector_store is None:
-                # Create a new FAISS index
-                # FIXED: Pass the entire embedding_model object directly
-                self.vector_store = FAISS.from_texts(
-                    texts=documents, 
-                    embedding=self.embedding_model, 
-                    metadatas=metadatas
-                )
-            else:
-                # Add new documents to the existing index
-                self.vector_store.add_texts(
-                    texts=documents, 
-                    metadatas=metadatas
-                )
-            
-            self.processed_docs.add(document_id)
+            embeddings = self.embedding_model.embed_documents(documents)
+        except Exception as e:
+            raise Exception(f"Error adding documents to vector store: {e}")
+        self.add_embeddings(documents, embeddings, document_id, source=source)
+
+    def add_embeddings(self, documents: List[str], embeddings: List[List[float]],
+                       document_id: str, source: Optional[str] = None) -> None:
+        """Add chunks whose embeddings were computed elsewhere.
+
+        Args:
+            documents: Chunk texts
+            embeddings: One embedding per chunk
+            document_id: Identifier recorded in ``processed_docs``
+            source: Name shown in search results; defaults to ``document_id``
+        """
+        if not documents:
+            return
+        try:
+            vectors = np.ascontiguousarray(embeddings, dtype=np.float32)
+
+            with self._lock:
+                if self.document_exists(document_id):
+                    return
+
+                first = len(self.chunks)
+                ids = np.arange(first, first + len(documents), dtype=np.int64)
+                if self.compressed:
+                    if self.originals is None:
+                        self.originals = FullPrecisionVectors(vectors.shape[1])
+                    self.originals.append(vectors, ids)
+                if (self.reducer is not None and not self.reducer.fitted
+                        and len(self.originals) >= self.reducer.min_train_points()):
+                    self._fit_reducer(ids)
+                else:
+                    vectors = self._encode(vectors)
+                    if self.backend is None:
+                        self.backend = create_backend(self.backend_name, vectors.shape[1], self.quantization)
+                    self.backend.add(vectors, ids)
+                self.chunks.extend(documents, source or document_id)
+
+                self.processed_docs.add(document_id)
 
         except Exception as e:
-            raise Exception(f"Error adding documents to FAISS vector store: {e}")
+            raise Exception(f"Error adding documents to vector store: {e}")
+
+    @property
+    def compressed(self) -> bool:
+        """Whether vectors are reduced or quantized before indexing."""
+        return self.reducer is not None or self.quantization != "float32"
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Vectors (or queries) as they are stored in the backend."""
+        if self.reducer is not None and self.reducer.fitted:
+            return self.reducer.transform(vectors)
+        return vectors
+
+    def _fit_reducer(self, new_ids: np.ndarray) -> None:
+        """Fit PCA on the original vectors and re-index them reduced."""
+        ids = new_ids
+        if self.backend is not None:
+            ids = np.concatenate([self.backend.export()[0], new_ids])
+        originals = self.originals.get(ids)
+        self.reducer.fit(originals)
+        self.backend = create_backend(self.backend_name, self.reducer.dimension, self.quantization)
+        self.backend.add(self.reducer.transform(originals), ids)
+
+    def delete_document(self, document_id: str, source: Optional[str] = None) -> int:
+        """Remove a document's chunks from search results.
+
+        The vectors are deleted from the backend; the chunk texts stay in the
+        append-only ``ChunkStore`` but are no longer reachable.
+
+        Args:
+            document_id: Identifier the document was added with
+            source: Source name it was added with; defaults to ``document_id``
+
+        Returns:
+            Number of chunks removed
+        """
+        source = source or document_id
+        with self._lock:
+            self.processed_docs.discard(document_id)
+            if self.backend is None:
+                return 0
+            positions = [position for position in range(len(self.chunks))
+                         if self.chunks.source(position) == source]
+            return self.backend.delete(positions) if positions else 0
     
+    def __len__(self) -> int:
+        """Number of indexed chunks."""
+        if self.backend is None:
+            return 0
+        return len(self.backend)
+
+    def memory_bytes(self) -> int:
+        """Approximate resident size of the vectors and chunk texts."""
+        if self.backend is None:
+            return 0
+        return self.backend.nbytes() + self.chunks.nbytes()
+
+    def export_chunks(self) -> Tuple[np.ndarray, List[str], List[str]]:
+        """Return (vectors, chunk texts, sources) for every chunk, in index order."""
+        with self._lock:
+            if self.backend is None:
+                return np.empty((0, 0), dtype=np.float32), [], []
+            ids, vectors = self.backend.export()
+            if self.originals is not None:
+                vectors = self.originals.get(ids)
+            texts = [self.chunks.text(int(position)) for position in ids]
+            sources = [self.chunks.source(int(position)) for position in ids]
+            return vectors, texts, sources
+
     def search(self, query: str, top_k: int = 5) -> List[str]:
-        """Search for relevant document chunks in the FAISS index."""
-        if self.vector_store is None:
+        """Search for relevant document chunks in the vector store."""
+        return [text for text, _ in self.search_with_scores(query, top_k=top_k)]
+
+    def search_with_scores(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
+        """Search the index and return (formatted chunk, similarity) pairs."""
+        if self.backend is None:
+            return []
+        try:
+            embedding = self.embedding_model.embed_query(query)
+        except Exception as e:
+            raise Exception(f"Error searching vector store: {e}")
+        return self.search_by_vector(embedding, top_k=top_k)
+
+    def search_by_vector(self, embedding: List[float], top_k: int = 5) -> List[Tuple[str, float]]:
+        """Search with a precomputed query embedding.
+
+        Scores are cosine similarities, highest first, whichever backend is
+        in use; this keeps scores comparable across separate indexes. For
+        compressed stores they are exact when re-scoring is enabled and
+        approximate otherwise.
+        """
+        if self.backend is None:
             return []
         try:
-            results = self.vector_store.similarity_search(query, k=top_k)
+            query = np.asarray(embedding, dtype=np.float32).reshape(1, -1)
+            with self._lock:
+                if self.originals is not None and self.rescore_factor > 0:
+                    _, candidates = self.backend.search(self._encode(query), top_k * self.rescore_factor)
+                    scores, positions = rescore(query, candidates[0], self.originals, top_k)
+                else:
+                    scores, positions = self.backend.search(self._encode(query), top_k)
+                hits = [(self.chunks.get(int(position)), float(score))
+                        for position, score in zip(positions[0], scores[0]) if position >= 0]
             
             formatted_results = []
-            for doc in results:
-                source = doc.metadata.get("source", "unknown")
-                formatted_results.append(f"From {source}: {doc.page_content}")
+            for chunk, score in hits:
+                formatted_results.append((f"From {chunk.source}: {chunk.text}", score))
                 
             return formatted_results
         except Exception as e:
-            raise Exception(f"Error searching FAISS vector store: {e}")
\ No newline at end of file
+            raise Exception(f"Error searching vector store: {e}")
+
+    def save(self, path: str) -> None:
+        """Persist the vectors, chunks and processed document ids to a directory."""
+        os.makedirs(path, exist_ok=True)
+        with self._lock:
+            if self.backend is not None:
+                save_backend(self.backend, path)
+                self.chunks.save(path)
+            if self.originals is not None:
+                self.originals.save(path)
+                if self.reducer is not None:
+                    self.reducer.save(path)
+                with open(os.path.join(path, "compression.json"), 'w', encoding='utf-8') as f:
+                    json.dump({
+                        "reduction": self.reducer.method if self.reducer else "none",
+                        "reduced_dimension": self.reducer.dimension if self.reducer else 0,
+                        "quantization": self.quantization,
+                        "rescore_factor": self.rescore_factor,
+                        "dimension": self.originals.dimension,
+                    }, f)
+            with open(os.path.join(path, "processed_docs.json"), 'w', encoding='utf-8') as f:
+                json.dump(sorted(self.processed_docs), f)
+
+    @classmethod
+    def load(cls, path: str, embedding_model: EmbeddingModel) -> "VectorStore":
+        """Load a store written by ``save``, with the backend and compression it was saved with."""
+        store = cls(embedding_model, reduction="none", quantization="float32")
+        try:
+            store.backend = load_backend(path)
+            if store.backend is not None:
+                store.backend_name = store.backend.name
+                store.chunks = ChunkStore.load(path, compression=store.chunks.compression)
+            compression_path = os.path.join(path, "compression.json")
+            if os.path.exists(compression_path):
+                with open(compression_path, 'r', encoding='utf-8') as f:
+                    compression = json.load(f)
+                if compression["reduction"] != "none":
+                    store.reducer = DimensionReducer.load(path, compression["reduction"],
+                                                          compression["reduced_dimension"])
+                store.quantization = compression["quantization"]
+                store.rescore_factor = compression["rescore_factor"]
+                store.originals = FullPrecisionVectors.load(path, compression["dimension"])
+            with open(os.path.join(path, "processed_docs.json"), 'r', encoding='utf-8') as f:
+                store.processed_docs = set(json.load(f))
+        except Exception as e:
+            raise Exception(f"Error loading vector store: {e}")
+        return store
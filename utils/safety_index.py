@@ -0,0 +1,370 @@
+import os
+import re
+import time
+import logging
+from typing import Dict, List, Optional, Tuple
+from utils.index_artifacts import knowledge_base_files
+
+logger = logging.getLogger(__name__)
+
+ALL_SPECIES = "All species"
+
+# Words that name each species in PET_SPECIES, in queries and KB headings
+SPECIES_ALIASES = {
+    "Dogs": ("dog", "dogs", "puppy", "puppies"),
+    "Cats": ("cat", "cats", "kitten", "kittens", "kitty"),
+    "Small mammals": ("small mammal", "small mammals", "hamster", "hamsters", "guinea pig", "guinea pigs",
+                      "rabbit", "rabbits", "bunny", "bunnies", "gerbil", "gerbils", "mouse", "mice",
+                      "rat", "rats", "chinchilla", "chinchillas", "ferret", "ferrets"),
+    "Birds": ("bird", "birds", "parrot", "parrots", "budgie", "budgies", "parakeet", "parakeets",
+              "cockatiel", "cockatiels", "canary", "canaries", "finch", "finches"),
+    "Reptiles": ("reptile", "reptiles", "bearded dragon", "bearded dragons", "lizard", "lizards",
+                 "gecko", "geckos", "snake", "snakes", "turtle", "turtles", "tortoise", "tortoises"),
+    "Fish": ("fish", "goldfish", "betta", "bettas"),
+}
+
+# Extra words for the first-aid topics of the safety guide, keyed by topic
+FIRST_AID_ALIASES = {
+    "bleeding": ("bleeding", "bleeds", "bleed"),
+    "choking": ("choking", "choke", "chokes", "choked"),
+    "seizures": ("seizure", "seizures", "seizing", "convulsing", "convulsions"),
+    "heatstroke": ("heatstroke", "heat stroke", "overheating", "overheated"),
+    "poisoning": ("poisoning", "poisoned"),
+}
+
+SEVERITY_RANK = {"severe": 3, "toxic": 2, "hazardous": 1, "avoid": 0}
+
+# Questions the fixed facts cannot answer go to the full pipeline
+MAX_QUERY_WORDS = 25
+OPEN_ENDED = re.compile(
+    r"\b(why|how (much|many|long|often)|how (do|can|should|would) (i|we)|should (i|we)|what (happens|amount|quantity)|"
+    r"explain|compare|difference|alternatives?|instead|treat(ment)?|symptoms?|signs?|prevent\w*|looks? like|"
+    r"recipe|brands?)\b"
+)
+# Cues that the question is whether something may be eaten or touched
+SAFETY_CUES = re.compile(
+    r"\b(eat|eats|eating|ate|eaten|drink|drinks|drank|have|had|feed|give|gave|safe|unsafe|toxic|"
+    r"poison\w*|dangerous|bad|harmful|ok|okay|allowed|swallow\w*|chew\w*|lick\w*|ingest\w*|got into)\b"
+)
+# Cues that the pet has already been exposed to something
+INGESTION_CUES = re.compile(
+    r"\b(ate|eaten|drank|drunk|swallowed|chewed|licked|ingested|consumed|got into|gotten into)\b"
+)
+# Cues that an emergency is happening now; first-aid topics and household
+# hazards are only answered with these or an ingestion cue, never for
+# general questions about them
+EMERGENCY_CUES = re.compile(
+    r"(\b(is|are|keeps?|still|started)|['’]s) (having|choking|bleeding|seizing|convulsing|overheating|collapsing)\b"
+    r"|\b(right now|just now|emergency|urgent)\b"
+)
+# Negation or exclusion near a matched substance or topic ("with no xylitol",
+# "grape-free", "not choking anymore") inverts the question; those fall back
+NEGATION = re.compile(r"\b(no|not|without|never|none|free|\w+n['’]t)\b")
+NEGATION_WINDOW = 3  # words either side of the match
+_SEVERE_EFFECTS = re.compile(r"failure|arrest|severe|organ", re.IGNORECASE)
+_ITEM_NOTE = re.compile(r"^(.*?)\s*\((.*)\)\s*$")
+_HEADING = re.compile(r"^(#+)\s*(.+?)\s*$")
+_CARE_FOOD_LINE = re.compile(r"^-\s*(Avoid toxic foods|Foods to avoid):\s*(.+)$", re.IGNORECASE)
+
+class SafetyFact:
+    """One (species, substance, severity, guidance) entry extracted from the knowledge base."""
+
+    def __init__(self, species: str, substance: str, severity: str, guidance: str,
+                 source: str, section: str, terms: Tuple[str, ...]):
+        self.species = species
+        self.substance = substance
+        self.severity = severity
+        self.guidance = guidance
+        self.source = source
+        self.section = section
+        self.terms = terms
+
+    def citation(self) -> str:
+        return f"{self.source} ({self.section})"
+
+def _phrase_pattern(phrases) -> re.Pattern:
+    """Whole-word alternation of ``phrases``, longest first so "macadamia nuts" beats "nuts"."""
+    ordered = sorted(set(phrases), key=len, reverse=True)
+    return re.compile(r"\b(" + "|".join(re.escape(p) for p in ordered) + r")\b")
+
+_SPECIES_WORDS = {alias: species for species, aliases in SPECIES_ALIASES.items() for alias in aliases}
+_SPECIES_PATTERN = _phrase_pattern(_SPECIES_WORDS)
+
+def find_species(text: str) -> List[str]:
+    """Species mentioned in ``text``, in order of first mention."""
+    found = []
+    for match in _SPECIES_PATTERN.finditer(text.lower()):
+        species = _SPECIES_WORDS[match.group(1)]
+        if species not in found:
+            found.append(species)
+    return found
+
+def _singular(word: str) -> str:
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith(("oes", "ches", "shes", "xes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us")):
+        return word[:-1]
+    return word
+
+def _terms(name: str) -> Tuple[str, ...]:
+    """Lower-case phrases a query may use for a KB item, with singular forms."""
+    name = re.sub(r"^(many|most|some|certain)\s+", "", name.strip().lower())
+    if "/" in name and " " not in name:
+        alternatives = name.split("/")
+    else:
+        alternatives = [part for part in re.split(r",\s*|\s+and\s+", name) if part]
+    terms = []
+    for alternative in alternatives:
+        alternative = alternative.strip()
+        words = alternative.split()
+        terms.append(alternative)
+        terms.append(" ".join(words[:-1] + [_singular(words[-1])]))
+    return tuple(dict.fromkeys(t for t in terms if len(t) > 2))
+
+def _display_name(name: str) -> str:
+    if "/" in name and " " not in name:
+        name = " and ".join(name.split("/"))
+    return name[0].upper() + name[1:]
+
+def _split_items(text: str) -> List[str]:
+    """Split a comma-separated KB list, ignoring commas inside parentheses."""
+    items, depth, current = [], 0, ""
+    for char in text:
+        depth += char == "("
+        depth -= char == ")"
+        if char == "," and depth == 0:
+            items.append(current)
+            current = ""
+        else:
+            current += char
+    items.append(current)
+    return [item.strip() for item in items if item.strip()]
+
+def _name_and_note(item: str) -> Tuple[str, str]:
+    match = _ITEM_NOTE.match(item)
+    if match is None:
+        return item.strip(), ""
+    return match.group(1).strip(), match.group(2).strip()
+
+class SafetyIndex:
+    """Structured toxicity and first-aid facts for instant answers.
+
+    Built by parsing the bullet lists of the knowledge base: the toxic
+    foods, toxic plants, household hazards and first-aid sections of the
+    safety guide, and the "foods to avoid" lines of the species care files.
+    ``answer`` matches a question against the species, substances and
+    first-aid topics of the index and, when the match is unambiguous and
+    the KB covers it, answers from the facts with a citation, skipping
+    retrieval, web search and the LLM. Anything else returns None so the
+    full pipeline answers it.
+    """
+
+    def __init__(self, facts: List[SafetyFact], first_aid: Dict[str, List[str]],
+                 first_aid_source: str = ""):
+        """Initialize the index.
+
+        Args:
+            facts: Extracted toxicity facts
+            first_aid: First-aid steps by lower-case topic, e.g. "poisoning"
+            first_aid_source: File the first-aid steps came from
+        """
+        self.facts = facts
+        self.first_aid = first_aid
+        self.first_aid_source = first_aid_source
+        self._by_term: Dict[str, List[SafetyFact]] = {}
+        for fact in facts:
+            for term in fact.terms:
+                self._by_term.setdefault(term, []).append(fact)
+        self._substance_pattern = _phrase_pattern(self._by_term) if self._by_term else None
+
+        self._topic_words = {}
+        for topic in first_aid:
+            for alias in FIRST_AID_ALIASES.get(topic, (topic,)):
+                self._topic_words[alias] = topic
+        self._topic_pattern = _phrase_pattern(self._topic_words) if self._topic_words else None
+
+    def __len__(self) -> int:
+        return len(self.facts)
+
+    @classmethod
+    def from_knowledge_base(cls, kb_dir: str) -> "SafetyIndex":
+        """Extract the index from the knowledge base files."""
+        facts: List[SafetyFact] = []
+        first_aid: Dict[str, List[str]] = {}
+        first_aid_source = ""
+        for file_name in knowledge_base_files(kb_dir):
+            with open(os.path.join(kb_dir, file_name), 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+            file_first_aid = _parse_file(file_name, lines, facts)
+            if file_first_aid:
+                first_aid.update(file_first_aid)
+                first_aid_source = file_name
+        logger.info(f"Built safety index with {len(facts)} facts and {len(first_aid)} first-aid topics")
+        return cls(facts, first_aid, first_aid_source)
+
+    def _poisoning_steps(self) -> List[str]:
+        return self.first_aid.get("poisoning", [])
+
+    def answer(self, query: str, selected_pet: str = ALL_SPECIES) -> Optional[str]:
+        """Answer a toxicity or first-aid question from the index, or return None.
+
+        Args:
+            query: User question
+            selected_pet: Species selected in the sidebar; a species named in
+                the question takes precedence
+
+        Returns:
+            Markdown answer with a citation, or None if the question is not a
+            clear match for the facts in the index
+        """
+        start = time.perf_counter()
+        text = query.lower()
+        if len(text.split()) > MAX_QUERY_WORDS or OPEN_ENDED.search(text):
+            return None
+        species_mentioned = find_species(text)
+        if len(species_mentioned) > 1:
+            return None
+        species = species_mentioned[0] if species_mentioned else selected_pet
+
+        substance_matches = list(self._substance_pattern.finditer(text)) if self._substance_pattern else []
+        topic_matches = list(self._topic_pattern.finditer(text)) if self._topic_pattern else []
+        if any(_negated(text, match) for match in substance_matches + topic_matches):
+            return None
+        substances = {match.group(1) for match in substance_matches}
+        topics = {self._topic_words[match.group(1)] for match in topic_matches}
+
+        exposed = INGESTION_CUES.search(text) is not None
+        if substances:
+            facts = {id(f): f for term in substances for f in self._by_term[term]}
+            if len({f.substance.lower() for f in facts.values()}) > 1 or not (exposed or SAFETY_CUES.search(text)):
+                return None
+            if not exposed and any(f.severity == "hazardous" for f in facts.values()):
+                # "what medications are safe", "stop my dog chewing string": not an exposure
+                return None
+            response = self._toxicity_answer(list(facts.values()), species, exposed)
+        elif len(topics) == 1:
+            if not exposed and not EMERGENCY_CUES.search(text):
+                return None
+            response = self._first_aid_answer(topics.pop(), species)
+        else:
+            return None
+
+        if response is not None:
+            logger.info(f"Answered from the safety index in {(time.perf_counter() - start) * 1000:.2f} ms")
+        return response
+
+    def _toxicity_answer(self, facts: List[SafetyFact], species: str, exposed: bool = False) -> Optional[str]:
+        if species != ALL_SPECIES:
+            facts = [f for f in facts if f.species in (species, ALL_SPECIES)]
+            if not facts:
+                # The KB lists it for other species only; it says nothing about this one
+                return None
+        best = max(facts, key=lambda f: SEVERITY_RANK[f.severity])
+        name = _display_name(best.substance)
+        last_word = name.split()[-1]
+        verb = "are" if _singular(last_word) != last_word or " and " in name else "is"
+
+        if species != ALL_SPECIES:
+            pets = species.lower() if best.species == species else "all pets"
+        elif best.species == ALL_SPECIES:
+            pets = "all pets"
+        else:
+            listed = sorted({f.species for f in facts if f.severity == best.severity},
+                            key=list(SPECIES_ALIASES).index)
+            pets = ", ".join(s.lower() for s in listed[:-1]) + (" and " if len(listed) > 1 else "") + listed[-1].lower()
+        guidance = f" ({best.guidance})" if best.guidance else ""
+        pet = f"your {_singular(species.lower())}" if species not in (ALL_SPECIES, "Small mammals") else "your pet"
+        citations = [f.citation() for f in facts]
+
+        if exposed:
+            # Only the poisoning steps apply once it has been eaten; foods that
+            # are merely best avoided are left to the full pipeline
+            if best.severity == "avoid" or not self._poisoning_steps():
+                return None
+            if best.severity == "hazardous":
+                finding = f"{name} {verb} listed as a household hazard for {pets}"
+            else:
+                finding = f"{name} {verb} {'highly ' if best.severity == 'severe' else ''}toxic to {pets}"
+            lines = [f"**This may be an emergency.** {finding}{guidance}. First aid for poisoning "
+                     f"from our pet safety guide:"]
+            lines.extend(f"- {step}" for step in self._poisoning_steps())
+            lines.append(f"\nGet {pet} to a veterinarian as soon as it is safe to do so.")
+            citations.append(f"{self.first_aid_source} (Poisoning)")
+            lines.append(f"\n*Source: {'; '.join(dict.fromkeys(citations))}*")
+            return "\n".join(lines)
+
+        if best.severity == "severe":
+            lines = [f"**No. {name} {verb} highly toxic to {pets}**{guidance}."]
+        elif best.severity == "toxic":
+            lines = [f"**No. {name} {verb} toxic to {pets}**{guidance}."]
+        else:
+            lines = [f"**No. {name} {verb} on the list of foods to avoid for {pets}**{guidance}."]
+
+        if best.severity != "avoid" and self._poisoning_steps():
+            lines.append(f"\nIf {pet} has already eaten or touched some:")
+            lines.extend(f"- {step}" for step in self._poisoning_steps())
+            citations.append(f"{self.first_aid_source} (Poisoning)")
+        lines.append(f"\n*Source: {'; '.join(dict.fromkeys(citations))}*")
+        return "\n".join(lines)
+
+    def _first_aid_answer(self, topic: str, species: str) -> str:
+        pet = "your pet" if species in (ALL_SPECIES, "Small mammals") else f"your {_singular(species.lower())}"
+        lines = [f"**This may be an emergency.** First aid for {topic} from our pet safety guide:"]
+        lines.extend(f"- {step}" for step in self.first_aid[topic])
+        lines.append(f"\nGet {pet} to a veterinarian as soon as it is safe to do so.")
+        lines.append(f"\n*Source: {self.first_aid_source} (Basic First Aid: {topic.capitalize()})*")
+        return "\n".join(lines)
+
+def _negated(text: str, match: re.Match) -> bool:
+    """Whether a negation or exclusion cue is within ``NEGATION_WINDOW`` words of ``match``."""
+    before = text[:match.start()].split()[-NEGATION_WINDOW:]
+    after = text[match.end():].split()[:NEGATION_WINDOW]
+    return NEGATION.search(" ".join(before + after)) is not None
+
+def _parse_file(file_name: str, lines: List[str], facts: List[SafetyFact]) -> Dict[str, List[str]]:
+    """Append the toxicity facts of one KB file to ``facts``; returns its first-aid steps."""
+    first_aid: Dict[str, List[str]] = {}
+    headings: Dict[int, str] = {}
+    file_species = ALL_SPECIES
+    for line in lines:
+        line = line.strip()
+        heading = _HEADING.match(line)
+        if heading:
+            level = len(heading.group(1))
+            headings = {k: v for k, v in headings.items() if k < level}
+            headings[level] = heading.group(2)
+            if level == 1:
+                species = find_species(heading.group(2))
+                file_species = species[0] if len(species) == 1 else ALL_SPECIES
+            continue
+        if not line.startswith("- "):
+            continue
+        section = headings.get(3, "").lower()
+
+        care_food = _CARE_FOOD_LINE.match(line)
+        if care_food and file_species != ALL_SPECIES:
+            severity = "toxic" if "toxic" in care_food.group(1).lower() else "avoid"
+            for item in _split_items(care_food.group(2)):
+                name, note = _name_and_note(item)
+                facts.append(SafetyFact(file_species, name, severity, note, file_name,
+                                        headings.get(2, ""), _terms(name)))
+        elif section == "toxic foods" and ":" in line:
+            label, items = line[2:].split(":", 1)
+            species = find_species(label)
+            if len(species) != 1:
+                continue
+            for item in _split_items(items):
+                name, note = _name_and_note(item)
+                facts.append(SafetyFact(species[0], name, "toxic", note, file_name, headings[3], _terms(name)))
+        elif section == "toxic plants":
+            name, note = _name_and_note(line[2:])
+            severity = "severe" if _SEVERE_EFFECTS.search(note) else "toxic"
+            facts.append(SafetyFact(ALL_SPECIES, name, severity, note, file_name, headings[3], _terms(name)))
+        elif section == "hazardous household items":
+            name, note = _name_and_note(line[2:])
+            facts.append(SafetyFact(ALL_SPECIES, name, "hazardous", note, file_name, headings[3], _terms(name)))
+        elif section == "basic first aid" and 4 in headings:
+            first_aid.setdefault(headings[4].lower(), []).append(line[2:])
+    return first_aid
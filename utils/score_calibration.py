@@ -0,0 +1,145 @@
+import logging
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from config.config import WEB_SEARCH_SCORE_THRESHOLD, CONTEXT_MIN_SCORE, ROUTER_CONFIDENCE_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+# Questions the knowledge base answers
+COVERED_PROBES = (
+    "How often should I feed an adult cat?",
+    "How much exercise does a dog need every day?",
+    "What should I put in a pet first aid kit?",
+    "Which plants are toxic to cats?",
+    "How do I help a new dog with separation anxiety?",
+    "What does a budgie cage need?",
+    "How often should I clean the litter box?",
+    "What are good starter pets for children?",
+    "What should I do if my pet is having a seizure?",
+    "How do I set up a habitat for a new hamster?",
+    "Which pets are good for a small apartment?",
+    "How do I keep my pet safe in hot weather?",
+)
+# Pet questions the knowledge base does not cover; these should go to the web
+UNCOVERED_PROBES = (
+    "What is the best water temperature for an axolotl tank?",
+    "How do I treat ringworm in horses?",
+    "When does a bearded dragon start brumation?",
+    "How many eggs does a backyard chicken lay per week?",
+    "What vaccines does a ferret need in the UK?",
+    "How do I trim the hooves of a pet goat?",
+)
+# Questions with nothing to do with pets; their scores are the noise floor
+UNRELATED_PROBES = (
+    "How do I file my income tax return?",
+    "What is the capital of Australia?",
+    "How do I change the oil in my car?",
+    "Explain recursion in Python.",
+    "What is a good recipe for banana bread?",
+    "Who won the football world cup in 2010?",
+)
+
+# Used when the index is empty or calibration fails: search the web for every
+# question, keep every local chunk and always use the large model
+UNCALIBRATED_WEB_SEARCH = float("inf")
+UNCALIBRATED_CONTEXT_MIN = -1.0
+UNCALIBRATED_ROUTER = float("inf")
+
+class ScoreThresholds:
+    """Similarity thresholds that gate web search and prompt context."""
+
+    def __init__(self, web_search: float, context_min: float,
+                 router: float = UNCALIBRATED_ROUTER,
+                 measured: Optional[Dict[str, List[float]]] = None):
+        """Initialize the thresholds.
+
+        Args:
+            web_search: Search the web when the best local score is below this
+            context_min: Leave local chunks scoring below this out of the prompt
+            router: Simple queries go to the fast model from this best local score
+            measured: Best scores per probe group, when calibrated
+        """
+        self.web_search = web_search
+        self.context_min = context_min
+        self.router = router
+        self.measured = measured or {}
+
+    @classmethod
+    def from_config(cls) -> "ScoreThresholds":
+        """Thresholds pinned in the configuration, uncalibrated where unset."""
+        return cls(
+            WEB_SEARCH_SCORE_THRESHOLD if WEB_SEARCH_SCORE_THRESHOLD is not None else UNCALIBRATED_WEB_SEARCH,
+            CONTEXT_MIN_SCORE if CONTEXT_MIN_SCORE is not None else UNCALIBRATED_CONTEXT_MIN,
+            ROUTER_CONFIDENCE_THRESHOLD if ROUTER_CONFIDENCE_THRESHOLD is not None else UNCALIBRATED_ROUTER
+        )
+
+def best_cut(positive: Sequence[float], negative: Sequence[float]) -> float:
+    """Threshold that best separates ``positive`` (above) from ``negative`` (below).
+
+    Candidates are the midpoints between neighbouring observed scores; the
+    one with the fewest misclassified scores wins, ties going to the middle
+    of the tied range.
+    """
+    scores = sorted(set(positive) | set(negative))
+    candidates = ([scores[0] - 1e-3]
+                  + [(low + high) / 2 for low, high in zip(scores, scores[1:])]
+                  + [scores[-1] + 1e-3])
+    positive, negative = np.asarray(positive), np.asarray(negative)
+    errors = [int((positive < cut).sum() + (negative >= cut).sum()) for cut in candidates]
+    best = [cut for cut, error in zip(candidates, errors) if error == min(errors)]
+    return float(best[len(best) // 2])
+
+def measure_best_scores(vector_store, embedding_model, queries: Sequence[str]) -> List[float]:
+    """Similarity of the best local chunk for each query."""
+    embeddings = embedding_model.get_embeddings(list(queries))
+    scores = []
+    for embedding in embeddings:
+        results = vector_store.search_by_vector(embedding.tolist(), top_k=1)
+        scores.append(results[0][1] if results else 0.0)
+    return scores
+
+def calibrate(vector_store, embedding_model) -> ScoreThresholds:
+    """Derive the relevance thresholds from probe questions against ``vector_store``.
+
+    The web search threshold is the score that best separates questions the
+    knowledge base covers from pet questions it does not and from unrelated
+    ones. The context threshold is the median best score of the unrelated
+    questions: a chunk that matches no better than the best match of a
+    typical unrelated question is noise. The router threshold is the median
+    best score of the covered questions, and never below the web search
+    threshold: the fast model only gets questions retrieval clearly answers.
+    Values set in the configuration are kept as they are.
+
+    Returns:
+        Calibrated thresholds, or uncalibrated ones if the index is empty or
+        calibration fails
+    """
+    if None not in (WEB_SEARCH_SCORE_THRESHOLD, CONTEXT_MIN_SCORE, ROUTER_CONFIDENCE_THRESHOLD):
+        return ScoreThresholds.from_config()
+    try:
+        if len(vector_store) == 0:
+            return ScoreThresholds.from_config()
+        measured = {
+            "covered": measure_best_scores(vector_store, embedding_model, COVERED_PROBES),
+            "uncovered": measure_best_scores(vector_store, embedding_model, UNCOVERED_PROBES),
+            "unrelated": measure_best_scores(vector_store, embedding_model, UNRELATED_PROBES),
+        }
+    except Exception as e:
+        logger.error(f"Error calibrating retrieval thresholds: {str(e)}")
+        return ScoreThresholds.from_config()
+
+    context_min = float(np.median(measured["unrelated"]))
+    web_search = max(best_cut(measured["covered"], measured["uncovered"] + measured["unrelated"]), context_min)
+    if WEB_SEARCH_SCORE_THRESHOLD is not None:
+        web_search = WEB_SEARCH_SCORE_THRESHOLD
+    if CONTEXT_MIN_SCORE is not None:
+        context_min = CONTEXT_MIN_SCORE
+    router = max(float(np.median(measured["covered"])), web_search)
+    if ROUTER_CONFIDENCE_THRESHOLD is not None:
+        router = ROUTER_CONFIDENCE_THRESHOLD
+    for group, scores in measured.items():
+        logger.info(f"Calibration probes ({group}): best scores "
+                    f"{min(scores):.3f}-{max(scores):.3f}, median {float(np.median(scores)):.3f}")
+    logger.info(f"Calibrated retrieval thresholds: web search below {web_search:.3f}, "
+                f"context from {context_min:.3f}, fast model from {router:.3f}")
+    return ScoreThresholds(web_search, context_min, router, measured)
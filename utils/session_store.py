@@ -0,0 +1,206 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    last_active REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL REFERENCES sessions(session_id) ON DELETE CASCADE,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_by_session ON messages(session_id, id);
+"""
+
+class ChatSessionStore:
+    """Chat histories in an embedded SQLite database, keyed by session id.
+
+    The database runs in WAL mode so sessions on different threads can read
+    while one writes. Each thread gets its own connection, as sqlite3
+    connections must not be shared between threads.
+    """
+
+    def __init__(self, db_path: str):
+        """Open (and create if needed) the database.
+
+        Args:
+            db_path: Path of the SQLite file
+        """
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def append_messages(self, session_id: str, messages: List[Dict[str, str]]) -> None:
+        """Append messages to a session, creating the session if needed."""
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO sessions (session_id, created_at, last_active) VALUES (?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET last_active = excluded.last_active",
+                (session_id, now, now)
+            )
+            conn.executemany(
+                "INSERT INTO messages (session_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+                [(session_id, m["role"], m["content"], now) for m in messages]
+            )
+
+    def recent_messages(self, session_id: str, limit: int) -> List[Dict[str, str]]:
+        """The last ``limit`` messages of a session, oldest first."""
+        rows = self._connection().execute(
+            "SELECT role, content FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+            (session_id, limit)
+        ).fetchall()
+        return [{"role": role, "content": content} for role, content in reversed(rows)]
+
+    def count_messages(self, session_id: str) -> int:
+        """Number of messages stored for a session."""
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM messages WHERE session_id = ?", (session_id,)
+        ).fetchone()[0]
+
+    def delete_session(self, session_id: str) -> None:
+        """Remove a session and its messages."""
+        with self._connection() as conn:
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def prune(self, max_age_seconds: float) -> int:
+        """Delete sessions inactive for longer than ``max_age_seconds``.
+
+        Returns:
+            Number of sessions deleted
+        """
+        with self._connection() as conn:
+            cursor = conn.execute("DELETE FROM sessions WHERE last_active < ?", (time.time() - max_age_seconds,))
+        return cursor.rowcount
+
+class ChatSession:
+    """In-memory state of one active chat session.
+
+    Only the most recent ``window`` messages are held; the full history is
+    in the ``ChatSessionStore`` and older pages are read from it on demand.
+    """
+
+    def __init__(self, session_id: str, store: ChatSessionStore, window: int, **resources: Any):
+        """Load the recent window of a (possibly evicted) session.
+
+        Args:
+            session_id: Session key
+            store: Backing chat history database
+            window: Messages kept in memory
+            **resources: Per-session objects such as ``vector_store`` and ``llm``
+        """
+        self.session_id = session_id
+        self.store = store
+        self.window = window
+        self.messages = store.recent_messages(session_id, window)
+        self.message_count = store.count_messages(session_id)
+        for name, value in resources.items():
+            setattr(self, name, value)
+        self.last_active = time.monotonic()
+
+    def add_messages(self, messages: List[Dict[str, str]]) -> None:
+        """Persist messages and keep the in-memory window up to date."""
+        self.store.append_messages(self.session_id, messages)
+        self.messages.extend(messages)
+        del self.messages[:-self.window]
+        self.message_count += len(messages)
+
+    def history(self, limit: int) -> List[Dict[str, str]]:
+        """The last ``limit`` messages, read from the database beyond the window."""
+        if limit <= len(self.messages) or len(self.messages) == self.message_count:
+            return self.messages[-limit:]
+        return self.store.recent_messages(self.session_id, limit)
+
+class SessionRegistry:
+    """Process-wide map of active chat sessions with idle eviction.
+
+    Sessions are created (or rehydrated from the store) on first use and
+    dropped after ``idle_seconds`` without a request, so server memory
+    follows active users rather than open browser tabs. A daemon thread
+    sweeps every ``sweep_seconds`` and also runs ``on_sweep``, e.g. to spill
+    idle upload overlays.
+    """
+
+    def __init__(self, factory: Callable[[str], ChatSession], idle_seconds: float = 600.0,
+                 sweep_seconds: float = 60.0, on_sweep: Optional[Callable[[], None]] = None):
+        """Initialize the registry and start the sweeper.
+
+        Args:
+            factory: Builds a ``ChatSession`` for a session id
+            idle_seconds: Inactivity after which a session is evicted
+            sweep_seconds: Interval between eviction sweeps
+            on_sweep: Optional extra work to run on each sweep
+        """
+        self.factory = factory
+        self.idle_seconds = idle_seconds
+        self.on_sweep = on_sweep
+        self._sessions: Dict[str, ChatSession] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sweep_seconds = sweep_seconds
+        self._sweeper = threading.Thread(target=self._sweep, name="session-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: str) -> ChatSession:
+        """Return the active session, rehydrating it if it was evicted."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is None:
+            # Built outside the lock: loading history must not block other sessions
+            session = self.factory(session_id)
+            with self._lock:
+                session = self._sessions.setdefault(session_id, session)
+        session.last_active = time.monotonic()
+        return session
+
+    def evict_idle(self) -> int:
+        """Drop sessions idle for longer than ``idle_seconds``; returns how many."""
+        cutoff = time.monotonic() - self.idle_seconds
+        with self._lock:
+            idle = [sid for sid, session in self._sessions.items() if session.last_active < cutoff]
+            for session_id in idle:
+                del self._sessions[session_id]
+        if idle:
+            logger.info(f"Evicted {len(idle)} idle chat sessions; {len(self._sessions)} active")
+        return len(idle)
+
+    def _sweep(self) -> None:
+        while not self._stop.wait(self._sweep_seconds):
+            try:
+                self.evict_idle()
+                if self.on_sweep:
+                    self.on_sweep()
+            except Exception as e:
+                logger.error(f"Error evicting idle sessions: {str(e)}")
+
+    def stop(self) -> None:
+        """Stop the sweeper thread."""
+        self._stop.set()
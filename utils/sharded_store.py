@@ -0,0 +1,170 @@
+import re
+import heapq
+import zlib
+import logging
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from models.embeddings import EmbeddingModel
+from utils.rag_utils import VectorStore
+
+logger = logging.getLogger(__name__)
+
+# Keywords used by the "species" shard key, matched against the source name
+# and the start of the document.
+SPECIES_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "dogs": ("dog", "puppy", "puppies", "canine"),
+    "cats": ("cat", "kitten", "feline"),
+    "birds": ("bird", "parrot", "parakeet", "budgie", "cockatiel", "avian"),
+    "small mammals": ("hamster", "rabbit", "guinea pig", "gerbil", "ferret", "rodent", "small mammal"),
+    "reptiles": ("reptile", "lizard", "snake", "gecko", "turtle", "tortoise", "bearded dragon"),
+    "fish": ("fish", "aquarium", "betta", "goldfish"),
+}
+
+# Whole words only (plurals allowed), so "cat" does not match "medication"
+_SPECIES_PATTERNS = {
+    species: re.compile(r"\b(" + "|".join(re.escape(word) for word in words) + r")s?\b")
+    for species, words in SPECIES_KEYWORDS.items()
+}
+
+SHARD_KEYS = ("source", "species", "chunk")
+
+def detect_species(text: str) -> Optional[str]:
+    """Return the species whose keywords occur most often in ``text``, if any."""
+    # File names separate words with underscores, which \b counts as word characters
+    text = text.lower().replace("_", " ")
+    counts = {species: len(pattern.findall(text)) for species, pattern in _SPECIES_PATTERNS.items()}
+    species, count = max(counts.items(), key=lambda item: item[1])
+    return species if count > 0 else None
+
+def _stable_hash(value: str) -> int:
+    # Python's hash() is salted per process; shard placement must not be.
+    return zlib.crc32(value.encode('utf-8'))
+
+class ShardedVectorStore:
+    """Vector store that partitions chunks across several FAISS shards.
+
+    Each shard is an independent ``VectorStore`` with its own lock, so a query
+    is embedded once and the shards are searched concurrently on a thread
+    pool (FAISS releases the GIL while scanning), then the per-shard top-k
+    lists are merged. Shard assignment is chosen by ``shard_key``:
+
+    - ``"source"``: all chunks of a document go to the shard its id hashes to
+    - ``"species"``: documents are grouped by the species they describe
+    - ``"chunk"``: chunks are spread round-robin for the most even shards
+    """
+
+    def __init__(self, embedding_model: EmbeddingModel, num_shards: int = 4,
+                 shard_key: str = "source", max_workers: Optional[int] = None):
+        """Initialize the shards.
+
+        Args:
+            embedding_model: Model used to embed chunks and queries
+            num_shards: Number of partitions
+            shard_key: One of ``SHARD_KEYS``
+            max_workers: Search threads; defaults to one per shard
+        """
+        if shard_key not in SHARD_KEYS:
+            raise ValueError(f"Unknown shard key: {shard_key}. Expected one of {SHARD_KEYS}")
+        if num_shards < 1:
+            raise ValueError("num_shards must be at least 1")
+        self.embedding_model = embedding_model
+        self.shard_key = shard_key
+        self.shards = [VectorStore(embedding_model) for _ in range(num_shards)]
+        self.processed_docs = set()
+        self._adding = set()
+        self._next_chunk_shard = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or num_shards,
+                                            thread_name_prefix="shard-search")
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self.shards)
+
+    def memory_bytes(self) -> int:
+        """Approximate resident size of all shards."""
+        return sum(shard.memory_bytes() for shard in self.shards)
+
+    def export_chunks(self) -> Tuple[np.ndarray, List[str], List[str]]:
+        """Return (vectors, chunk texts, sources) for every chunk, shard by shard."""
+        exported = [shard.export_chunks() for shard in self.shards if len(shard) > 0]
+        if not exported:
+            return np.empty((0, 0), dtype=np.float32), [], []
+        vectors = np.vstack([vectors for vectors, _, _ in exported])
+        texts = [text for _, shard_texts, _ in exported for text in shard_texts]
+        sources = [source for _, _, shard_sources in exported for source in shard_sources]
+        return vectors, texts, sources
+
+    def document_exists(self, document_id: str) -> bool:
+        """Check if a document has already been processed."""
+        return document_id in self.processed_docs
+
+    def shard_for_document(self, document_id: str, source: str, documents: List[str]) -> int:
+        """Pick the shard for a whole document under the "source"/"species" keys."""
+        if self.shard_key == "species":
+            species = detect_species(source) or detect_species(documents[0] if documents else "")
+            if species:
+                return _stable_hash(species) % len(self.shards)
+        return _stable_hash(source or document_id) % len(self.shards)
+
+    def add_documents(self, documents: List[str], document_id: str, source: Optional[str] = None) -> None:
+        """Embed chunks and add them to their shard(s)."""
+        if not documents:
+            return
+        embeddings = self.embedding_model.embed_documents(documents)
+        self.add_embeddings(documents, embeddings, document_id, source=source)
+
+    def add_embeddings(self, documents: List[str], embeddings: List[List[float]],
+                       document_id: str, source: Optional[str] = None) -> None:
+        """Add precomputed chunks, routing them according to ``shard_key``."""
+        if not documents:
+            return
+        with self._lock:
+            if self.document_exists(document_id) or document_id in self._adding:
+                return
+            if self.shard_key == "chunk":
+                start = self._next_chunk_shard
+                self._next_chunk_shard = (start + len(documents)) % len(self.shards)
+                assignments = [(start + i) % len(self.shards) for i in range(len(documents))]
+            else:
+                shard = self.shard_for_document(document_id, source or document_id, documents)
+                assignments = [shard] * len(documents)
+            self._adding.add(document_id)
+
+        try:
+            for shard_index in sorted(set(assignments)):
+                positions = [i for i, a in enumerate(assignments) if a == shard_index]
+                self.shards[shard_index].add_embeddings(
+                    [documents[i] for i in positions],
+                    [embeddings[i] for i in positions],
+                    document_id,
+                    source=source
+                )
+            # Only marked as processed once every shard holds its chunks, so a
+            # failed add is retried; shards that already succeeded skip it
+            with self._lock:
+                self.processed_docs.add(document_id)
+        finally:
+            with self._lock:
+                self._adding.discard(document_id)
+
+    def search(self, query: str, top_k: int = 5) -> List[str]:
+        """Search all shards and return the merged chunk texts."""
+        return [text for text, _ in self.search_with_scores(query, top_k=top_k)]
+
+    def search_with_scores(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
+        """Search all shards and return merged (chunk, similarity) pairs."""
+        embedding = self.embedding_model.embed_query(query)
+        return self.search_by_vector(embedding, top_k=top_k)
+
+    def search_by_vector(self, embedding: List[float], top_k: int = 5) -> List[Tuple[str, float]]:
+        """Search every non-empty shard in parallel and merge their top-k."""
+        shards = [shard for shard in self.shards if len(shard) > 0]
+        if not shards:
+            return []
+        if len(shards) == 1:
+            return shards[0].search_by_vector(embedding, top_k=top_k)
+        futures = [self._executor.submit(shard.search_by_vector, embedding, top_k) for shard in shards]
+        results = [hit for future in futures for hit in future.result()]
+        return heapq.nlargest(top_k, results, key=lambda item: item[1])
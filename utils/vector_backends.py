@@ -0,0 +1,493 @@
+import os
+import json
+import time
+import uuid
+import logging
+from typing import Dict, Optional, Protocol, Sequence, Tuple, Type
+import numpy as np
+import faiss
+from config.config import (FAISS_INDEX_TYPE, FAISS_MEMORY_BUDGET_MB, FAISS_AUTO_MIN_ANN, FAISS_NLIST,
+                           FAISS_NPROBE, FAISS_PQ_M, FAISS_HNSW_M, FAISS_EF_CONSTRUCTION,
+                           FAISS_EF_SEARCH, FAISS_TRAIN_SAMPLE)
+from utils.document_processor import normalize_vectors, top_k_similar
+
+logger = logging.getLogger(__name__)
+
+try:
+    import chromadb
+except ImportError:
+    chromadb = None
+
+class VectorBackend(Protocol):
+    """Storage and nearest-neighbour search for the vectors of a ``VectorStore``.
+
+    Vectors are addressed by integer ids chosen by the caller (the store uses
+    chunk positions). Scores are cosine similarities, highest first, so
+    results are comparable across backends.
+    """
+
+    name: str
+    dimension: int
+
+    def __len__(self) -> int: ...
+
+    def add(self, vectors: np.ndarray, ids: np.ndarray) -> None: ...
+
+    def delete(self, ids: Sequence[int]) -> int: ...
+
+    def search(self, queries: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]: ...
+
+    def export(self) -> Tuple[np.ndarray, np.ndarray]: ...
+
+    def nbytes(self) -> int: ...
+
+    def save(self, path: str) -> None: ...
+
+    @classmethod
+    def load(cls, path: str) -> "VectorBackend": ...
+
+def _empty_result(n_queries: int) -> Tuple[np.ndarray, np.ndarray]:
+    return np.empty((n_queries, 0), dtype=np.float32), np.empty((n_queries, 0), dtype=np.int64)
+
+FAISS_INDEX_TYPES = ("flat", "hnsw", "ivf", "ivfpq")
+
+# Below these sizes k-means training is unreliable, so trained index types
+# keep serving from an exact flat index until enough vectors have arrived
+MIN_TRAIN_POINTS = {"ivf": 1000, "ivfpq": 10000}
+
+# Scalar quantization of stored vectors; int8 learns per-dimension ranges, so
+# it keeps float32 storage until enough vectors arrive to train on
+QUANTIZATIONS = ("float32", "float16", "int8")
+BYTES_PER_COMPONENT = {"float32": 4, "float16": 2, "int8": 1}
+MIN_SQ_TRAIN_POINTS = 256
+_SQ_TYPES = {"float16": faiss.ScalarQuantizer.QT_fp16, "int8": faiss.ScalarQuantizer.QT_8bit}
+
+def default_nlist(n: int) -> int:
+    """Number of IVF lists for ``n`` vectors: about 4 * sqrt(n)."""
+    return max(1, min(int(4 * np.sqrt(n)), n // 39))
+
+def default_pq_m(dimension: int) -> int:
+    """PQ sub-quantizers: the largest divisor of the dimension up to dimension / 16."""
+    for m in range(max(1, dimension // 16), 0, -1):
+        if dimension % m == 0:
+            return m
+    return 1
+
+def estimate_index_bytes(index_type: str, n: int, dimension: int, hnsw_m: int = FAISS_HNSW_M,
+                         pq_m: int = 0, quantization: str = "float32") -> int:
+    """Approximate resident size of ``n`` vectors in an index type, including the id map."""
+    code_size = dimension * BYTES_PER_COMPONENT[quantization]
+    per_vector = {
+        "flat": code_size,
+        "hnsw": code_size + hnsw_m * 2 * 4,
+        "ivf": code_size + 8,
+        "ivfpq": (pq_m or default_pq_m(dimension)) + 8,
+    }[index_type]
+    return n * (per_vector + 8)
+
+def select_index_type(n: int, dimension: int, memory_budget: int = FAISS_MEMORY_BUDGET_MB * 1024 * 1024,
+                      min_ann: int = FAISS_AUTO_MIN_ANN, quantization: str = "float32") -> str:
+    """Pick an index type for ``n`` vectors within a memory budget in bytes.
+
+    Small corpora stay exact. Above ``min_ann`` HNSW is preferred for its
+    recall/latency trade-off while its graph fits the budget, then IVF-Flat,
+    and IVF-PQ when even uncompressed vectors do not fit.
+    """
+    if n < min_ann:
+        return "flat"
+    for index_type in ("hnsw", "ivf"):
+        if estimate_index_bytes(index_type, n, dimension, quantization=quantization) <= memory_budget:
+            return index_type
+    return "ivfpq"
+
+class FaissBackend:
+    """FAISS index with an id map, exact (flat) or approximate (HNSW, IVF, IVF-PQ).
+
+    ``index_type`` "auto" re-selects the structure with ``select_index_type``
+    as the corpus grows. Trained types (IVF, IVF-PQ) serve from a flat index
+    until ``MIN_TRAIN_POINTS`` vectors exist, then train on a random sample
+    of up to ``train_sample`` vectors and re-add everything; IVF indexes are
+    retrained when the corpus has grown fourfold since training.
+
+    ``quantization`` "float16" or "int8" stores flat, HNSW and IVF vectors
+    with FAISS scalar quantization (2 or 1 bytes per component); IVF-PQ is
+    already compressed and ignores it. int8 ranges are trained like IVF.
+
+    All types use L2 distance, which for the unit-length BGE embeddings maps
+    to cosine similarity as ``1 - d / 2`` (approximately, when quantized).
+    """
+
+    name = "faiss"
+
+    def __init__(self, dimension: int, index: Optional[faiss.Index] = None,
+                 index_type: str = FAISS_INDEX_TYPE, memory_budget_mb: int = FAISS_MEMORY_BUDGET_MB,
+                 nprobe: int = FAISS_NPROBE, ef_search: int = FAISS_EF_SEARCH,
+                 train_sample: int = FAISS_TRAIN_SAMPLE, quantization: str = "float32"):
+        """Initialize the backend.
+
+        Args:
+            dimension: Embedding dimension
+            index: Existing ``IndexIDMap2`` to wrap, e.g. one read from disk
+            index_type: "flat", "hnsw", "ivf", "ivfpq" or "auto"
+            memory_budget_mb: Budget used by "auto" selection
+            nprobe: IVF lists probed per query
+            ef_search: HNSW candidate list size per query
+            train_sample: Maximum vectors used for IVF/PQ training
+            quantization: "float32", "float16" or "int8"
+        """
+        if index_type not in FAISS_INDEX_TYPES + ("auto",):
+            raise ValueError(f"Unknown FAISS index type: {index_type}")
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization: {quantization}")
+        self.dimension = dimension
+        self.index_type = index_type
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self.train_sample = train_sample
+        self.quantization = quantization
+        if index is None:
+            index_type = self._target_type(0)
+            self.active_quantization = self._target_quantization(index_type, 0)
+            index = faiss.IndexIDMap2(self._build_inner(index_type, None))
+        self.index = index
+        self.active_type = self._detect_type(self.index)
+        self.active_quantization = self._detect_quantization(self.index)
+        self._trained_at = len(self)
+        self.set_search_params()
+
+    @staticmethod
+    def _detect_type(index: faiss.Index) -> str:
+        inner = faiss.downcast_index(index.index)
+        if isinstance(inner, faiss.IndexHNSW):
+            return "hnsw"
+        if isinstance(inner, faiss.IndexIVFPQ):
+            return "ivfpq"
+        if isinstance(inner, faiss.IndexIVF):
+            return "ivf"
+        return "flat"
+
+    @staticmethod
+    def _detect_quantization(index: faiss.Index) -> str:
+        inner = faiss.downcast_index(index.index)
+        if isinstance(inner, faiss.IndexHNSW):
+            inner = faiss.downcast_index(inner.storage)
+        if isinstance(inner, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)):
+            for quantization, qtype in _SQ_TYPES.items():
+                if inner.sq.qtype == qtype:
+                    return quantization
+        return "float32"
+
+    def set_search_params(self, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> None:
+        """Tune the recall/latency trade-off of approximate indexes."""
+        if nprobe is not None:
+            self.nprobe = nprobe
+        if ef_search is not None:
+            self.ef_search = ef_search
+        inner = faiss.downcast_index(self.index.index)
+        if isinstance(inner, faiss.IndexHNSW):
+            inner.hnsw.efSearch = self.ef_search
+        elif isinstance(inner, faiss.IndexIVF):
+            inner.nprobe = self.nprobe
+
+    def _target_type(self, n: int) -> str:
+        index_type = self.index_type
+        if index_type == "auto":
+            index_type = select_index_type(n, self.dimension, self.memory_budget,
+                                           quantization=self.quantization)
+        if n < MIN_TRAIN_POINTS.get(index_type, 0):
+            return "flat"
+        return index_type
+
+    def _target_quantization(self, index_type: str, n: int) -> str:
+        if index_type == "ivfpq" or (self.quantization == "int8" and n < MIN_SQ_TRAIN_POINTS):
+            return "float32"
+        return self.quantization
+
+    def _build_inner(self, index_type: str, vectors: Optional[np.ndarray]) -> faiss.Index:
+        """Create (and train, for IVF types and int8) an empty index for ``vectors``.
+
+        Vectors are stored with ``self.active_quantization``.
+        """
+        sq_type = _SQ_TYPES.get(self.active_quantization)
+        if index_type == "flat":
+            if sq_type is None:
+                return faiss.IndexFlatL2(self.dimension)
+            inner = faiss.IndexScalarQuantizer(self.dimension, sq_type, faiss.METRIC_L2)
+        elif index_type == "hnsw":
+            if sq_type is None:
+                inner = faiss.IndexHNSWFlat(self.dimension, FAISS_HNSW_M)
+            else:
+                inner = faiss.IndexHNSWSQ(self.dimension, sq_type, FAISS_HNSW_M)
+            inner.hnsw.efConstruction = FAISS_EF_CONSTRUCTION
+        else:
+            nlist = FAISS_NLIST or default_nlist(len(vectors))
+            quantizer = faiss.IndexFlatL2(self.dimension)
+            if index_type == "ivfpq":
+                inner = faiss.IndexIVFPQ(quantizer, self.dimension, nlist, FAISS_PQ_M or default_pq_m(self.dimension), 8)
+            elif sq_type is None:
+                inner = faiss.IndexIVFFlat(quantizer, self.dimension, nlist)
+            else:
+                inner = faiss.IndexIVFScalarQuantizer(quantizer, self.dimension, nlist, sq_type, faiss.METRIC_L2)
+        if inner.is_trained:
+            return inner
+
+        sample = vectors
+        if len(vectors) > self.train_sample:
+            rows = np.random.default_rng(0).choice(len(vectors), size=self.train_sample, replace=False)
+            sample = vectors[np.sort(rows)]
+        inner.train(np.ascontiguousarray(sample, dtype=np.float32))
+        if isinstance(inner, faiss.IndexIVF):
+            # Keep vectors reconstructable by id for export and deletes
+            inner.make_direct_map()
+        return inner
+
+
+    def build(self, index_type: str, ids: np.ndarray, vectors: np.ndarray) -> None:
+        """Replace the contents with ``vectors`` in a freshly built (and trained) index."""
+        start = time.perf_counter()
+        self.active_quantization = self._target_quantization(index_type, len(vectors))
+        index = faiss.IndexIDMap2(self._build_inner(index_type, vectors))
+        if len(vectors):
+            index.add_with_ids(np.ascontiguousarray(vectors, dtype=np.float32), ids)
+        self.index, self.active_type, self._trained_at = index, index_type, len(vectors)
+        self.set_search_params()
+        logger.info(f"Built FAISS {index_type} ({self.active_quantization}) index over {len(vectors)} vectors "
+                    f"in {time.perf_counter() - start:.2f}s")
+
+    def __len__(self) -> int:
+        return self.index.ntotal
+
+    def add(self, vectors: np.ndarray, ids: np.ndarray) -> None:
+        self.index.add_with_ids(np.ascontiguousarray(vectors, dtype=np.float32),
+                                np.ascontiguousarray(ids, dtype=np.int64))
+        target = self._target_type(len(self))
+        trained = self.active_type in MIN_TRAIN_POINTS or self.active_quantization == "int8"
+        stale = trained and len(self) >= 4 * self._trained_at
+        if (target != self.active_type or stale
+                or self._target_quantization(target, len(self)) != self.active_quantization):
+            self.build(target, *self.export())
+
+    def delete(self, ids: Sequence[int]) -> int:
+        if self.active_type == "flat":
+            return int(self.index.remove_ids(faiss.IDSelectorBatch(np.asarray(ids, dtype=np.int64))))
+        # Approximate indexes cannot compact in place under an id map, so
+        # re-add the surviving vectors into a fresh copy of the same index
+        current_ids, vectors = self.export()
+        keep = ~np.isin(current_ids, np.asarray(ids, dtype=np.int64))
+        inner = faiss.clone_index(faiss.downcast_index(self.index.index))
+        inner.reset()
+        index = faiss.IndexIDMap2(inner)
+        if keep.any():
+            index.add_with_ids(np.ascontiguousarray(vectors[keep]), current_ids[keep])
+        self.index = index
+        self.set_search_params()
+        return int((~keep).sum())
+
+    def search(self, queries: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        k = min(top_k, len(self))
+        if k <= 0:
+            return _empty_result(len(queries))
+        distances, ids = self.index.search(np.ascontiguousarray(queries, dtype=np.float32), k)
+        return 1.0 - distances / 2.0, ids
+
+    def export(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (ids, vectors); quantized vectors are their lossy reconstructions."""
+        ids = faiss.vector_to_array(self.index.id_map).astype(np.int64)
+        if self.index.ntotal == 0:
+            return ids, np.empty((0, self.dimension), dtype=np.float32)
+        vectors = self.index.index.reconstruct_n(0, self.index.ntotal)
+        return ids, vectors
+
+    def nbytes(self) -> int:
+        return estimate_index_bytes(self.active_type, len(self), self.dimension,
+                                    quantization=self.active_quantization)
+
+    def save(self, path: str) -> None:
+        faiss.write_index(self.index, os.path.join(path, "index.faiss"))
+
+    @classmethod
+    def load(cls, path: str) -> "FaissBackend":
+        index = faiss.read_index(os.path.join(path, "index.faiss"))
+        if not isinstance(index, faiss.IndexIDMap2):
+            # Stores saved before the id map was added use row numbers as ids
+            vectors = index.reconstruct_n(0, index.ntotal)
+            index = faiss.IndexIDMap2(faiss.IndexFlatL2(vectors.shape[1]))
+            index.add_with_ids(vectors, np.arange(len(vectors), dtype=np.int64))
+        inner = faiss.downcast_index(index.index)
+        if isinstance(inner, faiss.IndexIVF):
+            inner.make_direct_map()
+        return cls(index.d, index=index, quantization=cls._detect_quantization(index))
+
+class NumpyBackend:
+    """Exact cosine search with NumPy only; no native index library needed.
+
+    Rows are normalized on insert and held in one float32 matrix alongside
+    an ids column. Deletes compact the matrix, which is cheap at the sizes
+    this backend is meant for.
+    """
+
+    name = "numpy"
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self._vectors = np.empty((0, dimension), dtype=np.float32)
+        self._ids = np.empty(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, vectors: np.ndarray, ids: np.ndarray) -> None:
+        vectors = normalize_vectors(vectors)
+        if vectors.shape[1] != self.dimension:
+            raise ValueError(f"Expected vectors of dimension {self.dimension}, got {vectors.shape[1]}")
+        self._vectors = np.concatenate([self._vectors, vectors])
+        self._ids = np.concatenate([self._ids, np.asarray(ids, dtype=np.int64)])
+
+    def delete(self, ids: Sequence[int]) -> int:
+        keep = ~np.isin(self._ids, np.asarray(ids, dtype=np.int64))
+        removed = len(self._ids) - int(keep.sum())
+        self._vectors, self._ids = self._vectors[keep], self._ids[keep]
+        return removed
+
+    def search(self, queries: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        scores, rows = top_k_similar(self._vectors, normalize_vectors(queries), top_k)
+        return scores, self._ids[rows]
+
+    def export(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self._ids.copy(), self._vectors.copy()
+
+    def nbytes(self) -> int:
+        return self._vectors.nbytes + self._ids.nbytes
+
+    def save(self, path: str) -> None:
+        np.save(os.path.join(path, "vectors.npy"), self._vectors)
+        np.save(os.path.join(path, "vector_ids.npy"), self._ids)
+
+    @classmethod
+    def load(cls, path: str) -> "NumpyBackend":
+        vectors = np.load(os.path.join(path, "vectors.npy"))
+        backend = cls(vectors.shape[1])
+        backend._vectors = vectors
+        backend._ids = np.load(os.path.join(path, "vector_ids.npy"))
+        return backend
+
+class ChromaBackend:
+    """Approximate (HNSW) cosine search in a local Chroma collection.
+
+    Requires the optional ``chromadb`` package. With ``persist_dir`` the
+    collection is written through to disk as it changes; otherwise it is
+    in memory until ``save`` copies it into a persistent client.
+    """
+
+    name = "chroma"
+    collection_name = "petcare_chunks"
+
+    def __init__(self, dimension: int, persist_dir: Optional[str] = None):
+        if chromadb is None:
+            raise ImportError("The chroma vector backend requires chromadb. Install it with: pip install chromadb")
+        self.dimension = dimension
+        self.persist_dir = persist_dir
+        if persist_dir:
+            self._client = chromadb.PersistentClient(path=persist_dir)
+            name = self.collection_name
+        else:
+            # In-memory clients share one process-wide database
+            self._client = chromadb.EphemeralClient()
+            name = f"{self.collection_name}_{uuid.uuid4().hex}"
+        self._collection = self._client.get_or_create_collection(name, metadata={"hnsw:space": "cosine"})
+
+    def __len__(self) -> int:
+        return self._collection.count()
+
+    def add(self, vectors: np.ndarray, ids: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        batch_size = self._client.get_max_batch_size()
+        for start in range(0, len(vectors), batch_size):
+            self._collection.add(
+                ids=[str(int(i)) for i in ids[start:start + batch_size]],
+                embeddings=vectors[start:start + batch_size].tolist(),
+            )
+
+    def delete(self, ids: Sequence[int]) -> int:
+        if len(ids) == 0:
+            return 0
+        before = len(self)
+        self._collection.delete(ids=[str(int(i)) for i in ids])
+        return before - len(self)
+
+    def search(self, queries: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        k = min(top_k, len(self))
+        if k <= 0:
+            return _empty_result(len(queries))
+        result = self._collection.query(query_embeddings=np.asarray(queries, dtype=np.float32).tolist(),
+                                        n_results=k, include=["distances"])
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        for row, (row_ids, row_distances) in enumerate(zip(result["ids"], result["distances"])):
+            ids[row, :len(row_ids)] = [int(i) for i in row_ids]
+            scores[row, :len(row_ids)] = 1.0 - np.asarray(row_distances, dtype=np.float32)
+        return scores, ids
+
+    def export(self) -> Tuple[np.ndarray, np.ndarray]:
+        result = self._collection.get(include=["embeddings"])
+        ids = np.array([int(i) for i in result["ids"]], dtype=np.int64)
+        vectors = np.asarray(result["embeddings"], dtype=np.float32).reshape(len(ids), self.dimension)
+        order = np.argsort(ids)
+        return ids[order], vectors[order]
+
+    def nbytes(self) -> int:
+        return len(self) * (self.dimension * 4 + 8)
+
+    def save(self, path: str) -> None:
+        target = os.path.join(path, "chroma")
+        if self.persist_dir and os.path.abspath(self.persist_dir) == os.path.abspath(target):
+            return
+        ids, vectors = self.export()
+        copy = ChromaBackend(self.dimension, persist_dir=target)
+        copy.delete(copy.export()[0])
+        if len(ids):
+            copy.add(vectors, ids)
+
+    @classmethod
+    def load(cls, path: str) -> "ChromaBackend":
+        with open(os.path.join(path, "backend.json"), 'r', encoding='utf-8') as f:
+            dimension = json.load(f)["dimension"]
+        return cls(dimension, persist_dir=os.path.join(path, "chroma"))
+
+BACKENDS: Dict[str, Type] = {
+    FaissBackend.name: FaissBackend,
+    NumpyBackend.name: NumpyBackend,
+    ChromaBackend.name: ChromaBackend,
+}
+
+def create_backend(name: str, dimension: int, quantization: str = "float32") -> VectorBackend:
+    """Create an empty backend by name ("faiss", "numpy" or "chroma").
+
+    Only the FAISS backend supports ``quantization`` other than "float32".
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown vector backend: {name}")
+    if quantization != "float32":
+        if name != FaissBackend.name:
+            raise ValueError(f"The {name} backend does not support {quantization} quantization")
+        return FaissBackend(dimension, quantization=quantization)
+    return BACKENDS[name](dimension)
+
+def save_backend(backend: VectorBackend, path: str) -> None:
+    """Persist a backend to a directory, recording which one it is."""
+    backend.save(path)
+    with open(os.path.join(path, "backend.json"), 'w', encoding='utf-8') as f:
+        json.dump({"backend": backend.name, "dimension": backend.dimension}, f)
+
+def load_backend(path: str) -> Optional[VectorBackend]:
+    """Load the backend saved in a directory, or None if it holds no vectors."""
+    try:
+        with open(os.path.join(path, "backend.json"), 'r', encoding='utf-8') as f:
+            name = json.load(f)["backend"]
+    except OSError:
+        # Directories written before backends were pluggable hold a FAISS index
+        if not os.path.exists(os.path.join(path, "index.faiss")):
+            return None
+        name = FaissBackend.name
+    return BACKENDS[name].load(path)
@@ -0,0 +1,192 @@
+import os
+import uuid
+import shutil
+import logging
+import weakref
+from typing import Optional, Sequence, Tuple
+import numpy as np
+from config.config import VECTOR_ORIGINALS_DIR, FAISS_TRAIN_SAMPLE
+from utils.document_processor import normalize_vectors
+
+logger = logging.getLogger(__name__)
+
+REDUCTIONS = ("none", "truncate", "pca")
+ORIGINALS_FILE = "original_vectors.f32"
+REDUCER_FILE = "reducer.npz"
+
+# PCA is fitted once this many vectors exist; until then vectors are stored
+# at full dimension, like untrained FAISS index types
+PCA_MIN_TRAIN_POINTS = 1000
+
+class DimensionReducer:
+    """Project embeddings to fewer dimensions before they are indexed.
+
+    "truncate" keeps the first ``dimension`` components (Matryoshka-style;
+    lossless only for models trained for it, which BGE-large is not), "pca"
+    projects onto the top principal components of the stored vectors.
+    Outputs are re-normalized so inner products stay cosine similarities.
+    """
+
+    def __init__(self, method: str, dimension: int):
+        """Initialize the reducer.
+
+        Args:
+            method: "truncate" or "pca"
+            dimension: Output dimension
+        """
+        if method not in REDUCTIONS[1:]:
+            raise ValueError(f"Unknown dimensionality reduction: {method}")
+        self.method = method
+        self.dimension = dimension
+        self.mean: Optional[np.ndarray] = None
+        self.components: Optional[np.ndarray] = None
+
+    @property
+    def fitted(self) -> bool:
+        return self.method == "truncate" or self.components is not None
+
+    def min_train_points(self) -> int:
+        return max(PCA_MIN_TRAIN_POINTS, self.dimension)
+
+    def fit(self, vectors: np.ndarray, sample: int = FAISS_TRAIN_SAMPLE) -> None:
+        """Fit the PCA projection on (a random sample of) ``vectors``."""
+        if self.method == "truncate":
+            return
+        if len(vectors) < self.dimension:
+            raise ValueError(f"PCA to {self.dimension} dimensions needs at least that many vectors")
+        if len(vectors) > sample:
+            rows = np.random.default_rng(0).choice(len(vectors), size=sample, replace=False)
+            vectors = vectors[np.sort(rows)]
+        vectors = np.asarray(vectors, dtype=np.float32)
+        mean = vectors.mean(axis=0)
+        _, singular_values, components = np.linalg.svd(vectors - mean, full_matrices=False)
+        variance = singular_values ** 2
+        self.mean = mean
+        self.components = np.ascontiguousarray(components[:self.dimension], dtype=np.float32)
+        logger.info(f"Fitted PCA to {self.dimension} dimensions on {len(vectors)} vectors, "
+                    f"keeping {variance[:self.dimension].sum() / variance.sum():.1%} of the variance")
+
+    def transform(self, vectors: np.ndarray) -> np.ndarray:
+        """Reduce and re-normalize ``vectors``."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.method == "truncate":
+            return normalize_vectors(vectors[:, :self.dimension])
+        return normalize_vectors((vectors - self.mean) @ self.components.T)
+
+    def save(self, path: str) -> None:
+        if self.method == "pca" and self.fitted:
+            np.savez(os.path.join(path, REDUCER_FILE), mean=self.mean, components=self.components)
+
+    @classmethod
+    def load(cls, path: str, method: str, dimension: int) -> "DimensionReducer":
+        reducer = cls(method, dimension)
+        file_path = os.path.join(path, REDUCER_FILE)
+        if method == "pca" and os.path.exists(file_path):
+            with np.load(file_path) as data:
+                reducer.mean, reducer.components = data["mean"], data["components"]
+        return reducer
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+class FullPrecisionVectors:
+    """Append-only float32 copy of the original embeddings, kept on disk.
+
+    Rows are addressed by vector id (the store's chunk positions, which are
+    never reused) and read back through a memory map, so only rows touched
+    by re-scoring or export are paged in. The file always lives in
+    ``directory`` and is deleted with the object. A saved copy is opened
+    through a hard link (a copy across filesystems), so the saved directory
+    may be deleted or replaced while the store is in use; a linked file is
+    shared with the saved store and is copied before the first append.
+    """
+
+    def __init__(self, dimension: int, path: Optional[str] = None, directory: str = VECTOR_ORIGINALS_DIR):
+        """Open a saved copy at ``path``, or start an empty one in ``directory``."""
+        self.dimension = dimension
+        self.directory = directory
+        self._finalizer = None
+        self._take_file(path, share=True)
+        self._rows = os.path.getsize(self.path) // (4 * dimension)
+
+    def _take_file(self, source: Optional[str] = None, share: bool = False) -> None:
+        """Switch to a new private file in ``directory``: empty, or with the contents of ``source``."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{uuid.uuid4().hex}.f32")
+        shared = False
+        if source is None:
+            open(path, 'wb').close()
+        elif share:
+            try:
+                os.link(source, path)
+                shared = True
+            except OSError:
+                shutil.copyfile(source, path)
+        else:
+            shutil.copyfile(source, path)
+        if self._finalizer is not None:
+            self._finalizer()
+        self._finalizer = weakref.finalize(self, _remove, path)
+        self.path = path
+        self._shared = shared
+        self._map: Optional[np.memmap] = None
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def append(self, vectors: np.ndarray, ids: Sequence[int]) -> None:
+        """Append rows; ``ids`` must continue the existing ones."""
+        if len(ids) and int(ids[0]) != self._rows:
+            raise ValueError(f"Expected vector id {self._rows}, got {int(ids[0])}")
+        if self._shared:
+            self._take_file(self.path)
+        with open(self.path, 'ab') as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        self._rows += len(ids)
+
+    def get(self, ids: Sequence[int]) -> np.ndarray:
+        """Original vectors for ``ids``, in order."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if self._map is None or len(self._map) < self._rows:
+            if self._rows == 0:
+                return np.empty((len(ids), self.dimension), dtype=np.float32)
+            self._map = np.memmap(self.path, dtype=np.float32, mode='r', shape=(self._rows, self.dimension))
+        return np.array(self._map[ids])
+
+    def nbytes(self) -> int:
+        """Size on disk."""
+        return self._rows * self.dimension * 4
+
+    def save(self, path: str) -> None:
+        target = os.path.join(path, ORIGINALS_FILE)
+        if os.path.exists(target) and os.path.samefile(target, self.path):
+            return
+        # Replace rather than overwrite: the old file may be linked by a loaded store
+        temp_path = f"{target}.tmp"
+        shutil.copyfile(self.path, temp_path)
+        os.replace(temp_path, target)
+
+    @classmethod
+    def load(cls, path: str, dimension: int) -> "FullPrecisionVectors":
+        return cls(dimension, path=os.path.join(path, ORIGINALS_FILE))
+
+def rescore(query: np.ndarray, ids: np.ndarray, originals: FullPrecisionVectors,
+            top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Re-rank candidate ids by exact cosine similarity to the full query.
+
+    Args:
+        query: Full-precision query embedding, shape (1, dimension)
+        ids: Candidate ids from the compressed index; -1 marks no result
+        originals: Full-precision vectors of the store
+        top_k: Results to keep
+
+    Returns:
+        Tuple of (scores, ids), each of shape (1, k), best first
+    """
+    ids = ids[ids >= 0]
+    scores = normalize_vectors(originals.get(ids)) @ normalize_vectors(query)[0]
+    order = np.argsort(-scores, kind="stable")[:top_k]
+    return scores[order].reshape(1, -1), ids[order].reshape(1, -1)
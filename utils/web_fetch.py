@@ -0,0 +1,205 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from typing import Dict, List, Optional
+import aiohttp
+from utils import async_runtime
+from utils.cancellation import CancelToken
+
+logger = logging.getLogger(__name__)
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+def clean_text(text: str) -> str:
+    """Collapse extracted page text to one phrase per line, without blanks."""
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return "\n".join(chunk for chunk in chunks if chunk)
+
+def truncate_text(text: str, max_length: int) -> str:
+    """Cut text to ``max_length`` characters, marking the cut with "..."."""
+    if len(text) > max_length:
+        return text[:max_length] + "..."
+    return text
+
+def extract_text(html: bytes, max_length: int = 3000) -> str:
+    """Extract readable text from an HTML document.
+
+    Uses lxml when available, which is several times faster than
+    BeautifulSoup's pure-Python ``html.parser``, and falls back to it otherwise.
+
+    Args:
+        html: Raw (possibly truncated) HTML
+        max_length: Maximum content length to return
+
+    Returns:
+        Extracted text, truncated with "..." if longer than ``max_length``
+    """
+    if lxml is not None:
+        document = lxml.html.document_fromstring(html)
+        etree.strip_elements(document, "script", "style", "noscript", with_tail=False)
+        text = "\n".join(document.itertext())
+    else:
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(html, "html.parser")
+        for script in soup(["script", "style"]):
+            script.extract()
+        text = soup.get_text(separator="\n")
+
+    return truncate_text(clean_text(text), max_length)
+
+class PageCache:
+    """Disk cache of extracted page text, validated with ETag/Last-Modified."""
+
+    def __init__(self, cache_dir: str, max_age: float = 7 * 24 * 3600):
+        """Initialize the cache.
+
+        Args:
+            cache_dir: Directory holding one JSON file per URL
+            max_age: Seconds after which an entry is ignored entirely
+        """
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode('utf-8')).hexdigest() + ".json")
+
+    def get(self, url: str) -> Optional[Dict[str, str]]:
+        """Return the cached entry for a URL, if present and not expired."""
+        try:
+            with open(self._path(url), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get("fetched_at", 0) > self.max_age:
+            return None
+        return entry
+
+    def put(self, url: str, text: str, etag: Optional[str], last_modified: Optional[str]) -> None:
+        """Store extracted text and its validators."""
+        path = self._path(url)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "url": url,
+                    "text": text,
+                    "etag": etag,
+                    "last_modified": last_modified,
+                    "fetched_at": time.time(),
+                }, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write page cache entry for {url}: {str(e)}")
+
+    def touch(self, url: str, entry: Dict[str, str]) -> None:
+        """Refresh an entry's age after the server confirmed it is unchanged."""
+        self.put(url, entry["text"], entry.get("etag"), entry.get("last_modified"))
+
+class PageFetcher:
+    """Concurrent page fetcher sharing one HTTP connection pool.
+
+    All requests run on the process-wide event loop from ``async_runtime``.
+    Each request has its own deadline, bodies are streamed and cut off at
+    ``max_bytes``, and extracted text is cached on disk. Cached pages are
+    revalidated with conditional requests, so unchanged pages cost a 304.
+    """
+
+    def __init__(self, cache: Optional[PageCache] = None, timeout: float = 4.0,
+                 max_bytes: int = 512 * 1024, max_connections: int = 20):
+        """Initialize the fetcher.
+
+        Args:
+            cache: Optional disk cache of extracted text
+            timeout: Per-request deadline in seconds
+            max_bytes: Maximum body bytes read per page
+            max_connections: Size of the shared connection pool
+        """
+        self.cache = cache
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.max_connections = max_connections
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Created lazily on the shared loop, which it is then bound to
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300),
+                headers={"User-Agent": USER_AGENT},
+            )
+        return self._session
+
+    async def fetch(self, url: str, max_length: int = 3000) -> Optional[str]:
+        """Fetch one page and return its extracted text, or None on failure."""
+        entry = self.cache.get(url) if self.cache else None
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+            async with self._get_session().get(url, headers=headers, timeout=timeout) as response:
+                if response.status == 304 and entry:
+                    self.cache.touch(url, entry)
+                    return truncate_text(entry["text"], max_length)
+                response.raise_for_status()
+                if response.content_type not in ("text/html", "application/xhtml+xml", "text/plain"):
+                    logger.info(f"Skipping non-HTML page {url} ({response.content_type})")
+                    return None
+
+                body = bytearray()
+                async for block in response.content.iter_chunked(16384):
+                    body += block
+                    if len(body) >= self.max_bytes:
+                        break
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+
+            # Parsing is CPU-bound; keep it off the shared event loop. The
+            # full extraction is cached so later callers can ask for more.
+            text = await asyncio.to_thread(extract_text, bytes(body[:self.max_bytes]), self.max_bytes)
+            if self.cache and (etag or last_modified):
+                self.cache.put(url, text, etag, last_modified)
+            return truncate_text(text, max_length)
+        except Exception as e:
+            logger.error(f"Error fetching webpage content from {url}: {str(e) or type(e).__name__}")
+            # A stale copy is better than nothing when the site is unreachable
+            return truncate_text(entry["text"], max_length) if entry else None
+
+    async def fetch_many(self, urls: List[str], max_length: int = 3000) -> List[Optional[str]]:
+        """Fetch several pages concurrently; results are in the order of ``urls``."""
+        return await asyncio.gather(*(self.fetch(url, max_length=max_length) for url in urls))
+
+    def fetch_pages(self, urls: List[str], max_length: int = 3000,
+                    cancel: Optional[CancelToken] = None) -> List[Optional[str]]:
+        """Blocking wrapper around ``fetch_many`` for synchronous callers.
+
+        Raises:
+            RequestCancelled: If ``cancel`` is cancelled first; the open
+                requests are aborted
+        """
+        if not urls:
+            return []
+        if cancel is not None:
+            return cancel.run(self.fetch_many(urls, max_length=max_length))
+        # Per-request deadlines bound the batch; the margin covers extraction
+        return async_runtime.run(self.fetch_many(urls, max_length=max_length), timeout=self.timeout + 5)
+
+    def close(self) -> None:
+        """Close the shared connection pool."""
+        if self._session is not None and not self._session.closed:
+            async_runtime.run(self._session.close(), timeout=5)
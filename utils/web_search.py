@@ -1,20 +1,30 @@
 import requests
 import logging
+import threading
 from typing import List, Dict, Any, Optional
-from config.config import TAVILY_API_KEY
+from config.config import (TAVILY_API_KEY, TAVILY_API_URL, TAVILY_TIMEOUT, WEB_FETCH_TIMEOUT, WEB_FETCH_MAX_BYTES,
+                           WEB_FETCH_MAX_CONNECTIONS, WEB_FETCH_CACHE_DIR)
+from utils.web_fetch import PageCache, PageFetcher
+from utils.admission import UpstreamBusy, get_limiter
+from utils.cancellation import CancelToken, RequestCancelled
 
 logger = logging.getLogger(__name__)
 
-def tavily_search(query: str, search_depth: str = "basic", max_results: int = 5) -> List[Dict[str, Any]]:
+def tavily_search(query: str, search_depth: str = "basic", max_results: int = 5,
+                  cancel: Optional[CancelToken] = None) -> List[Dict[str, Any]]:
     """Perform a web search using Tavily API.
     
     Args:
         query: The search query
         search_depth: 'basic' or 'deep' (basic is faster, deep is more comprehensive)
         max_results: Maximum number of results to return
+        cancel: Optional token whose remaining deadline bounds the request
         
     Returns:
         List of search results
+        
+    Raises:
+        RequestCancelled: If ``cancel`` is cancelled before the request
     """
     try:
         if not TAVILY_API_KEY:
@@ -25,7 +35,7 @@ def tavily_search(query: str, search_depth: str = "basic", max_results: int = 5)
         if not any(term in query.lower() for term in ["pet", "dog", "cat", "animal"]):
             query = f"pet care {query}"
             
-        url = "https://api.tavily.com/search"
+        url = TAVILY_API_URL
         headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {TAVILY_API_KEY}"
@@ -49,7 +59,9 @@ def tavily_search(query: str, search_depth: str = "basic", max_results: int = 5)
             ]
         }
         
-        response = requests.post(url, json=payload, headers=headers)
+        with get_limiter("tavily").admit():
+            timeout = cancel.remaining(TAVILY_TIMEOUT) if cancel is not None else TAVILY_TIMEOUT
+            response = requests.post(url, json=payload, headers=headers, timeout=timeout)
         response.raise_for_status()
         
         data = response.json()
@@ -67,10 +79,56 @@ def tavily_search(query: str, search_depth: str = "basic", max_results: int = 5)
             })
             
         return results
+    except RequestCancelled:
+        raise
+    except UpstreamBusy as e:
+        # Answer from local context alone rather than queue behind other sessions
+        logger.warning(f"Skipping web search: {str(e)}")
+        return []
     except Exception as e:
         logger.error(f"Error performing Tavily search: {str(e)}")
         return []
 
+_page_fetcher: Optional[PageFetcher] = None
+_page_fetcher_lock = threading.Lock()
+
+def get_page_fetcher() -> PageFetcher:
+    """Return the process-wide page fetcher and its shared connection pool."""
+    global _page_fetcher
+    with _page_fetcher_lock:
+        if _page_fetcher is None:
+            cache = PageCache(WEB_FETCH_CACHE_DIR) if WEB_FETCH_CACHE_DIR else None
+            _page_fetcher = PageFetcher(
+                cache=cache,
+                timeout=WEB_FETCH_TIMEOUT,
+                max_bytes=WEB_FETCH_MAX_BYTES,
+                max_connections=WEB_FETCH_MAX_CONNECTIONS
+            )
+        return _page_fetcher
+
+def fetch_webpage_contents(urls: List[str], max_length: int = 3000,
+                           cancel: Optional[CancelToken] = None) -> List[Optional[str]]:
+    """Fetch and extract content from several webpages concurrently.
+    
+    Args:
+        urls: URLs to fetch
+        max_length: Maximum content length to return per page
+        cancel: Optional token that aborts the fetches
+        
+    Returns:
+        Extracted text for each URL, in order, with None for failures
+        
+    Raises:
+        RequestCancelled: If ``cancel`` is cancelled before the pages arrive
+    """
+    try:
+        return get_page_fetcher().fetch_pages(urls, max_length=max_length, cancel=cancel)
+    except RequestCancelled:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching webpage content: {str(e)}")
+        return [None for _ in urls]
+
 def fetch_webpage_content(url: str, max_length: int = 3000) -> Optional[str]:
     """Fetch and extract content from a webpage.
     
@@ -81,38 +139,4 @@ def fetch_webpage_content(url: str, max_length: int = 3000) -> Optional[str]:
     Returns:
         Extracted text content or None if failed
     """
-    try:
-        from bs4 import BeautifulSoup
-        import requests
-        
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-        
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, "html.parser")
-        
-        # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.extract()
-            
-        # Get text
-        text = soup.get_text(separator="\n")
-        
-        # Break into lines and remove leading and trailing space
-        lines = (line.strip() for line in text.splitlines())
-        # Break multi-headlines into a line each
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        # Remove blank lines
-        text = "\n".join(chunk for chunk in chunks if chunk)
-        
-        # Truncate if needed
-        if len(text) > max_length:
-            text = text[:max_length] + "..."
-            
-        return text
-    except Exception as e:
-        logger.error(f"Error fetching webpage content: {str(e)}")
-        return None
\ No newline at end of file
+    return fetch_webpage_contents([url], max_length=max_length)[0]